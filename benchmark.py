@@ -0,0 +1,409 @@
+"""
+Reproducible benchmarks for every puzzle type and solver.
+
+Run all cases and write the results as JSON:
+
+    python benchmark.py run --repeat 5 --output bench.json
+
+Compare two result files and report cases that got slower:
+
+    python benchmark.py compare old.json new.json --threshold 0.10
+"""
+import json
+import os
+import platform
+import sys
+import tracemalloc
+from time import perf_counter, strftime
+
+from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+from mn_anytime import anytime_solve
+from mn_puzzle import MNPuzzle
+from puzzle_tools import (PuzzleNode, breadth_first_solve,
+                          depth_first_solve, mutable_depth_first_solve)
+from solver_stats import SolverStats
+from sudoku_puzzle import SudokuPuzzle
+from word_ladder_puzzle import WordLadderPuzzle
+
+WORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "words.txt")
+_word_set = None
+
+
+def bfs_numpy(puzzle, **kwargs):
+    """
+    Run breadth_first_solve on puzzle with the NumPy backend.
+
+    @type puzzle: MNPuzzle
+    @rtype: PuzzleNode | None
+    """
+    return breadth_first_solve(puzzle, backend="numpy", **kwargs)
+
+
+def anytime(puzzle, **kwargs):
+    """
+    Run anytime_solve on puzzle with a two second deadline.
+
+    @type puzzle: MNPuzzle
+    @rtype: PuzzleNode | None
+    """
+    return anytime_solve(puzzle, timeout=2.0, **kwargs)
+
+
+def dfs_mutable(puzzle, **kwargs):
+    """
+    Run mutable_depth_first_solve on puzzle, without the set of states
+    seen for a SudokuPuzzle, whose moves never reach a state twice.
+
+    @type puzzle: Puzzle
+    @rtype: PuzzleNode | None
+    """
+    return mutable_depth_first_solve(
+        puzzle, not isinstance(puzzle, SudokuPuzzle), **kwargs)
+
+
+def ladders(puzzle, **kwargs):
+    """
+    Build the LadderDAG of every shortest ladder of puzzle, changing any
+    letter at each step, and count them; return the first as a path.
+
+    @type puzzle: WordLadderPuzzle
+    @rtype: PuzzleNode | None
+    """
+    dag = puzzle.shortest_ladders(**kwargs)
+    if dag.count() == 0:
+        return None
+    return PuzzleNode.from_path([_ladder(word, dag.to_word)
+                                 for word in dag.ladder(0)])
+
+
+SOLVERS = {"dfs": depth_first_solve, "dfs-mutable": dfs_mutable,
+           "bfs": breadth_first_solve, "bfs-numpy": bfs_numpy,
+           "anytime": anytime, "ladders": ladders}
+
+
+class Case:
+    """
+    One benchmark: a named puzzle built on demand and the solvers to run
+    on it.
+    """
+
+    def __init__(self, name, tier, make, solvers):
+        """
+        Create a new Case self.
+
+        @type self: Case
+        @type name: str
+        @type tier: str
+            "easy", "medium" or "hard"
+        @type make: callable
+            builds a fresh puzzle each time it is called
+        @type solvers: list[str]
+            keys of SOLVERS
+        @rtype: None
+        """
+        self.name, self.tier, self.make, self.solvers = (name, tier, make,
+                                                        solvers)
+
+
+def word_set():
+    """
+    Return the word set from words.txt, loading it on first use.
+
+    @rtype: set[str]
+    """
+    global _word_set
+    if _word_set is None:
+        with open(WORDS_PATH) as words:
+            _word_set = set(words.read().split())
+    return _word_set
+
+
+def _sudoku(n, rows):
+    # Return a SudokuPuzzle built from a list of row strings.
+    #
+    # @type n: int
+    # @type rows: list[str]
+    # @rtype: SudokuPuzzle
+    symbols = "123456789ABCDEFG"[:n]
+    return SudokuPuzzle(n, list("".join(rows)), set(symbols))
+
+
+def _mn(start, goal, m):
+    # Return an MNPuzzle from flat start and goal strings with m columns.
+    #
+    # @type start: str
+    # @type goal: str
+    # @type m: int
+    # @rtype: MNPuzzle
+    def grid(s):
+        return tuple(tuple(s[i:i + m]) for i in range(0, len(s), m))
+    return MNPuzzle(grid(start), grid(goal))
+
+
+def _peg(rows):
+    # Return a GridPegSolitairePuzzle from a list of row strings.
+    #
+    # @type rows: list[str]
+    # @rtype: GridPegSolitairePuzzle
+    return GridPegSolitairePuzzle([list(r) for r in rows], {"*", ".", "#"})
+
+
+def _ladder(from_word, to_word):
+    # Return a WordLadderPuzzle over the words in words.txt.
+    #
+    # @type from_word: str
+    # @type to_word: str
+    # @rtype: WordLadderPuzzle
+    return WordLadderPuzzle(from_word, to_word, word_set())
+
+
+# Every MN start below is at the given optimal distance from its goal.
+CORPUS = [
+    Case("sudoku-4x4", "easy",
+         lambda: _sudoku(4, ["1*3*", "*4**", "**4*", "*3*2"]),
+         ["dfs", "dfs-mutable"]),
+    Case("sudoku-9x9-star", "easy",
+         lambda: _sudoku(9, ["***7*8*1*", "**7*9***6", "9*31*****",
+                             "35*8**6*1", "*********", "1*6**9*48",
+                             "*****12*7", "8***7*4**", "*6*3*2***"]),
+         ["dfs", "dfs-mutable"]),
+    Case("sudoku-9x9-3star", "medium",
+         lambda: _sudoku(9, ["***9*2***", "*91***63*", "*3**7**8*",
+                             "3*******8", "**9***2**", "5*******7",
+                             "*7**8**4*", "*45***81*", "***3*6***"]),
+         ["dfs", "dfs-mutable"]),
+    Case("sudoku-9x9-4star", "hard",
+         lambda: _sudoku(9, ["56***7**9", "*7**48*31", "*********",
+                             "43*******", "*8*****9*", "*******26",
+                             "*********", "19*36**7*", "7**1***42"]),
+         ["dfs", "dfs-mutable"]),
+    Case("mn-2x3-d5", "easy", lambda: _mn("*52143", "12345*", 3),
+         ["bfs", "bfs-numpy", "dfs", "dfs-mutable"]),
+    Case("mn-2x3-d15", "easy", lambda: _mn("*12345", "12345*", 3),
+         ["bfs", "bfs-numpy", "dfs", "dfs-mutable"]),
+    Case("mn-2x3-d21", "medium", lambda: _mn("45*123", "12345*", 3),
+         ["bfs", "bfs-numpy", "dfs", "dfs-mutable"]),
+    Case("mn-2x4-d20", "medium", lambda: _mn("34*76125", "1234567*", 4),
+         ["bfs", "bfs-numpy"]),
+    Case("mn-3x3-d14", "medium", lambda: _mn("24175386*", "12345678*", 3),
+         ["bfs", "bfs-numpy"]),
+    Case("mn-3x3-d20", "hard", lambda: _mn("36*157824", "12345678*", 3),
+         ["bfs", "bfs-numpy", "anytime"]),
+    Case("mn-4x4-d50", "hard",
+         lambda: _mn("FD*3261A7584CBE9", "123456789ABCDEF*", 4),
+         ["anytime"]),
+    Case("peg-3x4", "easy", lambda: _peg(["**.*", "****", "****"]),
+         ["dfs", "dfs-mutable", "bfs"]),
+    Case("peg-5x5", "medium",
+         lambda: _peg(["*****", "*****", "*****", "**.**", "*****"]),
+         ["dfs", "dfs-mutable"]),
+    Case("peg-cross-4x5", "medium",
+         lambda: _peg(["#***#", "*****", "**.**", "#***#"]),
+         ["dfs", "dfs-mutable"]),
+    Case("peg-4x4-unsolvable", "hard",
+         lambda: _peg(["****", "****", "**.*", "****"]),
+         ["dfs", "dfs-mutable"]),
+    Case("peg-4x6", "hard",
+         lambda: _peg(["******", "**.***", "******", "******"]),
+         ["dfs", "dfs-mutable"]),
+    Case("ladder-bat-cot", "easy", lambda: _ladder("bat", "cot"),
+         ["bfs", "dfs", "dfs-mutable"]),
+    Case("ladder-same-cost", "easy", lambda: _ladder("same", "cost"),
+         ["bfs", "dfs", "dfs-mutable"]),
+    Case("ladder-mine-hers", "easy", lambda: _ladder("mine", "hers"),
+         ["bfs", "dfs", "dfs-mutable"]),
+    Case("ladder-head-tail", "easy", lambda: _ladder("head", "tail"),
+         ["bfs", "dfs", "dfs-mutable", "ladders"]),
+    # 11 and 12 steps when any letter may change, with 6 and 111
+    # shortest ladders
+    Case("ladder-stone-money", "medium", lambda: _ladder("stone", "money"),
+         ["ladders"]),
+    Case("ladder-oaths-shore", "hard", lambda: _ladder("oaths", "shore"),
+         ["ladders"]),
+]
+
+
+def percentile(values, p):
+    """
+    Return the p-th percentile of values by the nearest-rank method.
+
+    @type values: list[float]
+    @type p: float
+    @rtype: float
+
+    >>> percentile([1.0, 2.0, 3.0, 4.0], 50)
+    2.0
+    >>> percentile([1.0, 2.0, 3.0, 4.0], 95)
+    4.0
+    """
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def path_length(solution):
+    """
+    Return the number of puzzles on the path starting at solution, or 0
+    if there is no solution.
+
+    @type solution: PuzzleNode | None
+    @rtype: int
+    """
+    if solution is None:
+        return 0
+    return len(solution.path())
+
+
+def run_case(case, solver_name, repeat):
+    """
+    Return the measurements for solving case with the named solver:
+    repeat timed runs, then one run with SolverStats for node counts
+    and one under tracemalloc for peak memory.
+
+    @type case: Case
+    @type solver_name: str
+    @type repeat: int
+    @rtype: dict
+    """
+    solver = SOLVERS[solver_name]
+    times = []
+    solution = None
+    for _ in range(repeat):
+        puzzle = case.make()
+        start = perf_counter()
+        solution = solver(puzzle)
+        times.append(perf_counter() - start)
+    stats = SolverStats()
+    solver(case.make(), stats=stats)
+    puzzle = case.make()
+    tracemalloc.start()
+    try:
+        solver(puzzle)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    median = percentile(times, 50)
+    return {"tier": case.tier,
+            "solver": solver_name,
+            "repeat": repeat,
+            "median": median,
+            "p95": percentile(times, 95),
+            "min": min(times),
+            "path_length": path_length(solution),
+            "nodes_expanded": stats.nodes_expanded,
+            "nodes_generated": stats.nodes_generated,
+            "nodes_per_second": (stats.nodes_expanded / median
+                                 if median > 0 else 0.0),
+            "peak_memory": peak}
+
+
+def run(repeat=5, only=None, tiers=None, log=None):
+    """
+    Run the corpus and return the results as a JSON-ready dict.
+
+    @type repeat: int
+    @type only: str | None
+        run only cases whose name contains this substring
+    @type tiers: set[str] | None
+        run only cases in these tiers
+    @type log: file | None
+        where to report progress, if anywhere
+    @rtype: dict
+    """
+    results = {}
+    for case in CORPUS:
+        if only is not None and only not in case.name:
+            continue
+        if tiers is not None and case.tier not in tiers:
+            continue
+        for solver_name in case.solvers:
+            key = "{}/{}".format(case.name, solver_name)
+            results[key] = run_case(case, solver_name, repeat)
+            if log is not None:
+                print("{:<28} median {:.4f}s  p95 {:.4f}s  {:.0f} nodes/s"
+                      .format(key, results[key]["median"],
+                              results[key]["p95"],
+                              results[key]["nodes_per_second"]), file=log)
+    return {"meta": {"python": platform.python_version(),
+                     "implementation": platform.python_implementation(),
+                     "machine": platform.machine(),
+                     "platform": platform.platform(),
+                     "time": strftime("%Y-%m-%dT%H:%M:%S"),
+                     "repeat": repeat},
+            "results": results}
+
+
+def compare(old, new, threshold=0.10):
+    """
+    Return lines describing every case in both old and new whose median
+    time or peak memory grew by more than threshold, as a fraction.
+
+    @type old: dict
+    @type new: dict
+    @type threshold: float
+    @rtype: list[str]
+
+    >>> old = {"results": {"a/dfs": {"median": 1.0, "peak_memory": 100}}}
+    >>> new = {"results": {"a/dfs": {"median": 1.5, "peak_memory": 100}}}
+    >>> compare(old, new)
+    ['a/dfs: median 1.0000s -> 1.5000s (+50.0%)']
+    """
+    lines = []
+    for key in sorted(set(old["results"]) & set(new["results"])):
+        before, after = old["results"][key], new["results"][key]
+        for field, unit in (("median", "s"), ("peak_memory", "B")):
+            if before[field] > 0 and (after[field] >
+                                      before[field] * (1 + threshold)):
+                change = after[field] / before[field] - 1
+                if unit == "s":
+                    lines.append("{}: {} {:.4f}s -> {:.4f}s ({:+.1%})".format(
+                        key, field, before[field], after[field], change))
+                else:
+                    lines.append("{}: {} {}B -> {}B ({:+.1%})".format(
+                        key, field, before[field], after[field], change))
+    return lines
+
+
+def main(argv=None):
+    """
+    Command-line entry point; return the process exit status.
+
+    @type argv: list[str] | None
+    @rtype: int
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--only", help="substring of case names to run")
+    run_parser.add_argument("--tier", action="append",
+                            choices=["easy", "medium", "hard"])
+    run_parser.add_argument("--output", help="JSON file (default stdout)")
+    compare_parser = commands.add_parser("compare",
+                                         help="diff two result files")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        tiers = set(args.tier) if args.tier else None
+        results = run(args.repeat, args.only, tiers, log=sys.stderr)
+        text = json.dumps(results, indent=2, sort_keys=True)
+        if args.output:
+            with open(args.output, "w") as out:
+                out.write(text + "\n")
+        else:
+            print(text)
+        return 0
+    with open(args.old) as old, open(args.new) as new:
+        regressions = compare(json.load(old), json.load(new), args.threshold)
+    for line in regressions:
+        print(line)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""
+Breadth-first search with the frontier and visited set kept on disk.
+
+Each level of the search is a file of fixed-width packed states, sorted
+and free of duplicates.  Children are generated into sorted run files of
+bounded size, merged, and only then checked against the two previous
+levels (delayed duplicate detection), so memory use does not grow with
+the size of the state space.
+"""
+import heapq
+import os
+import shutil
+import tempfile
+from time import perf_counter
+
+from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+from mn_puzzle import MNPuzzle
+from puzzle_tools import PuzzleNode
+
+# bytes read or written at a time
+_CHUNK = 1 << 16
+
+
+class MNCodec:
+    """
+    Packs an MNPuzzle into one byte per cell: the index of its symbol
+    among the sorted symbols of the goal grid.
+    """
+
+    def __init__(self, puzzle):
+        """
+        Create a new MNCodec self for puzzles with the goal of puzzle.
+
+        @type self: MNCodec
+        @type puzzle: MNPuzzle
+        @rtype: None
+        """
+        self.to_grid, self.m = puzzle.to_grid, puzzle.m
+        self.symbols = sorted({x for row in puzzle.to_grid for x in row})
+        assert len(self.symbols) <= 256
+        self.index = {x: i for i, x in enumerate(self.symbols)}
+        self.width = puzzle.n * puzzle.m
+
+    def encode(self, puzzle):
+        """
+        Return the packed form of puzzle.
+
+        @type self: MNCodec
+        @type puzzle: MNPuzzle
+        @rtype: bytes
+
+        >>> p = MNPuzzle((("*", "2", "3"), ("1", "4", "5")),
+        ...              (("1", "2", "3"), ("4", "5", "*")))
+        >>> codec = MNCodec(p)
+        >>> print(codec.decode(codec.encode(p)))
+        *23
+        145
+        """
+        index = self.index
+        return bytes([index[x] for row in puzzle.from_grid for x in row])
+
+    def decode(self, record):
+        """
+        Return the MNPuzzle packed into record.
+
+        @type self: MNCodec
+        @type record: bytes
+        @rtype: MNPuzzle
+        """
+        symbols, m = self.symbols, self.m
+        cells = [symbols[i] for i in record]
+        return MNPuzzle(tuple(tuple(cells[r:r + m])
+                              for r in range(0, len(cells), m)),
+                        self.to_grid)
+
+
+class PegCodec:
+    """
+    Packs a GridPegSolitairePuzzle into one bit per usable cell, set
+    where there is a peg; the layout of unused "#" cells is fixed.
+    """
+
+    def __init__(self, puzzle):
+        """
+        Create a new PegCodec self for boards with the layout of puzzle.
+
+        @type self: PegCodec
+        @type puzzle: GridPegSolitairePuzzle
+        @rtype: None
+        """
+        marker = puzzle._marker
+        self.layout = [row[:] for row in marker]
+        self.marker_set = puzzle._marker_set
+        self.directions = puzzle._directions
+        self.cells = [(i, j) for i in range(len(marker))
+                      for j in range(len(marker[i])) if marker[i][j] != "#"]
+        self.width = (len(self.cells) + 7) // 8
+
+    def encode(self, puzzle):
+        """
+        Return the packed form of puzzle.
+
+        @type self: PegCodec
+        @type puzzle: GridPegSolitairePuzzle
+        @rtype: bytes
+
+        >>> g = GridPegSolitairePuzzle([["#", "*", "*", "."]],
+        ...                            {"*", ".", "#"})
+        >>> codec = PegCodec(g)
+        >>> print(codec.decode(codec.encode(g)))
+        #**.
+        """
+        marker, bits = puzzle._marker, 0
+        for i, j in self.cells:
+            bits = (bits << 1) | (marker[i][j] == "*")
+        return bits.to_bytes(self.width, "big")
+
+    def decode(self, record):
+        """
+        Return the GridPegSolitairePuzzle packed into record.
+
+        @type self: PegCodec
+        @type record: bytes
+        @rtype: GridPegSolitairePuzzle
+        """
+        marker = [row[:] for row in self.layout]
+        bits = int.from_bytes(record, "big")
+        for i, j in reversed(self.cells):
+            marker[i][j] = "*" if bits & 1 else "."
+            bits >>= 1
+        return GridPegSolitairePuzzle(marker, self.marker_set,
+                                      self.directions)
+
+
+def codec_for(puzzle):
+    """
+    Return a codec for puzzles like puzzle.
+
+    @type puzzle: Puzzle
+    @rtype: MNCodec | PegCodec
+    """
+    if isinstance(puzzle, MNPuzzle):
+        return MNCodec(puzzle)
+    if isinstance(puzzle, GridPegSolitairePuzzle):
+        return PegCodec(puzzle)
+    raise TypeError("no fixed-width codec for {}; pass codec=".format(
+        type(puzzle).__name__))
+
+
+def external_breadth_first_solve(puzzle, codec=None, workdir=None,
+                                 run_size=1 << 20, dedupe_layers=2,
+                                 keep_files=False, stats=None, budget=None):
+    """
+    Return a shortest path from PuzzleNode(puzzle) to a PuzzleNode
+    containing a solution, keeping the search on disk.  Return None if
+    this is not possible.
+
+    codec packs puzzles into fixed-width bytes and back; it must have
+    width, encode(puzzle) and decode(record), and defaults to
+    codec_for(puzzle).  Level files go in a fresh directory under
+    workdir (default: the system temporary directory), removed at the
+    end unless keep_files.  At most run_size children are held in
+    memory before being sorted into a run file.
+
+    New states are checked only against the dedupe_layers levels before
+    them.  Two is enough when every move can be undone, as in MNPuzzle,
+    or always leads further from the start, as in peg solitaire.
+
+    The path is rebuilt backwards: for each level, from the solution
+    up, the level before it is scanned for a parent of the state found.
+
+    @type puzzle: Puzzle
+    @type codec: MNCodec | PegCodec | None
+    @type workdir: str | None
+    @type run_size: int
+    @type dedupe_layers: int
+    @type keep_files: bool
+    @type stats: SolverStats | None
+    @type budget: Budget | None
+    @rtype: PuzzleNode | None
+
+    >>> from puzzle_tools import breadth_first_solve
+    >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> p = MNPuzzle(start_grid, target_grid)
+    >>> path = external_breadth_first_solve(p, run_size=8).path()
+    >>> len(path) == len(breadth_first_solve(p).path())
+    True
+    """
+    start = perf_counter()
+    if budget is not None:
+        budget.start()
+    codec = codec or codec_for(puzzle)
+    directory = tempfile.mkdtemp(prefix="bfs-", dir=workdir)
+    try:
+        return _external_breadth_first(puzzle, codec, directory, run_size,
+                                       dedupe_layers, stats, budget)
+    finally:
+        if not keep_files:
+            shutil.rmtree(directory, ignore_errors=True)
+        if stats is not None:
+            stats.elapsed += perf_counter() - start
+
+
+def _external_breadth_first(puzzle, codec, directory, run_size,
+                            dedupe_layers, stats, budget):
+    # Body of external_breadth_first_solve, working in directory.
+    #
+    # @rtype: PuzzleNode | None
+    if puzzle.is_solved():
+        return PuzzleNode(puzzle)
+    width = codec.width
+    layers = [os.path.join(directory, "layer-0.bin")]
+    _write_records(layers[0], [codec.encode(puzzle)])
+    total = 1
+    while True:
+        depth = len(layers) - 1
+        runs, buffer, goal = [], [], None
+        for record in _read_records(layers[depth], width):
+            if budget is not None:
+                budget.tick()
+            if stats is not None:
+                stats.nodes_expanded += 1
+            for child in codec.decode(record).iter_extensions():
+                encoded = codec.encode(child)
+                if child.is_solved():
+                    goal = encoded
+                    break
+                buffer.append(encoded)
+            if goal is not None:
+                break
+            if len(buffer) >= run_size:
+                runs.append(_write_run(directory, len(runs), buffer))
+                buffer = []
+        if goal is not None:
+            return _backtrack(codec, layers, goal)
+        if buffer:
+            runs.append(_write_run(directory, len(runs), buffer))
+        generated = sum(os.path.getsize(run) for run in runs) // width
+        layers.append(os.path.join(directory,
+                                   "layer-{}.bin".format(depth + 1)))
+        count = _write_records(layers[-1], _difference(
+            _merge([_read_records(run, width) for run in runs]),
+            [_read_records(layer, width)
+             for layer in layers[-1 - dedupe_layers:-1]]))
+        for run in runs:
+            os.remove(run)
+        total += count
+        if stats is not None:
+            stats.nodes_generated += generated
+            stats.duplicates_pruned += generated - count
+            stats.max_frontier = max(stats.max_frontier, count)
+            stats.peak_visited = total
+        if count == 0:
+            return None
+
+
+def _backtrack(codec, layers, goal):
+    # Return the PuzzleNode path from the state in layers[0] to goal, a
+    # child of some state in the last of layers.
+    #
+    # @type layers: list[str]
+    # @type goal: bytes
+    # @rtype: PuzzleNode
+    path, target = [codec.decode(goal)], goal
+    for layer in reversed(layers):
+        for record in _read_records(layer, codec.width):
+            parent = codec.decode(record)
+            if any(codec.encode(child) == target
+                   for child in parent.iter_extensions()):
+                path.append(parent)
+                target = record
+                break
+    path.reverse()
+    return PuzzleNode.from_path(path)
+
+
+def _write_run(directory, number, buffer):
+    # Sort buffer, drop duplicates, write it to a new run file and
+    # return the file's path.
+    #
+    # @type directory: str
+    # @type number: int
+    # @type buffer: list[bytes]
+    # @rtype: str
+    path = os.path.join(directory, "run-{}.bin".format(number))
+    _write_records(path, sorted(set(buffer)))
+    return path
+
+
+def _write_records(path, records):
+    # Write records to the file at path and return how many there were.
+    #
+    # @type path: str
+    # @type records: iterable[bytes]
+    # @rtype: int
+    count = 0
+    with open(path, "wb", buffering=_CHUNK) as out:
+        for record in records:
+            out.write(record)
+            count += 1
+    return count
+
+
+def _read_records(path, width):
+    # Yield the width-byte records of the file at path in order.
+    #
+    # @type path: str
+    # @type width: int
+    # @rtype: iterator[bytes]
+    size = max(1, _CHUNK // width) * width
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            for i in range(0, len(chunk), width):
+                yield chunk[i:i + width]
+
+
+def _merge(sources):
+    # Yield the union of the sorted record iterators sources, in order
+    # and without duplicates.
+    #
+    # @type sources: list[iterator[bytes]]
+    # @rtype: iterator[bytes]
+    last = None
+    for record in heapq.merge(*sources):
+        if record != last:
+            yield record
+            last = record
+
+
+def _difference(records, excluded):
+    # Yield the sorted records that appear in none of the sorted
+    # iterators in excluded.
+    #
+    # @type records: iterator[bytes]
+    # @type excluded: list[iterator[bytes]]
+    # @rtype: iterator[bytes]
+    heads = [next(source, None) for source in excluded]
+    for record in records:
+        found = False
+        for i, source in enumerate(excluded):
+            while heads[i] is not None and heads[i] < record:
+                heads[i] = next(source, None)
+            if heads[i] == record:
+                found = True
+        if not found:
+            yield record
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -1,4 +1,147 @@
 from puzzle import Puzzle
+from puzzle_codec import (read_cells, read_signed, read_varint, write_cells,
+                          write_signed, write_varint)
+
+# directions a peg may jump in, as the step from the hole it lands in
+# towards the peg that jumps: pegs below, above, right and left
+ORTHOGONAL = ((-1, 0), (1, 0), (0, 1), (0, -1))
+# a triangular board drawn left-justified, row i having i + 1 cells,
+# also has jumps along one diagonal
+TRIANGULAR = ORTHOGONAL + ((-1, -1), (1, 1))
+
+# (layout, directions) -> jump table
+_jump_tables = {}
+# cell markers in the order to_bytes numbers them
+_CELLS = "#.*"
+
+
+def jump_table(marker, directions=ORTHOGONAL):
+    """
+    Return the jumps possible on a board laid out like marker, where "#"
+    marks unused cells: a (jumper and jumped-over mask, hole mask, mask
+    of all three, move) tuple for each, masks being bits of the key()
+    bitboard and move the triple of (row, column) cells used by apply.
+
+    Tables are built once per layout and direction set.  They list jumps
+    by landing hole, in the order iter_extensions has always used.
+
+    @type marker: list[list[str]]
+    @type directions: tuple[(int, int)]
+    @rtype: list[(int, int, int, ((int, int), (int, int), (int, int)))]
+
+    >>> [jump[:3] for jump in jump_table([["*", "*", "."]])]
+    [(6, 1, 7), (3, 4, 7)]
+    >>> len(jump_table([["#", "*", "*", "."]]))
+    2
+    """
+    layout = tuple("".join("#" if x == "#" else "." for x in row)
+                   for row in marker)
+    table = _jump_tables.get((layout, directions))
+    if table is None:
+        height, width = len(layout), len(layout[0])
+        table = []
+        for i in range(height):
+            for j in range(width):
+                for di, dj in directions:
+                    cells = [(i + 2 * di, j + 2 * dj), (i + di, j + dj),
+                             (i, j)]
+                    if all(0 <= a < height and 0 <= b < width and
+                           layout[a][b] != "#" for a, b in cells):
+                        f, o, t = [1 << (a * width + b) for a, b in cells]
+                        table.append((f | o, t, f | o | t, tuple(cells)))
+        _jump_tables[layout, directions] = table
+    return table
+
+
+def rectangular_board(rows, columns, hole=(0, 0)):
+    """
+    Return a rows x columns GridPegSolitairePuzzle full of pegs except
+    at hole.
+
+    @type rows: int
+    @type columns: int
+    @type hole: (int, int)
+    @rtype: GridPegSolitairePuzzle
+
+    >>> print(rectangular_board(2, 3, (1, 1)))
+    ***
+    *.*
+    """
+    return _board(["*" * columns] * rows, hole)
+
+
+def english_board(hole=(3, 3)):
+    """
+    Return the 33-hole English cross board, full of pegs except at hole.
+
+    @type hole: (int, int)
+    @rtype: GridPegSolitairePuzzle
+
+    >>> print(english_board())
+    ##***##
+    ##***##
+    *******
+    ***.***
+    *******
+    ##***##
+    ##***##
+    """
+    return _board(["##***##", "##***##", "*******", "*******", "*******",
+                   "##***##", "##***##"], hole)
+
+
+def european_board(hole=(2, 3)):
+    """
+    Return the 37-hole European board, full of pegs except at hole.
+    Its centre hole cannot be solved to one peg, hence the default.
+
+    @type hole: (int, int)
+    @rtype: GridPegSolitairePuzzle
+
+    >>> print(european_board())
+    ##***##
+    #*****#
+    ***.***
+    *******
+    *******
+    #*****#
+    ##***##
+    """
+    return _board(["##***##", "#*****#", "*******", "*******", "*******",
+                   "#*****#", "##***##"], hole)
+
+
+def triangular_board(size=5, hole=(0, 0)):
+    """
+    Return a triangular board with size rows, full of pegs except at
+    hole.  Row i is drawn as its i + 1 cells on the left, so the six
+    jump directions of the triangle are TRIANGULAR.
+
+    @type size: int
+    @type hole: (int, int)
+    @rtype: GridPegSolitairePuzzle
+
+    >>> print(triangular_board(3))
+    .##
+    **#
+    ***
+    """
+    return _board(["*" * (i + 1) + "#" * (size - i - 1)
+                   for i in range(size)], hole, TRIANGULAR)
+
+
+def _board(rows, hole, directions=ORTHOGONAL):
+    # Return a GridPegSolitairePuzzle from row strings, with the peg at
+    # hole removed.
+    #
+    # @type rows: list[str]
+    # @type hole: (int, int)
+    # @type directions: tuple[(int, int)]
+    # @rtype: GridPegSolitairePuzzle
+    marker = [list(row) for row in rows]
+    assert marker[hole[0]][hole[1]] == "*"
+    marker[hole[0]][hole[1]] = "."
+    return GridPegSolitairePuzzle(marker, {"*", ".", "#"}, directions)
 
 
 class GridPegSolitairePuzzle(Puzzle):
@@ -7,7 +150,7 @@ class GridPegSolitairePuzzle(Puzzle):
     unsolved, or even unsolvable.
     """
 
-    def __init__(self, marker, marker_set):
+    def __init__(self, marker, marker_set, directions=ORTHOGONAL):
         """
         Create a new GridPegSolitairePuzzle self with
         marker indicating pegs, spaces, and unused
@@ -16,6 +159,8 @@ class GridPegSolitairePuzzle(Puzzle):
         @type marker: list[list[str]]
         @type marker_set: set[str]
                           "#" for unused, "*" for peg, "." for empty
+        @type directions: tuple[(int, int)]
+                          ORTHOGONAL, or TRIANGULAR for triangular boards
         """
         assert isinstance(marker, list)
         assert len(marker) > 0
@@ -23,6 +168,12 @@ class GridPegSolitairePuzzle(Puzzle):
         assert all([all(x in marker_set for x in row) for row in marker])
         assert all([x == "*" or x == "." or x == "#" for x in marker_set])
         self._marker, self._marker_set = marker, marker_set
+        self._directions = directions
+        # pegs as a bitboard, bit i * width + j for cell (i, j), made on
+        # first use and kept up to date by apply and undo
+        self._bits = None
+        # jump_table for this layout, looked up on first use
+        self._jumps = None
 
     # implement __eq__, __str__ methods
     def __str__(self):
@@ -82,7 +233,8 @@ class GridPegSolitairePuzzle(Puzzle):
         """
         return (type(self) == type(other) and
                 self._marker == other._marker and
-                self._marker_set == other._marker_set)
+                self._marker_set == other._marker_set and
+                self._directions == other._directions)
 
     # override extensions
     # legal extensions consist of all configurations that can be reached by
@@ -109,45 +261,32 @@ class GridPegSolitairePuzzle(Puzzle):
         >>> all([s in L1 for s in L2])
         True
         """
-        # convenient names
-        marker, marker_set = self._marker, self._marker_set
-        if self.is_solved():
-            # return an empty list
-            return []
-        else:
-            result = []
-            for i in range(len(marker)):
-                for j in range(len(marker[i])):
-                    if marker[i][j] == ".":
-                        if i - 2 >= 0 and marker[i - 2][j] == "*":
-                            if marker[i - 1][j] == "*":
-                                copy1 = [x[:] for x in marker]
-                                copy1[i - 2][j] = "."
-                                copy1[i - 1][j] = "."
-                                copy1[i][j] = "*"
-                                result.append(GridPegSolitairePuzzle(copy1, {"*", ".", "#"}))
-                        if i + 2 < len(marker) and marker[i + 2][j] == "*":
-                            if marker[i + 1][j] == "*":
-                                copy2 = [x[:] for x in marker]
-                                copy2[i + 2][j] = "."
-                                copy2[i + 1][j] = "."
-                                copy2[i][j] = "*"
-                                result.append(GridPegSolitairePuzzle(copy2, {"*", ".", "#"}))
-                        if j + 2 < len(marker[i]) and marker[i][j + 2] == "*":
-                            if marker[i][j + 1] == "*":
-                                copy3 = [x[:] for x in marker]
-                                copy3[i][j + 2] = "."
-                                copy3[i][j + 1] = "."
-                                copy3[i][j] = "*"
-                                result.append(GridPegSolitairePuzzle(copy3, {"*", ".", "#"}))
-                        if j - 2 >= 0 and marker[i][j - 2] == "*":
-                            if marker[i][j - 1] == "*":
-                                copy4 = [x[:] for x in marker]
-                                copy4[i][j - 2] = "."
-                                copy4[i][j - 1] = "."
-                                copy4[i][j] = "*"
-                                result.append(GridPegSolitairePuzzle(copy4, {"*", ".", "#"}))
-            return result
+        return list(self.iter_extensions())
+
+    def iter_extensions(self):
+        """
+        Yield the extensions of GridPegSolitairePuzzle self one at a time,
+        in the same order as extensions().
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: iterator[GridPegSolitairePuzzle]
+
+        >>> grid = [["*", "*", "."]]
+        >>> g = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> print(next(g.iter_extensions()))
+        ..*
+        """
+        bits = self.key()
+        for move in self.moves():
+            marker = [row[:] for row in self._marker]
+            (fi, fj), (oi, oj), (ti, tj) = move
+            marker[fi][fj] = marker[oi][oj] = "."
+            marker[ti][tj] = "*"
+            child = GridPegSolitairePuzzle(marker, self._marker_set,
+                                           self._directions)
+            child._jumps = self._jumps
+            child._bits = bits ^ self._flip_mask(move)
+            yield child
 
     # override is_solved
     # A configuration is solved when there is exactly one "*" left
@@ -169,14 +308,175 @@ class GridPegSolitairePuzzle(Puzzle):
         >>> a.is_solved()
         True
         """
-        num = 0
-        for row in self._marker:
-            for item in row:
-                if item == "*":
-                    num += 1
-        if num == 1:
-            return True
-        return False
+        bits = self.key()
+        return bits != 0 and bits & (bits - 1) == 0
+
+    def moves(self):
+        """
+        Return the legal jumps of GridPegSolitairePuzzle self, in the
+        same order as iter_extensions(); each is the (row, column) of the
+        jumping peg, the peg jumped over and the hole landed in.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: list[((int, int), (int, int), (int, int))]
+
+        >>> g = GridPegSolitairePuzzle([["*", "*", "."]], {"*", ".", "#"})
+        >>> g.moves()
+        [((0, 0), (0, 1), (0, 2))]
+        >>> g.apply(g.moves()[0])
+        >>> print(g)
+        ..*
+        >>> g.is_solved(), g.key()
+        (True, 4)
+        >>> g.undo(((0, 0), (0, 1), (0, 2)))
+        >>> print(g)
+        **.
+        """
+        if self.is_solved():
+            return []
+        if self._jumps is None:
+            self._jumps = jump_table(self._marker, self._directions)
+        bits = self._bits
+        return [move for pair, hole, _, move in self._jumps
+                if bits & pair == pair and not bits & hole]
+
+    def apply(self, move):
+        """
+        Make the jump move, one of self.moves().
+
+        @type self: GridPegSolitairePuzzle
+        @type move: ((int, int), (int, int), (int, int))
+        @rtype: None
+        """
+        (fi, fj), (oi, oj), (ti, tj) = move
+        marker = self._marker
+        marker[fi][fj] = marker[oi][oj] = "."
+        marker[ti][tj] = "*"
+        self._flip(move)
+
+    def undo(self, move):
+        """
+        Take back move, the last jump applied to GridPegSolitairePuzzle
+        self.
+
+        @type self: GridPegSolitairePuzzle
+        @type move: ((int, int), (int, int), (int, int))
+        @rtype: None
+        """
+        (fi, fj), (oi, oj), (ti, tj) = move
+        marker = self._marker
+        marker[fi][fj] = marker[oi][oj] = "*"
+        marker[ti][tj] = "."
+        self._flip(move)
+
+    def _flip(self, move):
+        # Flip the bits of the three cells of move in self._bits, if
+        # it has been made.
+        #
+        # @type self: GridPegSolitairePuzzle
+        # @type move: ((int, int), (int, int), (int, int))
+        # @rtype: None
+        if self._bits is not None:
+            self._bits ^= self._flip_mask(move)
+
+    def _flip_mask(self, move):
+        # Return the bitboard mask of the three cells of move.
+        #
+        # @type self: GridPegSolitairePuzzle
+        # @type move: ((int, int), (int, int), (int, int))
+        # @rtype: int
+        width = len(self._marker[0])
+        return sum(1 << (i * width + j) for i, j in move)
+
+    def key(self):
+        """
+        Return the pegs of GridPegSolitairePuzzle self as a bitboard.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: int
+        """
+        if self._bits is None:
+            bits, width = 0, len(self._marker[0])
+            for i, row in enumerate(self._marker):
+                for j, item in enumerate(row):
+                    if item == "*":
+                        bits |= 1 << (i * width + j)
+            self._bits = bits
+        return self._bits
+
+    def copy(self):
+        """
+        Return a copy of GridPegSolitairePuzzle self.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: GridPegSolitairePuzzle
+        """
+        puzzle = GridPegSolitairePuzzle([row[:] for row in self._marker],
+                                        self._marker_set, self._directions)
+        puzzle._jumps, puzzle._bits = self._jumps, self._bits
+        return puzzle
+
+    def to_bytes(self):
+        """
+        Return GridPegSolitairePuzzle self packed as bytes: its rows and
+        columns, its marker set, its directions, then each cell at two
+        bits, its index in "#.*".
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: bytes
+
+        >>> g = english_board()
+        >>> data = g.to_bytes()
+        >>> len(data), GridPegSolitairePuzzle.from_bytes(data) == g
+        (25, True)
+        """
+        out = bytearray()
+        write_varint(out, len(self._marker))
+        write_varint(out, len(self._marker[0]))
+        out.append(sum(1 << _CELLS.index(x) for x in self._marker_set))
+        write_varint(out, len(self._directions))
+        for di, dj in self._directions:
+            write_signed(out, di)
+            write_signed(out, dj)
+        write_cells(out, [_CELLS.index(x) for row in self._marker
+                          for x in row], 2)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Return the GridPegSolitairePuzzle packed into data by to_bytes.
+
+        @type data: bytes
+        @rtype: GridPegSolitairePuzzle
+        """
+        rows, pos = read_varint(data, 0)
+        columns, pos = read_varint(data, pos)
+        if pos >= len(data):
+            raise ValueError("truncated board")
+        marker_set = {x for i, x in enumerate(_CELLS) if data[pos] >> i & 1}
+        count, pos = read_varint(data, pos + 1)
+        directions = []
+        for _ in range(count):
+            di, pos = read_signed(data, pos)
+            dj, pos = read_signed(data, pos)
+            directions.append((di, dj))
+        cells, pos = read_cells(data, pos, rows * columns, 2)
+        if max(cells, default=0) >= len(_CELLS):
+            raise ValueError("bad peg board cell")
+        marker = [[_CELLS[v] for v in cells[r:r + columns]]
+                  for r in range(0, rows * columns, columns)]
+        return cls(marker, marker_set, tuple(directions))
+
+    def __reduce__(self):
+        """
+        Return how to pickle GridPegSolitairePuzzle self: as its
+        to_bytes() form.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: tuple
+        """
+        return type(self).from_bytes, (self.to_bytes(),)
 
     # def fail_fast(self):
     #     """
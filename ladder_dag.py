@@ -0,0 +1,250 @@
+"""
+Every shortest word ladder between two words.
+
+Words are adjacent when they differ in one letter, any letter of the
+alphabet.  A bidirectional breadth-first search, growing whichever side
+has the smaller frontier, finds the layer where the two searches meet;
+the words and links that lie on a shortest ladder through it are kept
+as a layered DAG, and the rest of the search is dropped.  The number of
+ladders is counted over the DAG without listing them, and they are
+listed lazily, one path at a time, so memory stays proportional to the
+DAG however many ladders there are.
+"""
+from string import ascii_lowercase
+
+ALPHABET = ascii_lowercase
+
+
+class LadderDAG:
+    """
+    The shortest ladders from one word to another, as a layered DAG.
+
+    length is the number of steps in each ladder, or None if there is
+    no ladder; layers[i] are the sorted words i steps from from_word on
+    some shortest ladder; succ maps each of them but to_word to the
+    sorted words it may step to next.
+    """
+
+    def __init__(self, from_word, to_word, ws, alphabet=ALPHABET,
+                 stats=None, budget=None):
+        """
+        Create the LadderDAG self of the shortest ladders from from_word
+        to to_word through words in ws.
+
+        If stats is a SolverStats it is filled in as the search runs.  If
+        budget is a Budget, BudgetExhausted is raised once it runs out.
+
+        @type self: LadderDAG
+        @type from_word: str
+        @type to_word: str
+        @type ws: set[str]
+        @type alphabet: str
+        @type stats: SolverStats | None
+        @type budget: Budget | None
+        @rtype: None
+
+        >>> ws = {"cat", "cot", "cog", "dog", "dot", "cag"}
+        >>> dag = LadderDAG("cat", "dog", ws)
+        >>> dag.length, dag.layers
+        (3, [['cat'], ['cag', 'cot'], ['cog', 'dot'], ['dog']])
+        >>> LadderDAG("cat", "emu", ws).length is None
+        True
+        """
+        self.from_word, self.to_word = from_word, to_word
+        self.length, self.layers, self.succ = None, [], {}
+        self._counts = None
+        if budget is not None:
+            budget.start()
+        if from_word == to_word:
+            self.length, self.layers = 0, [[from_word]]
+            return
+        if len(from_word) != len(to_word) or to_word not in ws:
+            return
+        # the words each word was reached from, searching forward, and
+        # those it leads to, searching back from to_word
+        parents, onward = {from_word: []}, {to_word: []}
+        front, back = [from_word], [to_word]
+        meet = []
+        while front and back and not meet:
+            forward = len(front) <= len(back)
+            layer = _expand(front if forward else back,
+                            parents if forward else onward, ws, from_word,
+                            alphabet, stats, budget)
+            if forward:
+                parents.update(layer)
+                front = list(layer)
+                meet = [word for word in layer if word in onward]
+            else:
+                onward.update(layer)
+                back = list(layer)
+                meet = [word for word in layer if word in parents]
+            if stats is not None:
+                stats.max_frontier = max(stats.max_frontier, len(layer))
+                stats.peak_visited = len(parents) + len(onward)
+        if meet:
+            self._keep(meet, parents, onward)
+
+    def _keep(self, meet, parents, onward):
+        # Keep the links of the searches that lie on a ladder through a
+        # word of meet, and lay out their words in layers.
+        #
+        # @type self: LadderDAG
+        # @type meet: list[str]
+        # @type parents: dict[str, list[str]]
+        # @type onward: dict[str, list[str]]
+        # @rtype: None
+        succ, todo, seen = {}, list(meet), set(meet)
+        while todo:
+            word = todo.pop()
+            for parent in parents[word]:
+                succ.setdefault(parent, set()).add(word)
+                if parent not in seen:
+                    seen.add(parent)
+                    todo.append(parent)
+        todo, seen = list(meet), set(meet)
+        while todo:
+            word = todo.pop()
+            if onward[word]:
+                succ[word] = set(onward[word])
+            for child in onward[word]:
+                if child not in seen:
+                    seen.add(child)
+                    todo.append(child)
+        self.succ = {word: sorted(children)
+                     for word, children in succ.items()}
+        layer = [self.from_word]
+        while layer != [self.to_word]:
+            self.layers.append(layer)
+            layer = sorted({child for word in layer
+                            for child in self.succ[word]})
+        self.layers.append(layer)
+        self.length = len(self.layers) - 1
+
+    def count(self):
+        """
+        Return the number of shortest ladders in LadderDAG self, counted
+        over the DAG without listing them.
+
+        @type self: LadderDAG
+        @rtype: int
+
+        >>> ws = {"cat", "cot", "cog", "dog", "dot", "cag"}
+        >>> LadderDAG("cat", "dog", ws).count()
+        3
+        >>> LadderDAG("cat", "cat", ws).count()
+        1
+        """
+        if self.length is None:
+            return 0
+        return self._ladder_counts()[self.from_word]
+
+    def _ladder_counts(self):
+        # Return the number of ladders from each word of LadderDAG self
+        # to to_word, working back a layer at a time.
+        #
+        # @type self: LadderDAG
+        # @rtype: dict[str, int]
+        if self._counts is None:
+            counts = {self.to_word: 1}
+            for layer in reversed(self.layers[:-1]):
+                for word in layer:
+                    counts[word] = sum(counts[child]
+                                       for child in self.succ[word])
+            self._counts = counts
+        return self._counts
+
+    def __iter__(self):
+        """
+        Yield each shortest ladder of LadderDAG self as a tuple of words,
+        in alphabetical order, one at a time.
+
+        @type self: LadderDAG
+        @rtype: iterator[tuple[str]]
+
+        >>> ws = {"cat", "cot", "cog", "dog", "dot", "cag"}
+        >>> for ladder in LadderDAG("cat", "dog", ws):
+        ...     print(" ".join(ladder))
+        cat cag cog dog
+        cat cot cog dog
+        cat cot dot dog
+        """
+        if self.length is None:
+            return
+        if self.length == 0:
+            yield (self.from_word,)
+            return
+        path, stack = [self.from_word], [iter(self.succ[self.from_word])]
+        while stack:
+            word = next(stack[-1], None)
+            if word is None:
+                stack.pop()
+                path.pop()
+            elif word == self.to_word:
+                yield tuple(path) + (word,)
+            else:
+                path.append(word)
+                stack.append(iter(self.succ[word]))
+
+    def ladder(self, index):
+        """
+        Return the ladder at position index in the order of iteration
+        over LadderDAG self, without listing those before it.
+
+        @type self: LadderDAG
+        @type index: int
+        @rtype: tuple[str]
+
+        >>> ws = {"cat", "cot", "cog", "dog", "dot", "cag"}
+        >>> LadderDAG("cat", "dog", ws).ladder(2)
+        ('cat', 'cot', 'dot', 'dog')
+        """
+        if not 0 <= index < self.count():
+            raise IndexError("ladder index out of range")
+        counts, path = self._ladder_counts(), [self.from_word]
+        while path[-1] != self.to_word:
+            for child in self.succ[path[-1]]:
+                if index < counts[child]:
+                    path.append(child)
+                    break
+                index -= counts[child]
+        return tuple(path)
+
+
+def _expand(frontier, visited, ws, from_word, alphabet, stats, budget):
+    # Return the next layer of a search from frontier: each word of ws,
+    # or from_word, one letter from a word of frontier and not in
+    # visited, mapped to the words of frontier it is one letter from.
+    #
+    # @type frontier: list[str]
+    # @type visited: dict[str, list[str]]
+    # @type ws: set[str]
+    # @type from_word: str
+    # @type alphabet: str
+    # @type stats: SolverStats | None
+    # @type budget: Budget | None
+    # @rtype: dict[str, list[str]]
+    layer = {}
+    for word in frontier:
+        if budget is not None:
+            budget.tick()
+        if stats is not None:
+            stats.nodes_expanded += 1
+        for i, letter in enumerate(word):
+            head, tail = word[:i], word[i + 1:]
+            for other in alphabet:
+                if other == letter:
+                    continue
+                near = head + other + tail
+                if near in visited or (near not in ws and near != from_word):
+                    continue
+                if stats is not None:
+                    stats.nodes_generated += 1
+                    if near in layer:
+                        stats.duplicates_pruned += 1
+                layer.setdefault(near, []).append(word)
+    return layer
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
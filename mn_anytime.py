@@ -0,0 +1,333 @@
+"""
+Anytime search for MNPuzzle boards too large to solve optimally.
+
+A bounded-width beam search, guided by the Manhattan distance of every
+symbol from its goal cell, finds a first solution quickly.  Weighted A*
+is then run with falling weights, each run pruning every board that
+cannot beat the best solution so far, until the deadline passes or a
+run proves the best solution shortest.  The best path found is kept on
+the AnytimeSearch and can be read at any time.
+
+Boards are bytes objects holding, for each cell, the cell its symbol
+has in the goal, as in mn_tables.
+"""
+import heapq
+from time import perf_counter
+
+from mn_puzzle import MNPuzzle
+from puzzle_tools import PuzzleNode
+from solver_budget import Budget, BudgetExhausted
+
+WEIGHTS = (5.0, 3.0, 2.0, 1.5, 1.25, 1.0)
+
+
+class AnytimeSearch:
+    """
+    A search for ever shorter solutions of one MNPuzzle.
+
+    best is the shortest solution found so far as a PuzzleNode path, or
+    None; best_length is its number of moves.  optimal becomes True once
+    best is known to be shortest, or known not to exist.  improvements
+    lists (seconds since run started, best_length) for each solution
+    found.
+    """
+
+    def __init__(self, puzzle, weights=WEIGHTS, beam_width=1000,
+                 on_improve=None):
+        """
+        Create a new AnytimeSearch self for puzzle, whose goal must have
+        distinct symbols, one of them "*".
+
+        @type self: AnytimeSearch
+        @type puzzle: MNPuzzle
+        @type weights: tuple[float]
+            weights of the heuristic in successive A* runs, ending at 1.0
+            to be able to prove a solution shortest
+        @type beam_width: int | None
+            boards kept per level of the first beam search, or None to
+            skip it
+        @type on_improve: callable | None
+            called with best each time a shorter solution is found
+        @rtype: None
+        """
+        if not isinstance(puzzle, MNPuzzle):
+            raise TypeError("anytime search only solves MNPuzzle")
+        symbols = [x for row in puzzle.to_grid for x in row]
+        if len(set(symbols)) != len(symbols) or "*" not in symbols:
+            raise ValueError("goal needs distinct symbols and a blank")
+        self.puzzle, self.weights = puzzle, weights
+        self.beam_width, self.on_improve = beam_width, on_improve
+        self.best, self.best_length = None, None
+        self.optimal, self.improvements = False, []
+        self._symbols = symbols
+        self._empty = symbols.index("*")
+        index = {x: i for i, x in enumerate(symbols)}
+        self._start = bytes(index[x] for row in puzzle.from_grid
+                            for x in row)
+        self._goal = bytes(range(len(symbols)))
+        n, m = puzzle.n, puzzle.m
+        self._targets = [[c for c, ok in ((c - m, c >= m),
+                                          (c + m, c + m < n * m),
+                                          (c - 1, c % m > 0),
+                                          (c + 1, c % m + 1 < m)) if ok]
+                         for c in range(n * m)]
+        self._distance = [[0 if v == self._empty else
+                           abs(c // m - v // m) + abs(c % m - v % m)
+                           for v in range(n * m)] for c in range(n * m)]
+        self._began = None
+
+    def heuristic(self, board):
+        """
+        Return the sum over the symbols of board, other than "*", of
+        their Manhattan distance from their goal cells.
+
+        @type self: AnytimeSearch
+        @type board: bytes
+        @rtype: int
+
+        >>> p = MNPuzzle((("2", "*", "3"), ("1", "4", "5")),
+        ...              (("1", "2", "3"), ("4", "5", "*")))
+        >>> search = AnytimeSearch(p)
+        >>> search.heuristic(search._start)
+        4
+        """
+        return sum(self._distance[c][v] for c, v in enumerate(board))
+
+    def solvable(self):
+        """
+        Return False if the permutation parity of the puzzle shows it has
+        no solution.  A True result is not a guarantee on boards only one
+        cell wide or high.
+
+        @type self: AnytimeSearch
+        @rtype: bool
+
+        >>> p = MNPuzzle((("2", "1", "3"), ("4", "5", "*")),
+        ...              (("1", "2", "3"), ("4", "5", "*")))
+        >>> AnytimeSearch(p).solvable()
+        False
+        """
+        board, seen, cycles = self._start, set(), 0
+        for c in range(len(board)):
+            if c not in seen:
+                cycles += 1
+                while c not in seen:
+                    seen.add(c)
+                    c = board[c]
+        # every slide swaps "*" with a neighbour, changing the parity of
+        # the permutation and of the distance of "*" from its goal cell
+        m, blank = self.puzzle.m, board.index(self._empty)
+        steps = abs(blank // m - self._empty // m) + abs(
+            blank % m - self._empty % m)
+        return (len(board) - cycles) % 2 == steps % 2
+
+    def run(self, timeout=None, stats=None, budget=None):
+        """
+        Search until timeout seconds have passed, budget runs out, or the
+        best solution is proven shortest, and return best.
+
+        timeout is only used when no budget is given.  Calling run again
+        after a timeout starts the search over, keeping best as a bound.
+
+        @type self: AnytimeSearch
+        @type timeout: float | None
+        @type stats: SolverStats | None
+        @type budget: Budget | None
+        @rtype: PuzzleNode | None
+
+        >>> p = MNPuzzle((("4", "1", "3"), ("*", "2", "5")),
+        ...              (("1", "2", "3"), ("4", "5", "*")))
+        >>> search = AnytimeSearch(p)
+        >>> len(search.run(timeout=5).path()) - 1, search.optimal
+        (4, True)
+        >>> search.best.path()[-1].is_solved()
+        True
+        """
+        start = perf_counter()
+        self._began = start
+        if budget is None and timeout is not None:
+            budget = Budget(timeout=timeout)
+        if budget is not None:
+            budget.start()
+        try:
+            if self._start == self._goal:
+                self._improve([self._start])
+                self.optimal = True
+            elif not self.solvable():
+                self.optimal = True
+            else:
+                if self.beam_width and self.best is None:
+                    self._beam(stats, budget)
+                for weight in self.weights:
+                    if self._weighted_a_star(weight, stats, budget):
+                        self.optimal = True
+                        break
+        except BudgetExhausted:
+            pass
+        finally:
+            if stats is not None:
+                stats.elapsed += perf_counter() - start
+        return self.best
+
+    def _moves(self, board, blank):
+        # Yield (child, blank of child, change in heuristic) for every
+        # board one slide of the blank away from board.
+        #
+        # @type self: AnytimeSearch
+        # @type board: bytes
+        # @type blank: int
+        # @rtype: generator
+        distance = self._distance
+        for target in self._targets[blank]:
+            v = board[target]
+            cells = bytearray(board)
+            cells[blank], cells[target] = v, self._empty
+            yield (bytes(cells), target,
+                   distance[blank][v] - distance[target][v])
+
+    def _beam(self, stats, budget):
+        # Search level by level from the start, keeping only the
+        # beam_width boards of each level nearest the goal, and record
+        # the first solution found.
+        #
+        # @type self: AnytimeSearch
+        # @type stats: SolverStats | None
+        # @type budget: Budget | None
+        # @rtype: None
+        parent = {self._start: None}
+        level = [(self.heuristic(self._start), self._start,
+                  self._start.index(self._empty))]
+        while level:
+            found = []
+            for h, board, blank in level:
+                if budget is not None:
+                    budget.tick()
+                if stats is not None:
+                    stats.nodes_expanded += 1
+                for child, target, change in self._moves(board, blank):
+                    if stats is not None:
+                        stats.nodes_generated += 1
+                    if child in parent:
+                        if stats is not None:
+                            stats.duplicates_pruned += 1
+                        continue
+                    parent[child] = board
+                    if child == self._goal:
+                        self._improve(_trace(parent, child))
+                        return
+                    found.append((h + change, child, target))
+            found.sort(key=lambda entry: entry[0])
+            level = found[:self.beam_width]
+            if stats is not None:
+                stats.max_frontier = max(stats.max_frontier, len(level))
+                stats.peak_visited = max(stats.peak_visited, len(parent))
+
+    def _weighted_a_star(self, weight, stats, budget):
+        # Run A* ordering boards by moves + weight * heuristic, pruning
+        # those that cannot beat best.  Record the first solution found
+        # and return False, or return True if there is none shorter than
+        # best.
+        #
+        # @type self: AnytimeSearch
+        # @type weight: float
+        # @type stats: SolverStats | None
+        # @type budget: Budget | None
+        # @rtype: bool
+        bound = self.best_length
+        h = self.heuristic(self._start)
+        parent, cost = {self._start: None}, {self._start: 0}
+        frontier = [(weight * h, h, 0, self._start,
+                     self._start.index(self._empty))]
+        while frontier:
+            _, h, g, board, blank = heapq.heappop(frontier)
+            if cost[board] < g:
+                continue
+            if board == self._goal:
+                self._improve(_trace(parent, board))
+                return weight == 1.0
+            if budget is not None:
+                budget.tick()
+            if stats is not None:
+                stats.nodes_expanded += 1
+            for child, target, change in self._moves(board, blank):
+                if stats is not None:
+                    stats.nodes_generated += 1
+                child_h = h + change
+                if ((bound is not None and g + 1 + child_h >= bound) or
+                        cost.get(child, g + 2) <= g + 1):
+                    if stats is not None:
+                        stats.duplicates_pruned += 1
+                    continue
+                parent[child], cost[child] = board, g + 1
+                heapq.heappush(frontier, (g + 1 + weight * child_h, child_h,
+                                          g + 1, child, target))
+            if stats is not None:
+                stats.max_frontier = max(stats.max_frontier, len(frontier))
+                stats.peak_visited = max(stats.peak_visited, len(cost))
+        return True
+
+    def _improve(self, boards):
+        # Make boards, a path from the start to the goal, the best
+        # solution if it is shorter.
+        #
+        # @type self: AnytimeSearch
+        # @type boards: list[bytes]
+        # @rtype: None
+        if (self.best_length is not None and
+                len(boards) - 1 >= self.best_length):
+            return
+        m, symbols = self.puzzle.m, self._symbols
+        path = [self.puzzle]
+        for board in boards[1:]:
+            cells = [symbols[v] for v in board]
+            path.append(MNPuzzle(tuple(tuple(cells[r:r + m])
+                                       for r in range(0, len(cells), m)),
+                                 self.puzzle.to_grid))
+        self.best, self.best_length = PuzzleNode.from_path(path), len(path) - 1
+        self.improvements.append((perf_counter() - self._began,
+                                  self.best_length))
+        if self.on_improve is not None:
+            self.on_improve(self.best)
+
+
+def _trace(parent, board):
+    # Return the boards from the start to board, following parent.
+    #
+    # @type parent: dict[bytes, bytes | None]
+    # @type board: bytes
+    # @rtype: list[bytes]
+    boards = []
+    while board is not None:
+        boards.append(board)
+        board = parent[board]
+    return boards[::-1]
+
+
+def anytime_solve(puzzle, timeout=1.0, stats=None, budget=None, **kwargs):
+    """
+    Return the shortest path from PuzzleNode(puzzle) to a PuzzleNode
+    containing a solution that AnytimeSearch finds within timeout
+    seconds, or None if it finds none.  Other keyword arguments are
+    passed to AnytimeSearch.
+
+    @type puzzle: MNPuzzle
+    @type timeout: float | None
+    @type stats: SolverStats | None
+    @type budget: Budget | None
+    @rtype: PuzzleNode | None
+
+    >>> p = MNPuzzle((("*", "5", "2"), ("1", "4", "3")),
+    ...              (("1", "2", "3"), ("4", "5", "*")))
+    >>> len(anytime_solve(p).path()) - 1
+    5
+    >>> p = MNPuzzle((("2", "1", "3"), ("4", "5", "*")),
+    ...              (("1", "2", "3"), ("4", "5", "*")))
+    >>> anytime_solve(p) is None
+    True
+    """
+    return AnytimeSearch(puzzle, **kwargs).run(timeout, stats, budget)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -1,4 +1,6 @@
 from puzzle import Puzzle
+from puzzle_codec import (cell_bits, read_cells, read_symbols, read_varint,
+                          write_cells, write_symbols, write_varint)
 
 
 class MNPuzzle(Puzzle):
@@ -23,7 +25,25 @@ class MNPuzzle(Puzzle):
         assert all([len(r) == len(from_grid[0]) for r in from_grid])
         assert all([len(r) == len(to_grid[0]) for r in to_grid])
         self.n, self.m = len(from_grid), len(from_grid[0])
-        self.from_grid, self.to_grid = from_grid, to_grid
+        self._from_grid, self.to_grid = from_grid, to_grid
+        # flat cells, position of "*" and flat goal, made on first use
+        # by moves, apply and undo, which keep them up to date instead
+        # of from_grid
+        self._cells = self._blank = self._goal = None
+
+    @property
+    def from_grid(self):
+        """
+        The current configuration of MNPuzzle self, as a tuple of rows.
+
+        @type self: MNPuzzle
+        @rtype: tuple[tuple[str]]
+        """
+        if self._from_grid is None:
+            cells, m = self._cells, self.m
+            self._from_grid = tuple(tuple(cells[r:r + m])
+                                    for r in range(0, len(cells), m))
+        return self._from_grid
 
     # implement __eq__ and __str__
     # __repr__ is up to you
@@ -88,51 +108,64 @@ class MNPuzzle(Puzzle):
         >>> print(len(L1))
         3
         """
+        return list(self.iter_extensions())
+
+    def iter_extensions(self):
+        """
+        Yield the extensions of MNPuzzle self one at a time, in the same
+        order as extensions().
+
+        @type self: MNPuzzle
+        @rtype: iterator[MNPuzzle]
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> start_grid = (("1", "2", "3"), ("4", "*", "5"))
+        >>> print(next(MNPuzzle(start_grid, target_grid).iter_extensions()))
+        1*3
+        425
+        """
         if self.is_solved():
-            return[]
-        else:
-            result = []
-            i, j = 0, 0
-            new_start_grid = [list(x) for x in self.from_grid]
-            for x in range(len(new_start_grid)):
-                for y in range(len(new_start_grid[x])):
-                    if new_start_grid[x][y] == "*":
-                        i = x
-                        j = y
-
-            if i - 1 >= 0:
-                # swap with the one above.
-                start1 = [x[:] for x in new_start_grid]
-                temp = start1[i - 1][j]
-                start1[i - 1][j] = "*"
-                start1[i][j] = temp
-                new_start = tuple(tuple(x for x in y) for y in start1)
-                result.append(MNPuzzle(new_start, self.to_grid))
-            if i + 1 < len(new_start_grid):
-                # swap with the one below.
-                start2 = [x[:] for x in new_start_grid]
-                temp = start2[i + 1][j]
-                start2[i + 1][j] = "*"
-                start2[i][j] = temp
-                new_start = tuple(tuple(x for x in y) for y in start2)
-                result.append(MNPuzzle(new_start, self.to_grid))
-            if j - 1 >= 0:
-                # swap with the one to the left.
-                start3 = [x[:] for x in new_start_grid]
-                temp = start3[i][j - 1]
-                start3[i][j - 1] = "*"
-                start3[i][j] = temp
-                new_start = tuple(tuple(x for x in y) for y in start3)
-                result.append(MNPuzzle(new_start, self.to_grid))
-            if j + 1 < len(new_start_grid[i]):
-                # swap with the one to the right.
-                start4 = [x[:] for x in new_start_grid]
-                temp = start4[i][j + 1]
-                start4[i][j + 1] = "*"
-                start4[i][j] = temp
-                new_start = tuple(tuple(x for x in y) for y in start4)
-                result.append(MNPuzzle(new_start, self.to_grid))
-            return result
+            return
+        i, j = 0, 0
+        new_start_grid = [list(x) for x in self.from_grid]
+        for x in range(len(new_start_grid)):
+            for y in range(len(new_start_grid[x])):
+                if new_start_grid[x][y] == "*":
+                    i = x
+                    j = y
+
+        if i - 1 >= 0:
+            # swap with the one above.
+            start1 = [x[:] for x in new_start_grid]
+            temp = start1[i - 1][j]
+            start1[i - 1][j] = "*"
+            start1[i][j] = temp
+            new_start = tuple(tuple(x for x in y) for y in start1)
+            yield MNPuzzle(new_start, self.to_grid)
+        if i + 1 < len(new_start_grid):
+            # swap with the one below.
+            start2 = [x[:] for x in new_start_grid]
+            temp = start2[i + 1][j]
+            start2[i + 1][j] = "*"
+            start2[i][j] = temp
+            new_start = tuple(tuple(x for x in y) for y in start2)
+            yield MNPuzzle(new_start, self.to_grid)
+        if j - 1 >= 0:
+            # swap with the one to the left.
+            start3 = [x[:] for x in new_start_grid]
+            temp = start3[i][j - 1]
+            start3[i][j - 1] = "*"
+            start3[i][j] = temp
+            new_start = tuple(tuple(x for x in y) for y in start3)
+            yield MNPuzzle(new_start, self.to_grid)
+        if j + 1 < len(new_start_grid[i]):
+            # swap with the one to the right.
+            start4 = [x[:] for x in new_start_grid]
+            temp = start4[i][j + 1]
+            start4[i][j + 1] = "*"
+            start4[i][j] = temp
+            new_start = tuple(tuple(x for x in y) for y in start4)
+            yield MNPuzzle(new_start, self.to_grid)
 
     # override is_solved
     # a configuration is solved when from_grid is the same as to_grid
@@ -153,8 +186,187 @@ class MNPuzzle(Puzzle):
         >>> p2.is_solved()
         True
         """
+        if self._from_grid is None:
+            return self._cells == self._goal
         return self.from_grid == self.to_grid
 
+    def _flat(self):
+        # Return the flat list of cells of MNPuzzle self, making it and
+        # the flat goal on first use.
+        #
+        # @type self: MNPuzzle
+        # @rtype: list[str]
+        if self._cells is None:
+            self._cells = [x for row in self._from_grid for x in row]
+            self._blank = self._cells.index("*")
+            self._goal = [x for row in self.to_grid for x in row]
+        return self._cells
+
+    def moves(self):
+        """
+        Return the legal moves of MNPuzzle self, in the same order as
+        iter_extensions(); each is the position of "*" and the cell it
+        moves to, counted along rows.
+
+        @type self: MNPuzzle
+        @rtype: list[(int, int)]
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> p = MNPuzzle((("1", "2", "3"), ("4", "*", "5")), target_grid)
+        >>> p.moves()
+        [(4, 1), (4, 3), (4, 5)]
+        >>> p.apply((4, 5))
+        >>> p.is_solved(), p.key()
+        (True, ('1', '2', '3', '4', '5', '*'))
+        >>> p.undo((4, 5))
+        >>> print(p)
+        123
+        4*5
+        """
+        self._flat()
+        if self.is_solved():
+            return []
+        blank, m = self._blank, self.m
+        i, j = divmod(blank, m)
+        result = []
+        if i > 0:
+            result.append((blank, blank - m))
+        if i + 1 < self.n:
+            result.append((blank, blank + m))
+        if j > 0:
+            result.append((blank, blank - 1))
+        if j + 1 < m:
+            result.append((blank, blank + 1))
+        return result
+
+    def apply(self, move):
+        """
+        Slide "*" as given by move, one of self.moves().
+
+        @type self: MNPuzzle
+        @type move: (int, int)
+        @rtype: None
+        """
+        cells, (blank, target) = self._flat(), move
+        cells[blank], cells[target] = cells[target], "*"
+        self._blank, self._from_grid = target, None
+
+    def undo(self, move):
+        """
+        Take back move, the last move applied to MNPuzzle self.
+
+        @type self: MNPuzzle
+        @type move: (int, int)
+        @rtype: None
+        """
+        cells, (blank, target) = self._flat(), move
+        cells[target], cells[blank] = cells[blank], "*"
+        self._blank, self._from_grid = blank, None
+
+    def key(self):
+        """
+        Return the cells of MNPuzzle self as a tuple.
+
+        @type self: MNPuzzle
+        @rtype: tuple[str]
+        """
+        return tuple(self._flat())
+
+    def copy(self):
+        """
+        Return a copy of MNPuzzle self.
+
+        @type self: MNPuzzle
+        @rtype: MNPuzzle
+        """
+        return MNPuzzle(self.from_grid, self.to_grid)
+
+    def to_bytes(self):
+        """
+        Return MNPuzzle self packed as bytes: n and m, the sorted symbols
+        of the goal, then the goal and the current board as the index
+        of the symbol in each cell.
+
+        @type self: MNPuzzle
+        @rtype: bytes
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> p = MNPuzzle((("*", "2", "3"), ("1", "4", "5")), target_grid)
+        >>> len(p.to_bytes()), MNPuzzle.from_bytes(p.to_bytes()) == p
+        (21, True)
+        """
+        goal = [x for row in self.to_grid for x in row]
+        cells = [x for row in self.from_grid for x in row]
+        if len(goal) != len(cells):
+            raise ValueError("the goal is not the shape of the board")
+        if goal.count("*") != 1 or cells.count("*") != 1:
+            raise ValueError("a board needs exactly one blank")
+        symbols = sorted(set(goal))
+        bits = cell_bits(len(symbols))
+        index = {x: i for i, x in enumerate(symbols)}
+        out = bytearray()
+        write_varint(out, self.n)
+        write_varint(out, self.m)
+        write_symbols(out, symbols)
+        write_cells(out, [index[x] for x in goal], bits)
+        try:
+            write_cells(out, [index[x] for x in cells], bits)
+        except KeyError as e:
+            raise ValueError("symbol {} is not in the goal".format(e))
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Return the MNPuzzle packed into data by to_bytes.  Raise
+        ValueError if data is not a board packed that way.
+
+        @type data: bytes
+        @rtype: MNPuzzle
+
+        >>> MNPuzzle.from_bytes(b'\\x01\\x03\\x03\\x01*\\x011\\x012\\t\\x27')
+        Traceback (most recent call last):
+        ...
+        ValueError: bad MNPuzzle cell
+        >>> MNPuzzle.from_bytes(b'\\x01\\x03\\x03\\x01*\\x011\\x012\\t%')
+        Traceback (most recent call last):
+        ...
+        ValueError: a board needs exactly one blank
+        """
+        n, pos = read_varint(data, 0)
+        m, pos = read_varint(data, pos)
+        symbols, pos = read_symbols(data, pos)
+        bits = cell_bits(len(symbols))
+        grids = []
+        for _ in range(2):
+            cells, pos = read_cells(data, pos, n * m, bits)
+            if max(cells, default=0) >= len(symbols):
+                raise ValueError("bad MNPuzzle cell")
+            cells = [symbols[i] for i in cells]
+            if cells.count("*") != 1:
+                raise ValueError("a board needs exactly one blank")
+            grids.append(tuple(tuple(cells[r:r + m])
+                               for r in range(0, n * m, m)))
+        return cls(grids[1], grids[0])
+
+    def __reduce__(self):
+        """
+        Return how to pickle MNPuzzle self: as its to_bytes() form, or
+        as its grids if it cannot be packed that way.
+
+        @type self: MNPuzzle
+        @rtype: tuple
+
+        >>> import pickle
+        >>> p = MNPuzzle((("*", "x"),), (("1", "*"),))
+        >>> pickle.loads(pickle.dumps(p)) == p
+        True
+        """
+        try:
+            return type(self).from_bytes, (self.to_bytes(),)
+        except ValueError:
+            return type(self), (self.from_grid, self.to_grid)
+
 
 if __name__ == "__main__":
     import doctest
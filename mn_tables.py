@@ -0,0 +1,308 @@
+"""
+Exact distance tables for small MNPuzzle boards.
+
+A board of at most MAX_CELLS cells is a permutation of its goal, and is
+ranked into 0 .. (n*m)! - 1 by the linear-time method of Myrvold and
+Ruskey.  One breadth-first search backwards from the goal stores the
+distance of every reachable permutation in a bytearray indexed by rank,
+after which any board of that shape is solved optimally by stepping to
+a neighbour one move closer, without search.
+
+Tables depend only on the shape of the board and where the goal has its
+blank, and can be saved to and loaded from disk.
+"""
+import os
+import re
+from collections import deque
+from math import factorial
+
+from mn_puzzle import MNPuzzle
+from puzzle_tools import PuzzleNode
+
+# largest board, in cells, tables are built for: 9! bytes is 354 KiB
+MAX_CELLS = 9
+# distance of a permutation that cannot reach the goal
+UNREACHABLE = 255
+_MAGIC = b"MNDT"
+# name table_for saves the table for (n, m, blank) under
+_FILE_NAME = re.compile(r"mn-(\d+)x(\d+)-(\d+)\.bin")
+# tables already built or loaded, by (n, m, blank)
+_tables = {}
+
+
+def rank(perm):
+    """
+    Return the Myrvold-Ruskey rank of perm, a permutation of
+    range(len(perm)).
+
+    @type perm: list[int]
+    @rtype: int
+
+    >>> rank([0, 1, 2])
+    5
+    >>> sorted(rank(unrank(3, r)) for r in range(6))
+    [0, 1, 2, 3, 4, 5]
+    """
+    pi = list(perm)
+    inverse = [0] * len(pi)
+    for i, v in enumerate(pi):
+        inverse[v] = i
+    result, factor = 0, 1
+    for k in range(len(pi), 1, -1):
+        s, j = pi[k - 1], inverse[k - 1]
+        pi[k - 1], pi[j] = pi[j], pi[k - 1]
+        inverse[s], inverse[k - 1] = inverse[k - 1], inverse[s]
+        result += s * factor
+        factor *= k
+    return result
+
+
+def unrank(n, r):
+    """
+    Return the permutation of range(n) with Myrvold-Ruskey rank r.
+
+    @type n: int
+    @type r: int
+    @rtype: list[int]
+
+    >>> unrank(3, 5)
+    [0, 1, 2]
+    """
+    pi = list(range(n))
+    for k in range(n, 0, -1):
+        j = r % k
+        pi[k - 1], pi[j] = pi[j], pi[k - 1]
+        r //= k
+    return pi
+
+
+def _neighbours(n, m):
+    # Return, for each cell of an n by m board, the cells next to it.
+    #
+    # @type n: int
+    # @type m: int
+    # @rtype: list[list[int]]
+    result = []
+    for cell in range(n * m):
+        i, j = divmod(cell, m)
+        result.append([(i + di) * m + j + dj
+                       for di, dj in ((-1, 0), (1, 0), (0, -1), (0, 1))
+                       if 0 <= i + di < n and 0 <= j + dj < m])
+    return result
+
+
+class DistanceTable:
+    """
+    The number of moves from every n by m board to the goal with its
+    blank in cell blank, by the rank of the board as a permutation.
+    """
+
+    def __init__(self, n, m, blank, distances):
+        """
+        Create a new DistanceTable self.
+
+        @type self: DistanceTable
+        @type n: int
+        @type m: int
+        @type blank: int
+            cell of the blank in the goal, counted along rows
+        @type distances: bytearray
+            distances[rank(perm)], or UNREACHABLE
+        @rtype: None
+        """
+        self.n, self.m, self.blank = n, m, blank
+        self.distances = distances
+
+    @classmethod
+    def build(cls, n, m, blank):
+        """
+        Return the DistanceTable for n by m boards with the blank of the
+        goal in cell blank, found by breadth-first search from the goal.
+
+        @type n: int
+        @type m: int
+        @type blank: int
+        @rtype: DistanceTable
+
+        >>> table = DistanceTable.build(2, 2, 3)
+        >>> sorted(set(table.distances))
+        [0, 1, 2, 3, 4, 5, 6, 255]
+        """
+        cells = n * m
+        if cells > MAX_CELLS:
+            raise ValueError("{}x{} board has more than {} cells".format(
+                n, m, MAX_CELLS))
+        neighbours = _neighbours(n, m)
+        distances = bytearray([UNREACHABLE]) * factorial(cells)
+        goal = list(range(cells))
+        distances[rank(goal)] = 0
+        # each entry is a permutation and where its blank is
+        queue = deque([(goal, blank)])
+        while queue:
+            perm, at = queue.popleft()
+            distance = distances[rank(perm)] + 1
+            for cell in neighbours[at]:
+                child = perm[:]
+                child[at], child[cell] = child[cell], child[at]
+                r = rank(child)
+                if distances[r] == UNREACHABLE:
+                    distances[r] = distance
+                    queue.append((child, cell))
+        return cls(n, m, blank, distances)
+
+    def save(self, path):
+        """
+        Write DistanceTable self to the file at path.
+
+        @type self: DistanceTable
+        @type path: str
+        @rtype: None
+        """
+        with open(path, "wb") as out:
+            out.write(_MAGIC + bytes([self.n, self.m, self.blank]))
+            out.write(self.distances)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Return the DistanceTable saved in the file at path.
+
+        @type path: str
+        @rtype: DistanceTable
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(_MAGIC)] != _MAGIC:
+            raise ValueError("{} is not a distance table".format(path))
+        n, m, blank = data[len(_MAGIC):len(_MAGIC) + 3]
+        distances = bytearray(data[len(_MAGIC) + 3:])
+        if len(distances) != factorial(n * m):
+            raise ValueError("{} is truncated".format(path))
+        return cls(n, m, blank, distances)
+
+    def distance(self, puzzle):
+        """
+        Return the fewest moves that solve puzzle, or None if it cannot
+        be solved.
+
+        @type self: DistanceTable
+        @type puzzle: MNPuzzle
+        @rtype: int | None
+
+        >>> p = MNPuzzle((("*", "2", "3"), ("1", "4", "5")),
+        ...              (("1", "2", "3"), ("4", "5", "*")))
+        >>> table_for(p).distance(p)
+        3
+        """
+        distance = self.distances[rank(_permutation(puzzle))]
+        return None if distance == UNREACHABLE else distance
+
+    def solve(self, puzzle):
+        """
+        Return a shortest path from PuzzleNode(puzzle) to a PuzzleNode
+        containing a solution, or None if there is none, by moving to
+        an extension one step closer each time.
+
+        @type self: DistanceTable
+        @type puzzle: MNPuzzle
+        @rtype: PuzzleNode | None
+
+        >>> from puzzle_tools import breadth_first_solve
+        >>> p = MNPuzzle((("4", "5", "*"), ("1", "2", "3")),
+        ...              (("1", "2", "3"), ("4", "5", "*")))
+        >>> table_for(p).solve(p) == breadth_first_solve(p)
+        True
+        """
+        distance = self.distance(puzzle)
+        if distance is None:
+            return None
+        path = [puzzle]
+        while distance > 0:
+            distance -= 1
+            path.append(next(child for child in path[-1].iter_extensions()
+                             if self.distance(child) == distance))
+        return PuzzleNode.from_path(path)
+
+
+def _permutation(puzzle):
+    # Return puzzle as a permutation: for each cell, the cell its
+    # symbol has in the goal.
+    #
+    # @type puzzle: MNPuzzle
+    # @rtype: list[int]
+    goal = {x: i for i, x in enumerate(x for row in puzzle.to_grid
+                                       for x in row)}
+    return [goal[x] for row in puzzle.from_grid for x in row]
+
+
+def table_for(puzzle, directory=None):
+    """
+    Return the DistanceTable for boards shaped like puzzle, reusing one
+    already built or, if directory is given, saved there; a table built
+    here is saved to directory.
+
+    @type puzzle: MNPuzzle
+    @type directory: str | None
+    @rtype: DistanceTable
+    """
+    cells = [x for row in puzzle.to_grid for x in row]
+    if len(set(cells)) != len(cells) or "*" not in cells:
+        raise ValueError("goal needs distinct symbols and a blank")
+    key = (puzzle.n, puzzle.m, cells.index("*"))
+    table = _tables.get(key)
+    if table is None:
+        path = None
+        if directory is not None:
+            path = os.path.join(directory, "mn-{}x{}-{}.bin".format(*key))
+        if path is not None and os.path.exists(path):
+            table = DistanceTable.load(path)
+        else:
+            table = DistanceTable.build(*key)
+            if path is not None:
+                os.makedirs(directory, exist_ok=True)
+                table.save(path)
+        _tables[key] = table
+    return table
+
+
+def load_tables(directory):
+    """
+    Load every table table_for has saved to directory, so that later
+    calls reuse them, and return how many were loaded.
+
+    @type directory: str
+    @rtype: int
+    """
+    loaded = 0
+    for name in sorted(os.listdir(directory)):
+        match = _FILE_NAME.fullmatch(name)
+        if match is not None:
+            key = tuple(int(x) for x in match.groups())
+            if key not in _tables:
+                _tables[key] = DistanceTable.load(os.path.join(directory,
+                                                               name))
+                loaded += 1
+    return loaded
+
+
+def table_solve(puzzle, directory=None):
+    """
+    Return a shortest path from PuzzleNode(puzzle) to a PuzzleNode
+    containing a solution, or None if there is none, using the
+    DistanceTable from table_for(puzzle, directory).
+
+    @type puzzle: MNPuzzle
+    @type directory: str | None
+    @rtype: PuzzleNode | None
+
+    >>> p = MNPuzzle((("2", "1", "3"), ("4", "5", "*")),
+    ...              (("1", "2", "3"), ("4", "5", "*")))
+    >>> table_solve(p) is None
+    True
+    """
+    return table_for(puzzle, directory).solve(puzzle)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,183 @@
+"""
+Breadth-first search for MNPuzzle with whole levels as NumPy arrays.
+
+Each board is a row of cell values, the cell each symbol has in the
+goal, and is packed four bits a cell into one uint64, so boards of up
+to MAX_CELLS cells are supported.  A level is expanded by moving the
+blank in each direction for every board at once, then deduplicated with
+np.unique and a sorted array of every board seen so far.  Used by
+breadth_first_solve(puzzle, backend="numpy"); needs NumPy.
+"""
+from time import perf_counter
+
+import numpy as np
+
+from mn_puzzle import MNPuzzle
+from puzzle_tools import PuzzleNode
+
+MAX_CELLS = 16
+_SHIFTS = np.arange(MAX_CELLS, dtype=np.uint64) * np.uint64(4)
+
+
+def _pack(rows):
+    # Return the boards in rows, one per row, packed into uint64s.
+    #
+    # @type rows: numpy.ndarray
+    # @rtype: numpy.ndarray
+    cells = rows.shape[1]
+    return np.bitwise_or.reduce(rows.astype(np.uint64) << _SHIFTS[:cells],
+                                axis=1)
+
+
+def _unpack(states, cells):
+    # Return the packed boards in states as rows of cell values.
+    #
+    # @type states: numpy.ndarray
+    # @type cells: int
+    # @rtype: numpy.ndarray
+    return ((states[:, None] >> _SHIFTS[:cells]) &
+            np.uint64(15)).astype(np.uint8)
+
+
+def _targets(n, m):
+    # Return an array with, for each cell of an n by m board, the cell
+    # above, below, left and right of it, or -1 off the board.
+    #
+    # @type n: int
+    # @type m: int
+    # @rtype: numpy.ndarray
+    targets = np.full((n * m, 4), -1, dtype=np.intp)
+    for cell in range(n * m):
+        i, j = divmod(cell, m)
+        for d, (di, dj) in enumerate(((-1, 0), (1, 0), (0, -1), (0, 1))):
+            if 0 <= i + di < n and 0 <= j + dj < m:
+                targets[cell, d] = (i + di) * m + j + dj
+    return targets
+
+
+def vector_breadth_first_solve(puzzle, stats=None, budget=None):
+    """
+    Return a shortest path from PuzzleNode(puzzle) to a PuzzleNode
+    containing a solution, or None if there is none, searching a level
+    at a time with array operations.
+
+    The goal of puzzle must have distinct symbols, one of them "*".
+    stats and budget are as for breadth_first_solve; the budget is
+    charged a level at a time.
+
+    @type puzzle: MNPuzzle
+    @type stats: SolverStats | None
+    @type budget: Budget | None
+    @rtype: PuzzleNode | None
+
+    >>> from puzzle_tools import breadth_first_solve
+    >>> p = MNPuzzle((("4", "5", "*"), ("1", "2", "3")),
+    ...              (("1", "2", "3"), ("4", "5", "*")))
+    >>> solution = vector_breadth_first_solve(p)
+    >>> len(solution.path()) == len(breadth_first_solve(p).path())
+    True
+    >>> p = MNPuzzle((("2", "1", "3"), ("4", "5", "*")),
+    ...              (("1", "2", "3"), ("4", "5", "*")))
+    >>> vector_breadth_first_solve(p) is None
+    True
+    """
+    start = perf_counter()
+    if budget is not None:
+        budget.start()
+    try:
+        return _vector_breadth_first(puzzle, stats, budget)
+    finally:
+        if stats is not None:
+            stats.elapsed += perf_counter() - start
+
+
+def _vector_breadth_first(puzzle, stats, budget):
+    # Body of vector_breadth_first_solve.
+    #
+    # @type puzzle: MNPuzzle
+    # @type stats: SolverStats | None
+    # @type budget: Budget | None
+    # @rtype: PuzzleNode | None
+    if not isinstance(puzzle, MNPuzzle):
+        raise TypeError("the numpy backend only solves MNPuzzle")
+    symbols = [x for row in puzzle.to_grid for x in row]
+    cells = len(symbols)
+    if cells > MAX_CELLS:
+        raise ValueError("board has more than {} cells".format(MAX_CELLS))
+    if len(set(symbols)) != cells or "*" not in symbols:
+        raise ValueError("goal needs distinct symbols and a blank")
+    if puzzle.is_solved():
+        return PuzzleNode(puzzle)
+    index = {x: i for i, x in enumerate(symbols)}
+    blank = index["*"]
+    targets = _targets(puzzle.n, puzzle.m)
+    goal = _pack(np.arange(cells, dtype=np.uint8)[None, :])[0]
+    frontier = _pack(np.array([[index[x] for row in puzzle.from_grid
+                                for x in row]], dtype=np.uint8))
+    visited = frontier.copy()
+    # for each level after the first, its boards and the index of each
+    # one's parent in the level before
+    levels = [(frontier, None)]
+    while len(frontier):
+        if budget is not None:
+            budget.tick(len(frontier))
+        rows = _unpack(frontier, cells)
+        blanks = np.argmax(rows == blank, axis=1)
+        children, parents = [], []
+        for d in range(4):
+            to = targets[blanks, d]
+            ok = np.nonzero(to >= 0)[0]
+            moved = rows[ok]
+            at, to, k = blanks[ok], to[ok], np.arange(len(ok))
+            moved[k, at] = moved[k, to]
+            moved[k, to] = blank
+            children.append(_pack(moved))
+            parents.append(ok)
+        children = np.concatenate(children)
+        parents = np.concatenate(parents)
+        states, first = np.unique(children, return_index=True)
+        seen = np.searchsorted(visited, states)
+        seen[seen == len(visited)] = 0
+        new = visited[seen] != states
+        states, parents = states[new], parents[first[new]]
+        if stats is not None:
+            stats.nodes_expanded += len(frontier)
+            stats.nodes_generated += len(children)
+            stats.duplicates_pruned += len(children) - len(states)
+            stats.max_frontier = max(stats.max_frontier, len(states))
+            stats.peak_visited = len(visited) + len(states)
+        levels.append((states, parents))
+        found = np.nonzero(states == goal)[0]
+        if len(found):
+            return _backtrack(levels, int(found[0]), symbols, puzzle)
+        visited = np.sort(np.concatenate([visited, states]))
+        frontier = states
+    return None
+
+
+def _backtrack(levels, i, symbols, puzzle):
+    # Return the PuzzleNode path to board i of the last of levels.
+    #
+    # @type levels: list[(numpy.ndarray, numpy.ndarray | None)]
+    # @type i: int
+    # @type symbols: list[str]
+    # @type puzzle: MNPuzzle
+    # @rtype: PuzzleNode
+    states = []
+    for level, parents in reversed(levels[1:]):
+        states.append(level[i])
+        i = parents[i]
+    rows = _unpack(np.array(states[::-1], dtype=np.uint64), len(symbols))
+    m = puzzle.m
+    path = [puzzle]
+    for row in rows:
+        cells = [symbols[v] for v in row]
+        path.append(MNPuzzle(tuple(tuple(cells[r:r + m])
+                                   for r in range(0, len(cells), m)),
+                             puzzle.to_grid))
+    return PuzzleNode.from_path(path)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,144 @@
+"""
+A bounded table of puzzle states proven to have no solution.
+
+mutable_depth_first_solve stores the key of every state whose moves it
+has tried without success, and prunes a state whose key is found here
+instead of searching below it again.  Only sound for puzzles whose moves
+never lead back to an earlier state, like peg solitaire, searched with
+check_cycles=False.
+"""
+
+_MASK = (1 << 64) - 1
+# 2**64 divided by the golden ratio, for Fibonacci hashing
+_GOLDEN = 0x9E3779B97F4A7C15
+
+
+class NogoodTable:
+    """
+    A fixed number of buckets, each holding two keys: one kept while it
+    is the costliest proof to hash there, and one replaced by every
+    newer store.
+
+    The first slot keeps the proofs that save most work when hit, which
+    in a deep search are the few states near the root; the second keeps
+    the many recent proofs deep in the tree, which are the ones sibling
+    subtrees are most likely to reach again.
+    """
+
+    def __init__(self, size=1 << 20):
+        """
+        Create a new NogoodTable self holding at most size keys, rounded
+        down to a power of two.
+
+        @type self: NogoodTable
+        @type size: int
+        @rtype: None
+        """
+        self._bits = max(1, size // 2).bit_length() - 1
+        self._buckets = 1 << self._bits
+        self._kept = [None] * self._buckets
+        self._cost = [0] * self._buckets
+        self._recent = [None] * self._buckets
+        self.probes = self.hits = self.stores = self.evictions = 0
+
+    def __contains__(self, key):
+        """
+        Return whether key has been stored in NogoodTable self and not
+        yet evicted, counting the probe.
+
+        @type self: NogoodTable
+        @type key: object
+        @rtype: bool
+
+        >>> table = NogoodTable(4)
+        >>> table.store(5, 10)
+        >>> 5 in table, 6 in table, table.hits, table.probes
+        (True, False, 1, 2)
+        """
+        self.probes += 1
+        b = self._bucket(key)
+        if self._kept[b] == key or self._recent[b] == key:
+            self.hits += 1
+            return True
+        return False
+
+    def store(self, key, cost):
+        """
+        Record that the state with key has no solution, where proving it
+        took cost nodes.
+
+        @type self: NogoodTable
+        @type key: object
+        @type cost: int
+        @rtype: None
+
+        >>> table = NogoodTable(2)
+        >>> table.store(1, 100); table.store(2, 5); table.store(3, 7)
+        >>> 1 in table, 2 in table, 3 in table
+        (True, False, True)
+        """
+        self.stores += 1
+        b = self._bucket(key)
+        if self._kept[b] is None or cost >= self._cost[b]:
+            if self._kept[b] is not None and self._kept[b] != key:
+                self._replace_recent(b, self._kept[b])
+            self._kept[b], self._cost[b] = key, cost
+        else:
+            self._replace_recent(b, key)
+
+    def _bucket(self, key):
+        # Return the bucket of key, mixing all bits of its hash so that
+        # bitboards differing only in high bits spread out.
+        #
+        # @type self: NogoodTable
+        # @type key: object
+        # @rtype: int
+        mixed = ((hash(key) & _MASK) * _GOLDEN) & _MASK
+        return mixed >> (64 - self._bits) if self._bits else 0
+
+    def _replace_recent(self, b, key):
+        # Put key in the second slot of bucket b, counting an eviction
+        # if that pushes out another key.
+        #
+        # @type self: NogoodTable
+        # @type b: int
+        # @type key: object
+        # @rtype: None
+        if self._recent[b] is not None and self._recent[b] != key:
+            self.evictions += 1
+        self._recent[b] = key
+
+    def hit_rate(self):
+        """
+        Return the fraction of probes of NogoodTable self that hit.
+
+        @type self: NogoodTable
+        @rtype: float
+        """
+        return self.hits / self.probes if self.probes else 0.0
+
+    def __len__(self):
+        """
+        Return the number of keys in NogoodTable self.
+
+        @type self: NogoodTable
+        @rtype: int
+        """
+        return (sum(key is not None for key in self._kept) +
+                sum(key is not None for key in self._recent))
+
+    def as_dict(self):
+        """
+        Return the counters of NogoodTable self as a plain dict.
+
+        @type self: NogoodTable
+        @rtype: dict
+        """
+        return {"probes": self.probes, "hits": self.hits,
+                "hit_rate": self.hit_rate(), "stores": self.stores,
+                "evictions": self.evictions, "size": len(self)}
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,637 @@
+"""
+Multi-process versions of the solvers in puzzle_tools.
+
+Workers are separate processes, so puzzles and their modules must be
+importable and picklable.  On platforms that spawn rather than fork,
+call these solvers from under an ``if __name__ == "__main__":`` guard.
+"""
+import heapq
+import multiprocessing
+import os
+import queue
+from array import array
+from time import perf_counter
+from zlib import crc32
+
+from puzzle_tools import PuzzleNode, viable_extensions
+
+# indices into the shared counters of a parallel depth-first search
+_EXPANDED, _GENERATED, _DUPLICATES, _FAIL_FAST = range(4)
+
+
+def key_owner(key, workers):
+    """
+    Return the index of the worker, out of workers, that owns the state
+    with str key.  Unlike hash() this is the same in every process.
+
+    @type key: str
+    @type workers: int
+    @rtype: int
+
+    >>> key_owner("same -> cost", 1)
+    0
+    >>> key_owner("same -> cost", 4) == key_owner("same -> cost", 4)
+    True
+    """
+    return crc32(key.encode()) % workers
+
+
+class _WorkerPool:
+    """
+    A fixed set of worker processes, each with its own inbox and all
+    replying on one shared outbox.
+    """
+
+    def __init__(self, target, workers):
+        """
+        Start workers processes running target(wid, workers, inbox,
+        outbox).
+
+        @type self: _WorkerPool
+        @type target: callable
+        @type workers: int
+        @rtype: None
+        """
+        context = multiprocessing.get_context()
+        self.size = workers
+        self.outbox = context.Queue()
+        self.inboxes = [context.Queue() for _ in range(workers)]
+        self.processes = [
+            context.Process(target=target,
+                            args=(wid, workers, self.inboxes[wid],
+                                  self.outbox),
+                            daemon=True)
+            for wid in range(workers)]
+        for process in self.processes:
+            process.start()
+
+    def send(self, wid, message):
+        """
+        Send message to worker wid.
+
+        @type self: _WorkerPool
+        @type wid: int
+        @type message: tuple
+        @rtype: None
+        """
+        self.inboxes[wid].put(message)
+
+    def gather(self, wids=None):
+        """
+        Return the next reply from each worker in wids (default all),
+        as a dict from worker index to reply.  Every reply is a tuple
+        whose first item is the sending worker's index.  Raise
+        RuntimeError if a worker dies first.
+
+        @type self: _WorkerPool
+        @type wids: list[int] | None
+        @rtype: dict[int, tuple]
+        """
+        expected = self.size if wids is None else len(wids)
+        replies = {}
+        while len(replies) < expected:
+            try:
+                reply = self.outbox.get(timeout=0.05)
+            except queue.Empty:
+                _check_alive(self.processes)
+                continue
+            replies[reply[0]] = reply[1:]
+        return replies
+
+    def close(self):
+        """
+        Stop every worker, terminating any that do not exit promptly.
+
+        @type self: _WorkerPool
+        @rtype: None
+        """
+        for inbox in self.inboxes:
+            inbox.put(("stop",))
+        for process in self.processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+
+def _check_alive(processes):
+    # Raise RuntimeError if any of processes, workers that only exit
+    # when told to stop, has exited, so that its results will never
+    # come.
+    #
+    # @type processes: list[multiprocessing.Process]
+    # @rtype: None
+    for process in processes:
+        if process.exitcode is not None:
+            raise RuntimeError("worker process {} died with exit code "
+                               "{}".format(process.pid, process.exitcode))
+
+
+def _bfs_worker(wid, workers, inbox, outbox):
+    # Serve one share of a level-synchronous breadth-first search.
+    #
+    # The worker holds the frontier nodes it generated, as
+    # (global id, puzzle) pairs in global id order, the nodes of every
+    # earlier level it generated, for path reconstruction, and the part
+    # of the visited set whose keys it owns.
+    #
+    # @type wid: int
+    # @type workers: int
+    # @type inbox: multiprocessing.Queue
+    # @type outbox: multiprocessing.Queue
+    # @rtype: None
+    visited, levels, frontier, children = set(), [], [], []
+    while True:
+        message = inbox.get()
+        op = message[0]
+        if op == "stop":
+            return
+        elif op == "root":
+            children = [message[1]]
+        elif op == "expand":
+            # record (parent id, ordinal, owner, key, solved) per child
+            children, records = [], []
+            for gid, puzzle in frontier:
+                for ordinal, child in enumerate(puzzle.iter_extensions()):
+                    key = str(child)
+                    records.append((gid, ordinal, key_owner(key, workers),
+                                    key, child.is_solved()))
+                    children.append(child)
+            outbox.put((wid, records, len(frontier)))
+        elif op == "visit":
+            # keys arrive in global order; keep the first of each
+            fresh = []
+            for i, key in enumerate(message[1]):
+                if key not in visited:
+                    visited.add(key)
+                    fresh.append(i)
+            outbox.put((wid, fresh, len(visited)))
+        elif op == "keep":
+            frontier = [(gid, children[j]) for j, gid in message[1]]
+            levels.append(dict(frontier))
+            children = []
+        elif op == "fetch":
+            outbox.put((wid, [levels[level][gid]
+                              for level, gid in message[1]]))
+
+
+def parallel_breadth_first_solve(puzzle, processes=None, stats=None,
+                                 budget=None):
+    """
+    Return the same path as breadth_first_solve(puzzle), searching each
+    level of the tree with processes worker processes (default: one per
+    CPU).  Return None if there is no solution.
+
+    Each worker expands the frontier nodes it generated itself.  The
+    visited set is split between the workers by key_owner, so each key
+    is checked by exactly one worker and no shared set or lock is
+    needed.  Keys are checked in the order the serial search would
+    generate them, which is what makes the returned path identical.
+    RuntimeError is raised if a worker process dies.
+
+    @type puzzle: Puzzle
+    @type processes: int | None
+    @type stats: SolverStats | None
+    @type budget: Budget | None
+    @rtype: PuzzleNode | None
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> from puzzle_tools import breadth_first_solve
+    >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> p = MNPuzzle(start_grid, target_grid)
+    >>> parallel_breadth_first_solve(p, 2) == breadth_first_solve(p)
+    True
+    """
+    start = perf_counter()
+    if budget is not None:
+        budget.start()
+    if puzzle.is_solved():
+        return PuzzleNode(puzzle)
+    workers = processes or os.cpu_count() or 1
+    pool = _WorkerPool(_bfs_worker, workers)
+    try:
+        return _parallel_breadth_first(pool, puzzle, stats, budget)
+    finally:
+        pool.close()
+        if stats is not None:
+            stats.elapsed += perf_counter() - start
+
+
+def _parallel_breadth_first(pool, puzzle, stats, budget):
+    # Drive pool through the levels of the search from puzzle.
+    #
+    # parents[k][g] is the global id, in level k - 1, of the parent of
+    # node g of level k; holders[k][g] is the worker that holds it.
+    #
+    # @type pool: _WorkerPool
+    # @type puzzle: Puzzle
+    # @type stats: SolverStats | None
+    # @type budget: Budget | None
+    # @rtype: PuzzleNode | None
+    workers = pool.size
+    root_key = str(puzzle)
+    owner = key_owner(root_key, workers)
+    pool.send(owner, ("visit", [root_key]))
+    pool.gather([owner])
+    pool.send(0, ("root", puzzle))
+    for wid in range(workers):
+        pool.send(wid, ("keep", [(0, 0)] if wid == 0 else []))
+    parents, holders = [array("l", [-1])], [array("i", [0])]
+    while True:
+        for wid in range(workers):
+            pool.send(wid, ("expand",))
+        expanded = pool.gather()
+        expanded_count = sum(reply[1] for reply in expanded.values())
+        if budget is not None:
+            budget.tick(expanded_count)
+            budget.check()
+        # merge every worker's children into the serial generation
+        # order: by parent id, then by position among its siblings
+        candidates = list(heapq.merge(*[
+            [(record[0], record[1], wid, j) + record[2:]
+             for j, record in enumerate(expanded[wid][0])]
+            for wid in range(workers)]))
+        del expanded
+        by_owner = [[] for _ in range(workers)]
+        for i, candidate in enumerate(candidates):
+            by_owner[candidate[4]].append(i)
+        for wid in range(workers):
+            pool.send(wid, ("visit",
+                            [candidates[i][5] for i in by_owner[wid]]))
+        visited = pool.gather()
+        accepted = sorted(by_owner[wid][i] for wid in range(workers)
+                          for i in visited[wid][0])
+        if stats is not None:
+            stats.nodes_expanded += expanded_count
+            stats.nodes_generated += len(candidates)
+            stats.duplicates_pruned += len(candidates) - len(accepted)
+            stats.max_frontier = max(stats.max_frontier, len(accepted))
+            stats.peak_visited = sum(reply[1]
+                                     for reply in visited.values())
+        if not accepted:
+            return None
+        level_parents, level_holders = array("l"), array("i")
+        keeps = [[] for _ in range(workers)]
+        solved = None
+        for gid, i in enumerate(accepted):
+            parent, _, wid, j = candidates[i][:4]
+            level_parents.append(parent)
+            level_holders.append(wid)
+            keeps[wid].append((j, gid))
+            if solved is None and candidates[i][6]:
+                solved = gid
+        del candidates
+        for wid in range(workers):
+            pool.send(wid, ("keep", keeps[wid]))
+        parents.append(level_parents)
+        holders.append(level_holders)
+        if solved is not None:
+            return _fetch_path(pool, parents, holders, solved)
+
+
+def _fetch_path(pool, parents, holders, gid):
+    # Return the PuzzleNode path from the root to node gid of the last
+    # level, fetching its puzzles from the workers that hold them.
+    #
+    # @type pool: _WorkerPool
+    # @type parents: list[array]
+    # @type holders: list[array]
+    # @type gid: int
+    # @rtype: PuzzleNode
+    steps = []
+    for level in range(len(parents) - 1, -1, -1):
+        steps.append((level, gid, holders[level][gid]))
+        gid = parents[level][gid]
+    steps.reverse()
+    requests = {}
+    for level, gid, wid in steps:
+        requests.setdefault(wid, []).append((level, gid))
+    for wid in requests:
+        pool.send(wid, ("fetch", requests[wid]))
+    replies = pool.gather(list(requests))
+    fetched = {}
+    for wid in requests:
+        for step, puzzle in zip(requests[wid], replies[wid][0]):
+            fetched[step] = puzzle
+    return PuzzleNode.from_path([fetched[(level, gid)]
+                                 for level, gid, _ in steps])
+
+
+def parallel_depth_first_solve(puzzle, processes=None, split_depth=2,
+                               stats=None, budget=None, check_interval=64):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing a
+    solution, found by depth-first search on processes worker processes
+    (default: one per CPU).  Return None if there is no solution.
+
+    The tree is expanded breadth-first to split_depth, and the subtrees
+    rooted there become tasks on a shared queue.  A worker that runs
+    dry announces it is hungry; busy workers check for hungry ones every
+    check_interval nodes and give away the shallowest unexplored child
+    on their stack, which roots the largest remaining subtree.  All
+    workers stop as soon as one of them finds a solution.
+
+    The path found need not be the one depth_first_solve would find.
+    Workers keep separate visited sets, so a state may be searched by
+    more than one worker.  RuntimeError is raised if a worker process
+    dies.
+
+    @type puzzle: Puzzle
+    @type processes: int | None
+    @type split_depth: int
+    @type stats: SolverStats | None
+    @type budget: Budget | None
+    @type check_interval: int
+    @rtype: PuzzleNode | None
+
+    >>> from sudoku_puzzle import SudokuPuzzle
+    >>> grid = ["*", "B", "C", "D"]
+    >>> grid += ["C", "D", "*", "B"]
+    >>> grid += ["B", "*", "D", "C"]
+    >>> grid += ["D", "C", "B", "*"]
+    >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+    >>> solution = parallel_depth_first_solve(s, 2, split_depth=1)
+    >>> solution.path()[-1].is_solved()
+    True
+
+    A solved child given to another worker is still reported.  Here the
+    root's first child starts a long dead end, so its sibling "win" is
+    donated:
+
+    >>> import sys
+    >>> from puzzle import Puzzle
+    >>> class Tree(Puzzle):
+    ...     def __init__(self, name):
+    ...         self.name = name
+    ...     def __str__(self):
+    ...         return self.name
+    ...     def __eq__(self, other):
+    ...         return str(self) == str(other)
+    ...     def is_solved(self):
+    ...         return self.name == "win"
+    ...     def fail_fast(self):
+    ...         return False
+    ...     def extensions(self):
+    ...         if self.name == "r":
+    ...             return [Tree("a0"), Tree("win")]
+    ...         depth = int(self.name[1:])
+    ...         return [Tree("a{}".format(depth + 1))] if depth < 5000 else []
+    >>> # workers unpickle puzzles by module and name
+    >>> sys.modules[Tree.__module__].Tree = Tree
+    >>> solution = parallel_depth_first_solve(Tree("r"), 2, split_depth=0,
+    ...                                       check_interval=8)
+    >>> print(solution.path()[-1])
+    win
+    """
+    start = perf_counter()
+    if budget is not None:
+        budget.start()
+    try:
+        if puzzle.fail_fast():
+            return None
+        tasks, solution = _split(puzzle, split_depth, stats)
+        if solution is not None:
+            return PuzzleNode.from_path(solution)
+        if not tasks:
+            return None
+        return _run_depth_first(tasks, processes or os.cpu_count() or 1,
+                                stats, budget, check_interval)
+    finally:
+        if stats is not None:
+            stats.elapsed += perf_counter() - start
+
+
+def _split(puzzle, depth, stats):
+    # Return (paths, None) where paths lead from puzzle to each distinct
+    # viable node depth levels down, or (None, path) if a solution is
+    # found on the way.
+    #
+    # @type puzzle: Puzzle
+    # @type depth: int
+    # @type stats: SolverStats | None
+    # @rtype: (list[list[Puzzle]] | None, list[Puzzle] | None)
+    if puzzle.is_solved():
+        return None, [puzzle]
+    frontier, seen = [[puzzle]], {str(puzzle)}
+    for _ in range(depth):
+        next_frontier = []
+        for path in frontier:
+            if stats is not None:
+                stats.nodes_expanded += 1
+            for child in viable_extensions(path[-1]):
+                key = str(child)
+                if key in seen:
+                    continue
+                seen.add(key)
+                if child.is_solved():
+                    return None, path + [child]
+                next_frontier.append(path + [child])
+        frontier = next_frontier
+        if not frontier:
+            break
+    return frontier, None
+
+
+def _run_depth_first(tasks, workers, stats, budget, check_interval):
+    # Search the subtrees at the ends of the paths in tasks on workers
+    # processes and return the solution path found, if any.
+    #
+    # pending counts tasks queued or being searched; a worker that finds
+    # a solution never decrements it, so pending reaching 0 means every
+    # subtree was searched without success.
+    #
+    # @type tasks: list[list[Puzzle]]
+    # @type workers: int
+    # @type stats: SolverStats | None
+    # @type budget: Budget | None
+    # @type check_interval: int
+    # @rtype: PuzzleNode | None
+    context = multiprocessing.get_context()
+    task_queue, results = context.Queue(), context.Queue()
+    pending, hungry = context.Value("l", len(tasks)), context.Value("l", 0)
+    found = context.Value("b", 0)
+    counters, stop = context.Array("q", 4), context.Event()
+    for path in tasks:
+        task_queue.put(path)
+    processes = [
+        context.Process(target=_dfs_worker,
+                        args=(task_queue, results, found, pending,
+                              hungry, counters, stop, check_interval),
+                        daemon=True)
+        for _ in range(workers)]
+    for process in processes:
+        process.start()
+    charged = 0
+    try:
+        while True:
+            try:
+                return PuzzleNode.from_path(results.get(timeout=0.05))
+            except queue.Empty:
+                pass
+            if budget is not None:
+                budget.tick(counters[_EXPANDED] - charged)
+                charged = counters[_EXPANDED]
+                budget.check()
+            if pending.value == 0:
+                return None
+            _check_alive(processes)
+    finally:
+        stop.set()
+        for process in processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        task_queue.cancel_join_thread()
+        if stats is not None:
+            stats.nodes_expanded += counters[_EXPANDED]
+            stats.nodes_generated += counters[_GENERATED]
+            stats.duplicates_pruned += counters[_DUPLICATES]
+            stats.fail_fast_prunes += counters[_FAIL_FAST]
+            stats.max_frontier = max(stats.max_frontier, len(tasks))
+
+
+def _dfs_worker(tasks, results, found, pending, hungry, counters, stop,
+                check_interval):
+    # Take subtrees from tasks and search them depth-first until stop is
+    # set, putting any solution path on results.
+    #
+    # @type tasks: multiprocessing.Queue
+    # @type results: multiprocessing.Queue
+    # @type found: multiprocessing.Value
+    # @type pending: multiprocessing.Value
+    # @type hungry: multiprocessing.Value
+    # @type counters: multiprocessing.Array
+    # @type stop: multiprocessing.Event
+    # @type check_interval: int
+    # @rtype: None
+    # unread donated tasks may be dropped once stop is set
+    tasks.cancel_join_thread()
+    visited = set()
+    while not stop.is_set():
+        with hungry.get_lock():
+            hungry.value += 1
+        try:
+            path = None
+            while path is None and not stop.is_set():
+                try:
+                    path = tasks.get(timeout=0.05)
+                except queue.Empty:
+                    pass
+        finally:
+            with hungry.get_lock():
+                hungry.value -= 1
+        if path is None:
+            return
+        solution = _search_subtree(path, visited, tasks, pending, hungry,
+                                   counters, stop, check_interval)
+        if solution is not None:
+            # only the first solution is sent, since nobody would read a
+            # second one and putting it could then block this worker
+            with found.get_lock():
+                if not found.value:
+                    found.value = 1
+                    results.put(solution)
+            return
+        with pending.get_lock():
+            pending.value -= 1
+
+
+def _search_subtree(path, visited, tasks, pending, hungry, counters, stop,
+                    check_interval):
+    # Return the solution path below the last puzzle of path, or None.
+    # The last puzzle may itself be solved, when it was donated.
+    #
+    # The stack holds, for each node on the current branch, the node as
+    # a (puzzle, parent) link and the iterator over its extensions.
+    #
+    # @type path: list[Puzzle]
+    # @type visited: set[str]
+    # @rtype: list[Puzzle] | None
+    if path[-1].is_solved():
+        return list(path)
+    link = None
+    for puzzle in path:
+        link = (puzzle, link)
+    stack = [(link, path[-1].iter_extensions())]
+    counts, countdown = [1, 0, 0, 0], check_interval
+    while stack:
+        countdown -= 1
+        if countdown <= 0:
+            countdown = check_interval
+            _add_counts(counters, counts)
+            if stop.is_set():
+                return None
+            if hungry.value > 0:
+                _donate(stack, visited, tasks, pending)
+        link, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            continue
+        counts[_GENERATED] += 1
+        if child.fail_fast():
+            counts[_FAIL_FAST] += 1
+            continue
+        key = str(child)
+        if key in visited:
+            counts[_DUPLICATES] += 1
+            continue
+        visited.add(key)
+        if child.is_solved():
+            _add_counts(counters, counts)
+            return _unlink((child, link))
+        counts[_EXPANDED] += 1
+        stack.append(((child, link), child.iter_extensions()))
+    _add_counts(counters, counts)
+    return None
+
+
+def _donate(stack, visited, tasks, pending):
+    # Give the shallowest unexplored viable child on stack to the task
+    # queue for a hungry worker, if there is one.
+    #
+    # @type stack: list
+    # @type visited: set[str]
+    # @rtype: None
+    for link, children in stack[:-1]:
+        for child in children:
+            key = str(child)
+            if child.fail_fast() or key in visited:
+                continue
+            visited.add(key)
+            with pending.get_lock():
+                pending.value += 1
+            tasks.put(_unlink((child, link)))
+            return
+
+
+def _add_counts(counters, counts):
+    # Add counts into the shared counters and reset counts to zero.
+    #
+    # @type counters: multiprocessing.Array
+    # @type counts: list[int]
+    # @rtype: None
+    with counters.get_lock():
+        for i, count in enumerate(counts):
+            counters[i] += count
+    counts[:] = [0] * len(counts)
+
+
+def _unlink(link):
+    # Return the puzzles of a (puzzle, parent) link chain, root first.
+    #
+    # @type link: tuple
+    # @rtype: list[Puzzle]
+    path = []
+    while link is not None:
+        path.append(link[0])
+        link = link[1]
+    path.reverse()
+    return path
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,205 @@
+"""
+Meet-in-the-middle search for GridPegSolitairePuzzle.
+
+Boards are bitboards, as in GridPegSolitairePuzzle.key().  Starting
+from every board with one peg, jumps are undone breadth-first to a
+chosen depth, recording for each board found the board one jump nearer
+a solution.  A depth-first search forward from the puzzle then only has
+to reach a board in that table, and stops there.
+"""
+from time import perf_counter
+
+from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle, jump_table
+from puzzle_tools import PuzzleNode
+
+
+def meet_in_the_middle_solve(puzzle, backward_depth=None, max_table=1 << 17,
+                             stats=None, budget=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing a
+    solution, or None if there is none.
+
+    Only one-peg boards in the start's position class, which no jump
+    changes, are used as goals.  The backward table holds every board
+    within backward_depth undone jumps of one of them.  By default it is
+    built as deep as possible, up to half the jumps the puzzle needs,
+    without holding more than max_table boards.
+
+    @type puzzle: GridPegSolitairePuzzle
+    @type backward_depth: int | None
+    @type max_table: int
+    @type stats: SolverStats | None
+    @type budget: Budget | None
+    @rtype: PuzzleNode | None
+
+    >>> grid = [["*", "*", ".", "*"], ["*", "*", "*", "*"],
+    ...         ["*", "*", "*", "*"]]
+    >>> g = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+    >>> solution = meet_in_the_middle_solve(g)
+    >>> len(solution.path()), solution.path()[-1].is_solved()
+    (11, True)
+    >>> grid = [["*", "*", "*", "*"], ["*", "*", "*", "*"],
+    ...         ["*", "*", ".", "*"], ["*", "*", "*", "*"]]
+    >>> g = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+    >>> meet_in_the_middle_solve(g, backward_depth=3) is None
+    True
+    >>> from grid_peg_solitaire_puzzle import triangular_board
+    >>> len(meet_in_the_middle_solve(triangular_board(5)).path())
+    14
+    """
+    start = perf_counter()
+    if budget is not None:
+        budget.start()
+    try:
+        jumps = [jump[:3]
+                 for jump in jump_table(puzzle._marker, puzzle._directions)]
+        board = puzzle.key()
+        pegs = bin(board).count("1")
+        if backward_depth is None:
+            backward_depth = (pegs - 1) // 2
+        else:
+            max_table = None
+        table, depth = _backward_table(puzzle, board, jumps,
+                                       backward_depth, max_table)
+        if stats is not None:
+            stats.peak_visited = len(table)
+        meet = _forward(board, pegs, 1 + depth, jumps, table, set(), stats,
+                        budget)
+        if meet is None:
+            return None
+        boards = meet[::-1]
+        while table[boards[-1]] is not None:
+            boards.append(table[boards[-1]])
+        return PuzzleNode.from_path(
+            [puzzle] + [_to_puzzle(puzzle, b) for b in boards[1:]])
+    finally:
+        if stats is not None:
+            stats.elapsed += perf_counter() - start
+
+
+def position_class(puzzle, board):
+    """
+    Return the position class of bitboard board on the layout of
+    puzzle, which no jump changes.
+
+    For each linear form a * i + b * j that takes three different values
+    mod 3 along every jump direction of puzzle, the class records, for
+    the cells (i, j) with pegs, whether the counts with each value have
+    equal parity: every jump changes all three counts by one.
+
+    @type puzzle: GridPegSolitairePuzzle
+    @type board: int
+    @rtype: tuple[bool]
+
+    >>> g = GridPegSolitairePuzzle([["*", "*", "."]], {"*", ".", "#"})
+    >>> position_class(g, g.key()) == position_class(g, 4)
+    True
+    """
+    width = len(puzzle._marker[0])
+    forms = [(a, b) for a, b in ((1, 1), (1, 2))
+             if all((a * di + b * dj) % 3 for di, dj in puzzle._directions)]
+    result = []
+    for a, b in forms:
+        parity = [0, 0, 0]
+        for i in range(len(puzzle._marker)):
+            for j in range(width):
+                if board >> (i * width + j) & 1:
+                    parity[(a * i + b * j) % 3] ^= 1
+        result += [parity[0] == parity[1], parity[1] == parity[2]]
+    return tuple(result)
+
+
+def _backward_table(puzzle, start, jumps, depth, max_table):
+    # Return (table, depth reached): table maps each board within depth
+    # undone jumps of a one-peg board in the position class of start to
+    # the board one jump nearer, or None for one-peg boards.  With
+    # max_table, stop before a level that would make the table larger.
+    #
+    # @type puzzle: GridPegSolitairePuzzle
+    # @type start: int
+    # @type jumps: list[(int, int, int)]
+    # @type depth: int
+    # @type max_table: int | None
+    # @rtype: (dict[int, int | None], int)
+    marker = puzzle._marker
+    width = len(marker[0])
+    goal_class = position_class(puzzle, start)
+    level = [1 << (i * width + j) for i in range(len(marker))
+             for j in range(width) if marker[i][j] != "#" and
+             position_class(puzzle, 1 << (i * width + j)) == goal_class]
+    table = dict.fromkeys(level)
+    for reached in range(depth):
+        found = {}
+        for board in level:
+            for pair, hole, flip in jumps:
+                # undo a jump: the landing peg goes back over its hole
+                if board & hole and not board & pair:
+                    parent = board ^ flip
+                    if parent not in table and parent not in found:
+                        found[parent] = board
+            if max_table is not None and len(table) + len(found) > max_table:
+                return table, reached
+        table.update(found)
+        level = list(found)
+    return table, depth
+
+
+def _forward(board, pegs, meet_pegs, jumps, table, failed, stats, budget):
+    # Return the boards from one in table back to board, or None if no
+    # board in table can be reached.  failed holds boards known not to
+    # reach table.
+    #
+    # @type board: int
+    # @type pegs: int
+    # @type meet_pegs: int
+    # @type jumps: list[(int, int, int)]
+    # @type table: dict[int, int | None]
+    # @type failed: set[int]
+    # @type stats: SolverStats | None
+    # @type budget: Budget | None
+    # @rtype: list[int] | None
+    if board in table:
+        return [board]
+    if pegs <= meet_pegs:
+        return None
+    if budget is not None:
+        budget.tick()
+    if stats is not None:
+        stats.nodes_expanded += 1
+    for pair, hole, flip in jumps:
+        if board & pair == pair and not board & hole:
+            child = board ^ flip
+            if stats is not None:
+                stats.nodes_generated += 1
+            if child in failed:
+                if stats is not None:
+                    stats.duplicates_pruned += 1
+                continue
+            found = _forward(child, pegs - 1, meet_pegs, jumps, table, failed,
+                             stats, budget)
+            if found is not None:
+                found.append(board)
+                return found
+            failed.add(child)
+    return None
+
+
+def _to_puzzle(puzzle, board):
+    # Return the GridPegSolitairePuzzle with the layout of puzzle and the
+    # pegs of bitboard board.
+    #
+    # @type puzzle: GridPegSolitairePuzzle
+    # @type board: int
+    # @rtype: GridPegSolitairePuzzle
+    width = len(puzzle._marker[0])
+    marker = [["#" if x == "#" else
+               "*" if board >> (i * width + j) & 1 else "."
+               for j, x in enumerate(row)]
+              for i, row in enumerate(puzzle._marker)]
+    return GridPegSolitairePuzzle(marker, puzzle._marker_set,
+                                  puzzle._directions)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -39,3 +39,74 @@ class Puzzle:
         @rtype: list[Puzzle]
         """
         raise NotImplementedError
+
+    def iter_extensions(self):
+        """
+        Return an iterator over the legal extensions of Puzzle self,
+        building each extension only when it is requested.
+
+        Override this in a subclass that can generate its extensions
+        one at a time; the default just walks self.extensions().  The
+        order must be the same in every process, not, say, that of a
+        set, since puzzle_codec stores paths as positions in it.
+
+        @type self: Puzzle
+        @rtype: iterator[Puzzle]
+        """
+        return iter(self.extensions())
+
+    # Optional protocol for searching one mutable puzzle in place: a
+    # solver takes self.copy(), then applies and undoes moves on it.
+
+    def moves(self):
+        """
+        Return a list of the legal moves from Puzzle self, in the same
+        order as the extensions they lead to.
+
+        Override this, with apply, undo and copy, in a subclass that can
+        be searched in place.
+
+        @type self: Puzzle
+        @rtype: list
+        """
+        raise NotImplementedError
+
+    def apply(self, move):
+        """
+        Make move, one of self.moves(), changing Puzzle self in place.
+
+        @type self: Puzzle
+        @type move: object
+        @rtype: None
+        """
+        raise NotImplementedError
+
+    def undo(self, move):
+        """
+        Take back move, the last move applied to Puzzle self.
+
+        @type self: Puzzle
+        @type move: object
+        @rtype: None
+        """
+        raise NotImplementedError
+
+    def key(self):
+        """
+        Return a hashable value that is equal for equal states of Puzzle
+        self within one search.
+
+        @type self: Puzzle
+        @rtype: object
+        """
+        return str(self)
+
+    def copy(self):
+        """
+        Return a copy of Puzzle self that can be changed without
+        changing self.
+
+        @type self: Puzzle
+        @rtype: Puzzle
+        """
+        raise NotImplementedError
@@ -0,0 +1,348 @@
+"""
+Compact binary forms of puzzles and solution paths.
+
+Each puzzle type has to_bytes() and a from_bytes() class method built
+from the helpers here.  Integers are varints: seven bits a byte, low
+bits first, the high bit set on every byte but the last.  A string is
+its UTF-8 length as a varint and then its bytes.  Boards are packed at
+the fewest of 1, 2, 4 or 8 bits a cell that hold every value.  A path
+is stored as its moves, the position of each step among the extensions
+of the step before, so most moves take one byte; the first puzzle is
+kept apart.  A path therefore only decodes if iter_extensions() yields
+the same puzzles in the same order in every process, as it must for
+every puzzle type.
+"""
+from puzzle_tools import PuzzleNode
+
+
+def write_varint(out, value):
+    """
+    Append non-negative int value to out as a varint.
+
+    @type out: bytearray
+    @type value: int
+    @rtype: None
+
+    >>> out = bytearray()
+    >>> write_varint(out, 300); write_varint(out, 5)
+    >>> bytes(out)
+    b'\\xac\\x02\\x05'
+    """
+    if value < 0:
+        raise ValueError("varints must not be negative")
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    """
+    Return (value, position after it) for the varint at pos of data.
+
+    @type data: bytes
+    @type pos: int
+    @rtype: (int, int)
+
+    >>> read_varint(b'\\xac\\x02\\x05', 0), read_varint(b'\\xac\\x02\\x05', 2)
+    ((300, 2), (5, 3))
+    """
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("truncated varint")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def write_signed(out, value):
+    """
+    Append int value to out as a zigzag varint: 0, -1, 1, -2, ... are
+    written as 0, 1, 2, 3, ...
+
+    @type out: bytearray
+    @type value: int
+    @rtype: None
+    """
+    write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+
+
+def read_signed(data, pos):
+    """
+    Return (value, position after it) for the zigzag varint at pos of
+    data.
+
+    @type data: bytes
+    @type pos: int
+    @rtype: (int, int)
+
+    >>> out = bytearray()
+    >>> write_signed(out, -1); write_signed(out, 1)
+    >>> bytes(out), read_signed(bytes(out), 0)
+    (b'\\x01\\x02', (-1, 1))
+    """
+    value, pos = read_varint(data, pos)
+    return (value >> 1 if not value & 1 else -(value >> 1) - 1), pos
+
+
+def write_string(out, s):
+    """
+    Append str s to out as its length and UTF-8 bytes.
+
+    @type out: bytearray
+    @type s: str
+    @rtype: None
+    """
+    encoded = s.encode()
+    write_varint(out, len(encoded))
+    out += encoded
+
+
+def read_string(data, pos):
+    """
+    Return (str, position after it) for the string at pos of data.
+
+    @type data: bytes
+    @type pos: int
+    @rtype: (str, int)
+
+    >>> out = bytearray()
+    >>> write_string(out, "cat")
+    >>> read_string(bytes(out), 0)
+    ('cat', 4)
+    """
+    length, pos = read_varint(data, pos)
+    if pos + length > len(data):
+        raise ValueError("truncated string")
+    return data[pos:pos + length].decode(), pos + length
+
+
+def write_symbols(out, symbols):
+    """
+    Append the list of str symbols to out, count first.
+
+    @type out: bytearray
+    @type symbols: list[str]
+    @rtype: None
+    """
+    write_varint(out, len(symbols))
+    for symbol in symbols:
+        write_string(out, symbol)
+
+
+def read_symbols(data, pos):
+    """
+    Return (symbols, position after them) for the list of str at pos of
+    data.
+
+    @type data: bytes
+    @type pos: int
+    @rtype: (list[str], int)
+    """
+    count, pos = read_varint(data, pos)
+    symbols = []
+    for _ in range(count):
+        symbol, pos = read_string(data, pos)
+        symbols.append(symbol)
+    return symbols, pos
+
+
+def cell_bits(values):
+    """
+    Return the bits per cell, 1, 2, 4 or 8, needed to pack cells taking
+    values different values.
+
+    @type values: int
+    @rtype: int
+
+    >>> cell_bits(2), cell_bits(3), cell_bits(10), cell_bits(17)
+    (1, 2, 4, 8)
+    """
+    for bits in (1, 2, 4, 8):
+        if values <= 1 << bits:
+            return bits
+    raise ValueError("cannot pack more than 256 values a cell")
+
+
+def write_cells(out, cells, bits):
+    """
+    Append the int cells to out, packed bits to a cell, the first cell
+    in the low bits of the first byte.
+
+    @type out: bytearray
+    @type cells: list[int]
+    @type bits: int
+    @rtype: None
+
+    >>> out = bytearray()
+    >>> write_cells(out, [1, 2, 3, 0, 1], 2)
+    >>> bytes(out)
+    b'9\\x01'
+    """
+    per_byte = 8 // bits
+    for start in range(0, len(cells), per_byte):
+        byte = 0
+        for k, value in enumerate(cells[start:start + per_byte]):
+            byte |= value << (k * bits)
+        out.append(byte)
+
+
+def read_cells(data, pos, count, bits):
+    """
+    Return (cells, position after them) for the count cells packed bits
+    to a cell at pos of data by write_cells.
+
+    @type data: bytes
+    @type pos: int
+    @type count: int
+    @type bits: int
+    @rtype: (list[int], int)
+
+    >>> read_cells(b'9\\x01', 0, 5, 2)
+    ([1, 2, 3, 0, 1], 2)
+    """
+    per_byte = 8 // bits
+    end = pos + -(-count // per_byte)
+    if end > len(data):
+        raise ValueError("truncated board")
+    mask = (1 << bits) - 1
+    cells = [data[pos + k // per_byte] >> (k % per_byte * bits) & mask
+             for k in range(count)]
+    return cells, end
+
+
+def path_moves(solution):
+    """
+    Return the moves of the path starting at solution: for each step,
+    the position of the next puzzle among the extensions of the one
+    before, which must come in a deterministic order.
+
+    @type solution: PuzzleNode
+    @rtype: list[int]
+    """
+    path, moves = solution.path(), []
+    for puzzle, following in zip(path, path[1:]):
+        for i, child in enumerate(puzzle.iter_extensions()):
+            if child == following:
+                moves.append(i)
+                break
+        else:
+            raise ValueError("{} does not extend {}".format(following,
+                                                            puzzle))
+    return moves
+
+
+def replay_moves(puzzle, moves):
+    """
+    Return the PuzzleNode path made by applying moves to puzzle; the
+    inverse of path_moves.
+
+    @type puzzle: Puzzle
+    @type moves: list[int]
+    @rtype: PuzzleNode
+
+    >>> from puzzle_tools import breadth_first_solve
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"bat", "cat", "cot"}
+    >>> solution = breadth_first_solve(WordLadderPuzzle("bat", "cot", ws))
+    >>> path_moves(solution)
+    [0, 1]
+    >>> replay_moves(solution.puzzle, [0, 1]) == solution
+    True
+    """
+    path = [puzzle]
+    for move in moves:
+        for i, child in enumerate(path[-1].iter_extensions()):
+            if i == move:
+                path.append(child)
+                break
+        else:
+            raise ValueError("no move {} from {}".format(move, path[-1]))
+    return PuzzleNode.from_path(path)
+
+
+def encode_moves(moves):
+    """
+    Return the list of int moves as bytes: their count, then each one,
+    as varints.
+
+    @type moves: list[int]
+    @rtype: bytes
+
+    >>> encode_moves([0, 3, 1])
+    b'\\x03\\x00\\x03\\x01'
+    """
+    out = bytearray()
+    write_varint(out, len(moves))
+    for move in moves:
+        write_varint(out, move)
+    return bytes(out)
+
+
+def decode_moves(data):
+    """
+    Return the list of moves encoded in data by encode_moves.
+
+    @type data: bytes
+    @rtype: list[int]
+
+    >>> decode_moves(encode_moves([0, 200, 1]))
+    [0, 200, 1]
+    """
+    count, pos = read_varint(data, 0)
+    moves = []
+    for _ in range(count):
+        move, pos = read_varint(data, pos)
+        moves.append(move)
+    if pos != len(data):
+        raise ValueError("trailing bytes after moves")
+    return moves
+
+
+def encode_path(solution):
+    """
+    Return the path starting at solution as bytes, leaving out its first
+    puzzle, which decode_path is given.
+
+    @type solution: PuzzleNode
+    @rtype: bytes
+    """
+    return encode_moves(path_moves(solution))
+
+
+def decode_path(puzzle, data):
+    """
+    Return the PuzzleNode path from puzzle encoded in data by
+    encode_path.
+
+    @type puzzle: Puzzle
+    @type data: bytes
+    @rtype: PuzzleNode
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> from puzzle_tools import breadth_first_solve
+    >>> p = MNPuzzle((("*", "2", "3"), ("1", "4", "5")),
+    ...              (("1", "2", "3"), ("4", "5", "*")))
+    >>> solution = breadth_first_solve(p)
+    >>> data = encode_path(solution)
+    >>> len(data), decode_path(p, data) == solution
+    (4, True)
+    >>> from sudoku_puzzle import SudokuPuzzle
+    >>> grid = ["B", "A", "D", "C", "*", "*", "B", "*",
+    ...         "A", "*", "C", "B", "*", "B", "*", "*"]
+    >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+    >>> solution = breadth_first_solve(s)
+    >>> data = encode_path(solution)
+    >>> data, decode_path(s, data) == solution
+    (b'\\x07\\x01\\x00\\x00\\x00\\x00\\x00\\x00', True)
+    """
+    return replay_moves(puzzle, decode_moves(data))
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
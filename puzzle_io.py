@@ -0,0 +1,405 @@
+"""
+Puzzle requests and solve results as JSON, shared by puzzle_service and
+the puzzletools command line.
+
+A request is a JSON object whose "type" is one of PUZZLE_TYPES:
+
+    {"type": "sudoku", "grid": ["1*3*", "*4**", "**4*", "*3*2"]}
+    {"type": "mn", "from": ["*23", "145"], "to": ["123", "45*"]}
+    {"type": "peg", "grid": ["**.*", "****", "****"]}
+    {"type": "peg", "board": "english", "hole": [3, 3]}
+    {"type": "ladder", "from": "same", "to": "cost"}
+
+Grid rows are strings of one-character symbols or lists of symbols.  A
+sudoku may also give "symbols", a string of its n symbols; peg grids
+may give "directions", "orthogonal" or "triangular".  Any request may
+also give "id", returned unchanged, "solver", a key of SOLVERS, and
+"timeout" in seconds.
+"""
+import json
+import os
+from math import isqrt
+
+from grid_peg_solitaire_puzzle import (ORTHOGONAL, TRIANGULAR,
+                                       GridPegSolitairePuzzle, english_board,
+                                       european_board, triangular_board)
+from mn_anytime import anytime_solve
+from mn_puzzle import MNPuzzle
+from mn_tables import load_tables, table_solve
+from peg_meet import meet_in_the_middle_solve
+from puzzle_tools import (breadth_first_solve, depth_first_solve,
+                          iddfs_solve, mutable_depth_first_solve, solve)
+from solver_budget import Budget
+from sudoku_puzzle import SudokuPuzzle
+from word_ladder_puzzle import WordLadderPuzzle
+
+PUZZLE_TYPES = ("sudoku", "mn", "peg", "ladder")
+WORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "words.txt")
+# default sudoku symbols, the first n used for an n x n board
+SUDOKU_SYMBOLS = "123456789ABCDEFG"
+_PEG_BOARDS = {"english": english_board, "european": european_board,
+               "triangular": triangular_board}
+_DIRECTIONS = {"orthogonal": ORTHOGONAL, "triangular": TRIANGULAR}
+# words path -> word set, loaded once per process
+_word_sets = {}
+
+
+def word_set(path=None):
+    """
+    Return the set of words in the file at path, WORDS_PATH by default,
+    reading it only the first time.
+
+    @type path: str | None
+    @rtype: set[str]
+    """
+    path = WORDS_PATH if path is None else path
+    if path not in _word_sets:
+        with open(path) as words:
+            _word_sets[path] = set(words.read().split())
+    return _word_sets[path]
+
+
+def init_worker(words_path=None, table_dir=None):
+    """
+    Load once, in a worker process, what requests would otherwise each
+    reload: the word set, and the MNPuzzle distance tables saved in
+    table_dir.
+
+    @type words_path: str | None
+    @type table_dir: str | None
+    @rtype: None
+    """
+    word_set(words_path)
+    if table_dir is not None and os.path.isdir(table_dir):
+        load_tables(table_dir)
+
+
+def _dfs_mutable(puzzle, **kwargs):
+    # Run mutable_depth_first_solve on puzzle, without the set of states
+    # seen for a SudokuPuzzle, whose moves never reach a state twice.
+    #
+    # @type puzzle: Puzzle
+    # @rtype: PuzzleNode | None
+    return mutable_depth_first_solve(
+        puzzle, not isinstance(puzzle, SudokuPuzzle), **kwargs)
+
+
+def _table(puzzle, stats=None, budget=None):
+    # Run table_solve on puzzle; it needs no budget and keeps no stats.
+    #
+    # @type puzzle: MNPuzzle
+    # @type stats: SolverStats | None
+    # @type budget: Budget | None
+    # @rtype: PuzzleNode | None
+    return table_solve(puzzle)
+
+
+def _bfs_numpy(puzzle, **kwargs):
+    # Run breadth_first_solve on puzzle with the NumPy backend.
+    #
+    # @type puzzle: MNPuzzle
+    # @rtype: PuzzleNode | None
+    return breadth_first_solve(puzzle, backend="numpy", **kwargs)
+
+
+def _anytime(puzzle, **kwargs):
+    # Run anytime_solve on puzzle until its budget, not a fixed timeout,
+    # runs out.
+    #
+    # @type puzzle: MNPuzzle
+    # @rtype: PuzzleNode | None
+    return anytime_solve(puzzle, timeout=None, **kwargs)
+
+
+SOLVERS = {"dfs": depth_first_solve, "dfs-mutable": _dfs_mutable,
+           "iddfs": iddfs_solve, "bfs": breadth_first_solve,
+           "bfs-numpy": _bfs_numpy, "anytime": _anytime, "table": _table,
+           "meet": meet_in_the_middle_solve}
+# types of puzzle each solver that cannot solve them all can solve
+SOLVER_TYPES = {"bfs-numpy": ("mn",), "anytime": ("mn",), "table": ("mn",),
+                "meet": ("peg",)}
+# solver used for each type when a request names none
+DEFAULT_SOLVERS = {"sudoku": "dfs-mutable", "mn": "bfs",
+                   "peg": "dfs-mutable", "ladder": "bfs"}
+
+
+def _grid(rows, name):
+    # Return rows, strings or lists of symbols, as a tuple of tuples.
+    #
+    # @type rows: list[str | list[str]]
+    # @type name: str
+    # @rtype: tuple[tuple[str]]
+    if not isinstance(rows, list) or not rows:
+        raise ValueError("{!r} must be a non-empty list of rows".format(name))
+    grid = tuple(tuple(row) for row in rows)
+    if any(len(row) != len(grid[0]) for row in grid):
+        raise ValueError("rows of {!r} differ in length".format(name))
+    return grid
+
+
+def _field(request, name):
+    # Return request[name], raising ValueError if it is missing.
+    #
+    # @type request: dict
+    # @type name: str
+    # @rtype: object
+    if name not in request:
+        raise ValueError("request has no {!r}".format(name))
+    return request[name]
+
+
+def puzzle_from_json(request, words_path=None):
+    """
+    Return the puzzle described by request, a dict decoded from JSON.
+    Raise ValueError if it does not describe one.
+
+    @type request: dict
+    @type words_path: str | None
+        file of words for ladder requests, WORDS_PATH by default
+    @rtype: Puzzle
+
+    >>> print(puzzle_from_json({"type": "mn", "from": ["*23", "145"],
+    ...                         "to": ["123", "45*"]}))
+    *23
+    145
+    >>> s = puzzle_from_json({"type": "sudoku",
+    ...                       "grid": ["1*3*", "*4**", "**4*", "*3*2"]})
+    >>> s._n, sorted(s._symbol_set)
+    (4, ['1', '2', '3', '4'])
+    >>> g = puzzle_from_json({"type": "peg", "board": "triangular"})
+    >>> bin(g.key()).count("1")
+    14
+    >>> puzzle_from_json({"type": "chess"})
+    Traceback (most recent call last):
+    ...
+    ValueError: unknown puzzle type 'chess'
+    """
+    kind = request.get("type")
+    if kind == "sudoku":
+        grid = _grid(_field(request, "grid"), "grid")
+        n = len(grid)
+        symbols = request.get("symbols", SUDOKU_SYMBOLS[:n])
+        if (len(grid[0]) != n or isqrt(n) ** 2 != n or
+                len(set(symbols)) != n):
+            raise ValueError("sudoku needs n rows of n cells, n a square, "
+                             "and n distinct symbols")
+        cells = [x for row in grid for x in row]
+        if not set(cells) <= set(symbols) | {"*"}:
+            raise ValueError("sudoku grid has an unknown symbol")
+        return SudokuPuzzle(n, cells, set(symbols))
+    if kind == "mn":
+        from_grid = _grid(_field(request, "from"), "from")
+        to_grid = _grid(_field(request, "to"), "to")
+        if (len(from_grid) != len(to_grid) or
+                len(from_grid[0]) != len(to_grid[0]) or
+                sorted(x for row in from_grid for x in row) !=
+                sorted(x for row in to_grid for x in row) or
+                "*" not in (x for row in to_grid for x in row)):
+            raise ValueError("mn grids need the same shape and symbols, "
+                             "with a blank")
+        return MNPuzzle(from_grid, to_grid)
+    if kind == "peg":
+        if "board" in request:
+            if request["board"] not in _PEG_BOARDS:
+                raise ValueError("unknown peg board {!r}".format(
+                    request["board"]))
+            make = _PEG_BOARDS[request["board"]]
+            if "hole" in request:
+                return make(hole=tuple(request["hole"]))
+            return make()
+        grid = _grid(_field(request, "grid"), "grid")
+        directions = request.get("directions", "orthogonal")
+        if directions not in _DIRECTIONS:
+            raise ValueError("unknown directions {!r}".format(directions))
+        if not {x for row in grid for x in row} <= {"*", ".", "#"}:
+            raise ValueError("peg grid has a cell other than *, . or #")
+        return GridPegSolitairePuzzle([list(row) for row in grid],
+                                      {"*", ".", "#"},
+                                      _DIRECTIONS[directions])
+    if kind == "ladder":
+        from_word, to_word = _field(request, "from"), _field(request, "to")
+        if not (isinstance(from_word, str) and isinstance(to_word, str) and
+                len(from_word) == len(to_word)):
+            raise ValueError("ladder words must be strings of one length")
+        return WordLadderPuzzle(from_word, to_word, word_set(words_path))
+    raise ValueError("unknown puzzle type {!r}".format(kind))
+
+
+def solver_for(request):
+    """
+    Return the name of the solver request asks for, or the default for
+    its type.  Raise ValueError for an unknown solver, or one that
+    cannot solve puzzles of the request's type.
+
+    @type request: dict
+    @rtype: str
+
+    >>> solver_for({"type": "mn"}), solver_for({"solver": "dfs"})
+    ('bfs', 'dfs')
+    >>> solver_for({"type": "ladder", "solver": "table"})
+    Traceback (most recent call last):
+    ...
+    ValueError: solver 'table' only solves mn puzzles, not 'ladder'
+    """
+    kind = request.get("type")
+    name = request.get("solver", DEFAULT_SOLVERS.get(kind))
+    if name not in SOLVERS:
+        raise ValueError("unknown solver {!r}".format(name))
+    if kind in PUZZLE_TYPES and kind not in SOLVER_TYPES.get(name, (kind,)):
+        raise ValueError("solver {!r} only solves {} puzzles, not {!r}".format(
+            name, ", ".join(SOLVER_TYPES[name]), kind))
+    return name
+
+
+def result_to_json(request_id, result, path=True):
+    """
+    Return a dict, suitable for json.dumps, reporting SolveResult result
+    of the request with request_id: its status and, where there is one,
+    exhaustion reason, the number of moves and final puzzle of the
+    solution and, if path, every puzzle along it, as strings, and the
+    statistics gathered.
+
+    @type request_id: object
+    @type result: SolveResult
+    @type path: bool
+    @rtype: dict
+    """
+    response = {"id": request_id, "status": result.status}
+    if result.reason is not None:
+        response["reason"] = result.reason
+    if result.solution is not None:
+        puzzles = result.solution.path()
+        response["moves"] = len(puzzles) - 1
+        response["solution"] = str(puzzles[-1])
+        if path:
+            response["path"] = [str(puzzle) for puzzle in puzzles]
+    if result.stats is not None:
+        response["stats"] = result.stats.as_dict()
+    return response
+
+
+def error_to_json(request_id, message):
+    """
+    Return a dict reporting that the request with request_id failed with
+    message.
+
+    @type request_id: object
+    @type message: str
+    @rtype: dict
+    """
+    return {"id": request_id, "status": "error", "error": message}
+
+
+def solve_request(request, timeout=None, words_path=None, path=True):
+    """
+    Solve request, a dict decoded from JSON, and return the response as
+    a dict.  The request's own "timeout" overrides timeout; an anytime
+    solve returns its best path when it runs out.  Any error is
+    reported as an "error" response, never raised.
+
+    @type request: dict
+    @type timeout: float | None
+    @type words_path: str | None
+    @type path: bool
+    @rtype: dict
+
+    >>> response = solve_request({"id": 1, "type": "mn",
+    ...                           "from": ["*23", "145"],
+    ...                           "to": ["123", "45*"]})
+    >>> response["status"], response["moves"], response["solution"]
+    ('solved', 3, '123\\n45*')
+    >>> solve_request({"id": 2, "type": "mn", "from": ["*2"], "to": ["21"]})
+    {'id': 2, 'status': 'error', 'error': 'mn grids need the same shape \
+and symbols, with a blank'}
+    """
+    request_id = request.get("id") if isinstance(request, dict) else None
+    try:
+        if not isinstance(request, dict):
+            raise ValueError("request must be a JSON object")
+        solver = SOLVERS[solver_for(request)]
+        puzzle = puzzle_from_json(request, words_path)
+        timeout = request.get("timeout", timeout)
+        budget = None if timeout is None else Budget(timeout=timeout)
+        return result_to_json(request_id, solve(puzzle, solver, budget),
+                              path)
+    except (ValueError, TypeError, KeyError) as e:
+        return error_to_json(request_id, str(e))
+    except Exception as e:
+        return error_to_json(request_id, "{}: {}".format(type(e).__name__, e))
+
+
+def solve_lines(lines, defaults=None, timeout=None, words_path=None,
+                path=True):
+    """
+    Solve the request on each of lines, pairs (line number, line of
+    JSON text), and return a (status, response line) pair for each that
+    is not blank.  Fields missing from a request are taken from
+    defaults, and its id is its line number unless it gives one.
+
+    @type lines: list[(int, str)]
+    @type defaults: dict | None
+    @type timeout: float | None
+    @type words_path: str | None
+    @type path: bool
+    @rtype: list[(str, str)]
+
+    >>> lines = [(1, '{"from": "cat", "to": "cot"}'), (2, ""), (3, "{"),
+    ...          (4, "[1, 2]")]
+    >>> for status, line in solve_lines(lines, {"type": "ladder"},
+    ...                                 path=False):
+    ...     print(status, parse_line(line)["id"])
+    solved 1
+    error 3
+    error 4
+    """
+    results = []
+    for number, line in lines:
+        if not line.strip():
+            continue
+        try:
+            request = parse_line(line)
+        except ValueError as e:
+            response = error_to_json(number, "bad JSON: {}".format(e))
+        else:
+            if isinstance(request, dict):
+                request = dict(defaults or {}, **request)
+                request.setdefault("id", number)
+                response = solve_request(request, timeout, words_path, path)
+            else:
+                response = error_to_json(number,
+                                         "request must be a JSON object")
+        results.append((response["status"], format_line(response)))
+    return results
+
+
+def parse_line(line):
+    """
+    Return the request on line, one line of JSON text.  Raise ValueError
+    if it is not valid JSON.
+
+    @type line: str | bytes
+    @rtype: object
+
+    >>> parse_line('{"type": "ladder", "from": "cat", "to": "cot"}\\n')
+    {'type': 'ladder', 'from': 'cat', 'to': 'cot'}
+    """
+    return json.loads(line)
+
+
+def format_line(response):
+    """
+    Return response as one line of JSON text, ending in a newline.
+
+    @type response: dict
+    @rtype: str
+
+    >>> format_line({"id": 1, "status": "solved"})
+    '{"id": 1, "status": "solved"}\\n'
+    """
+    return json.dumps(response) + "\n"
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
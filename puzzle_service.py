@@ -0,0 +1,331 @@
+"""
+An asyncio service that solves JSON puzzle requests in worker processes.
+
+Requests and responses are JSON lines, as described in puzzle_io, read
+from and written to a Unix socket or stdin and stdout.  Responses are
+written as solves finish, so may come out of order; each carries the
+"id" of its request.  Run it with
+
+    python puzzle_service.py --socket /tmp/puzzles.sock --workers 4
+
+or, without --socket, on stdin and stdout.  Each worker process loads
+the word set and any saved MNPuzzle distance tables once, when it
+starts.
+"""
+import asyncio
+import os
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from puzzle_io import (error_to_json, format_line, init_worker, parse_line,
+                       solve_request)
+from solver_budget import BUDGET_EXHAUSTED, BudgetExhausted
+
+# seconds a worker may overrun a request's timeout before the service
+# answers without it
+GRACE = 1.0
+
+
+class PuzzleService:
+    """
+    A pool of worker processes and the limits requests are served under.
+    """
+
+    def __init__(self, workers=None, max_pending=None, timeout=None,
+                 words_path=None, table_dir=None):
+        """
+        Create a new PuzzleService self; its workers start with the
+        first request.
+
+        @type self: PuzzleService
+        @type workers: int | None
+            worker processes, os.cpu_count() by default
+        @type max_pending: int | None
+            requests being solved or waiting for a worker at once, twice
+            workers by default; reading stops while this many are
+            pending
+        @type timeout: float | None
+            seconds each request may take, unless it gives its own
+        @type words_path: str | None
+        @type table_dir: str | None
+            directory of saved MNPuzzle distance tables
+        @rtype: None
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.workers
+        self.timeout = timeout
+        self.words_path, self.table_dir = words_path, table_dir
+        self._pool = None
+        # pending requests, and those handed to a worker
+        self._slots = self._running = None
+
+    def _executor(self):
+        # Return the worker pool of PuzzleService self, starting it on
+        # first use.
+        #
+        # @type self: PuzzleService
+        # @rtype: ProcessPoolExecutor
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                self.workers, initializer=init_worker,
+                initargs=(self.words_path, self.table_dir))
+        return self._pool
+
+    async def handle(self, request):
+        """
+        Solve request, a dict decoded from JSON, in a worker process and
+        return the response as a dict.  Requests wait until a worker is
+        free.  The worker stops the solve itself half of GRACE after the
+        request's timeout, even if the solver ignores its budget; if it
+        has still not answered GRACE seconds after the timeout, answer
+        that the budget ran out, but keep the worker counted as busy
+        until it is done.  If the worker fails, answer with an error,
+        and start new workers for later requests if it died.
+
+        @type self: PuzzleService
+        @type request: dict
+        @rtype: dict
+
+        >>> service = PuzzleService(workers=1)
+        >>> request = {"id": 7, "type": "ladder", "from": "cat",
+        ...            "to": "cot"}
+        >>> response = asyncio.run(service.handle(request))
+        >>> service.close()
+        >>> response["id"], response["status"], response["moves"]
+        (7, 'solved', 1)
+
+        The table solver never checks its budget, but is stopped soon
+        after its timeout, so a later request on the same single worker
+        does not wait for it:
+
+        >>> from time import perf_counter
+        >>> slow = {"id": 8, "type": "mn", "from": ["*87", "654", "321"],
+        ...         "to": ["123", "456", "78*"], "solver": "table",
+        ...         "timeout": 0.1}
+        >>> async def after_timeout():
+        ...     first = await service.handle(slow)
+        ...     start = perf_counter()
+        ...     second = await service.handle(request)
+        ...     return (first["status"], second["status"],
+        ...             perf_counter() - start < 0.5)
+        >>> service = PuzzleService(workers=1)
+        >>> asyncio.run(after_timeout())
+        ('budget_exhausted', 'solved', True)
+        >>> service.close()
+        """
+        timeout, request_id = self.timeout, None
+        if isinstance(request, dict):
+            timeout = request.get("timeout", timeout)
+            request_id = request.get("id")
+        deadline = (timeout + GRACE / 2
+                    if isinstance(timeout, (int, float)) else None)
+        if self._running is None:
+            self._running = asyncio.Semaphore(self.workers)
+        loop = asyncio.get_running_loop()
+        await self._running.acquire()
+        pool = self._executor()
+        try:
+            try:
+                future = loop.run_in_executor(pool, _solve_within, request,
+                                              self.timeout, self.words_path,
+                                              deadline)
+            except BaseException:
+                self._running.release()
+                raise
+            # the worker is given back when it is done, not when the
+            # request is answered, so one that overruns still counts
+            # against the number of workers
+            future.add_done_callback(lambda _: self._running.release())
+            if deadline is None:
+                return await future
+            return await asyncio.wait_for(asyncio.shield(future),
+                                          timeout + GRACE)
+        except asyncio.TimeoutError:
+            return {"id": request_id, "status": BUDGET_EXHAUSTED,
+                    "reason": "timeout"}
+        except BrokenProcessPool as e:
+            if self._pool is pool:
+                self._pool = None
+                pool.shutdown(wait=False, cancel_futures=True)
+            return error_to_json(request_id,
+                                 "worker died: {}".format(e))
+        except Exception as e:
+            return error_to_json(request_id, "{}: {}".format(
+                type(e).__name__, e))
+
+    async def _respond(self, line, write):
+        # Solve the request on line and write the response, freeing a
+        # pending slot when done.
+        #
+        # @type self: PuzzleService
+        # @type line: bytes
+        # @type write: callable
+        # @rtype: None
+        try:
+            try:
+                request = parse_line(line)
+            except ValueError as e:
+                response = error_to_json(None, "bad JSON: {}".format(e))
+            else:
+                response = await self.handle(request)
+            await write(format_line(response).encode())
+        finally:
+            self._slots.release()
+
+    async def serve(self, read_line, write):
+        """
+        Answer requests, one per line returned by read_line, until it
+        returns b"", writing each response with write.  Blank lines are
+        skipped.
+
+        @type self: PuzzleService
+        @type read_line: callable
+            coroutine function returning the next line as bytes
+        @type write: callable
+            coroutine function writing bytes
+        @rtype: None
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        tasks = set()
+        while True:
+            await self._slots.acquire()
+            line = await read_line()
+            if not line:
+                self._slots.release()
+                break
+            if not line.strip():
+                self._slots.release()
+                continue
+            task = asyncio.create_task(self._respond(line, write))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def serve_connection(self, reader, writer):
+        """
+        Answer the requests of one client connected by reader and writer,
+        then close the connection.
+
+        @type self: PuzzleService
+        @type reader: asyncio.StreamReader
+        @type writer: asyncio.StreamWriter
+        @rtype: None
+        """
+        lock = asyncio.Lock()
+
+        async def write(data):
+            async with lock:
+                writer.write(data)
+                await writer.drain()
+        try:
+            await self.serve(reader.readline, write)
+        finally:
+            writer.close()
+
+    async def serve_unix(self, path):
+        """
+        Accept clients on the Unix socket at path until cancelled.
+
+        @type self: PuzzleService
+        @type path: str
+        @rtype: None
+        """
+        server = await asyncio.start_unix_server(self.serve_connection, path)
+        async with server:
+            await server.serve_forever()
+
+    async def serve_stdio(self):
+        """
+        Answer the requests on stdin, writing responses to stdout.
+        stdin is read by a thread, so it may be a pipe or a file.
+
+        @type self: PuzzleService
+        @rtype: None
+        """
+        loop = asyncio.get_running_loop()
+        stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+
+        async def read_line():
+            return await loop.run_in_executor(None, stdin.readline)
+
+        async def write(data):
+            stdout.write(data)
+            stdout.flush()
+        await self.serve(read_line, write)
+
+    def close(self):
+        """
+        Stop the worker processes of PuzzleService self.
+
+        @type self: PuzzleService
+        @rtype: None
+        """
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+def _solve_within(request, timeout, words_path, deadline):
+    # Solve request in a worker process as solve_request does, but stop
+    # the solve with BudgetExhausted if it is still running deadline
+    # seconds from now, so that a solver that never checks its budget
+    # cannot keep the worker busy after the service has answered.
+    #
+    # @type request: dict
+    # @type timeout: float | None
+    # @type words_path: str | None
+    # @type deadline: float | None
+    # @rtype: dict
+    if deadline is None or not hasattr(signal, "setitimer"):
+        return solve_request(request, timeout, words_path)
+
+    def expire(signum, frame):
+        raise BudgetExhausted("timeout")
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, deadline)
+    try:
+        return solve_request(request, timeout, words_path)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def main(argv=None):
+    """
+    Run the service with the command-line arguments argv.
+
+    @type argv: list[str] | None
+    @rtype: None
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--socket", help="Unix socket to listen on; "
+                        "stdin and stdout if omitted")
+    parser.add_argument("--workers", type=int, help="worker processes")
+    parser.add_argument("--max-pending", type=int,
+                        help="requests in progress at once")
+    parser.add_argument("--timeout", type=float,
+                        help="default seconds per request")
+    parser.add_argument("--words", help="word list for ladder requests")
+    parser.add_argument("--tables",
+                        help="directory of saved MNPuzzle distance tables")
+    args = parser.parse_args(argv)
+    service = PuzzleService(args.workers, args.max_pending, args.timeout,
+                            args.words, args.tables)
+    try:
+        if args.socket is not None:
+            asyncio.run(service.serve_unix(args.socket))
+        else:
+            asyncio.run(service.serve_stdio())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,13 @@
 Some functions for working with puzzles
 """
 from puzzle import Puzzle
+from solver_stats import SolverStats, puzzle_hooks
+from solver_budget import (Budget, BudgetExhausted, SolveResult, SOLVED,
+                           UNSOLVABLE, BUDGET_EXHAUSTED)
 from collections import deque
+from time import perf_counter
 # set higher recursion limit
-# which is needed in PuzzleNode.__str__
+# which is needed by the recursion in depth_first_solve
 # uncomment the next two lines on a unix platform, say CDF
 # import resource
 # resource.setrlimit(resource.RLIMIT_STACK, (2**29, -1))
@@ -19,45 +23,123 @@ def remove_fail(lst):
     @type lst: list[PuzzleNode]
     @rtype: None
     """
-    new_lst = lst[:]
-    for item in new_lst:
-        if item.fail_fast():
-            lst.remove(item)
+    lst[:] = [item for item in lst if not item.fail_fast()]
+
+
+def viable_extensions(puzzle):
+    """
+    Yield the extensions of puzzle that do not fail fast, building each
+    one only when the caller asks for it.
+
+    @type puzzle: Puzzle
+    @rtype: iterator[Puzzle]
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> w = WordLadderPuzzle("same", "cost", {"same", "some", "cost"})
+    >>> [str(x) for x in viable_extensions(w)]
+    ['some -> cost']
+    """
+    for child in puzzle.iter_extensions():
+        if not child.fail_fast():
+            yield child
 
 
 # implement depth_first_solve
 # do NOT change the type contract
 # you are welcome to create any helper functions
 # you like
-def depth_first_solve(puzzle, q=deque()):
+def depth_first_solve(puzzle, seen=None, stats=None, budget=None,
+                      profile=None):
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child containing an extension of the puzzle
     in its parent.  Return None if this is not possible.
 
+    Children are drawn lazily from puzzle.iter_extensions(), so siblings
+    after the first one leading to a solution are never built.  The keys
+    of puzzles already visited are added to seen, a new set unless one
+    is given, and puzzles with those keys are not searched.  If stats
+    is a SolverStats it is filled in as the search runs.  If budget is a
+    Budget, BudgetExhausted is raised once it runs out.  If profile is a
+    SolverProfile, the puzzle hooks are profiled into it.
+
     Idea inspired by:
     https://algocoding.wordpress.com/2014/08/25/depth-first-search-java-and-python-implementation/
 
     @type puzzle: Puzzle
-    @type q: deque
+    @type seen: set | None
+    @type stats: SolverStats | None
+    @type budget: Budget | None
+    @type profile: SolverProfile | None
     @rtype: PuzzleNode
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> w = WordLadderPuzzle("same", "cost", {"same", "came", "case", "cost",
+    ...                                       "cast"})
+    >>> [len(depth_first_solve(w).children) for _ in range(2)]
+    [1, 1]
     """
-    pnode = PuzzleNode(puzzle)
-    q.append(str(puzzle))
-    if puzzle.fail_fast():
+    start = perf_counter()
+    hooks = puzzle_hooks(stats)
+    if profile is not None:
+        hooks = profile.wrap_hooks(hooks)
+        profile.start(puzzle)
+    is_solved, iter_extensions, fail_fast, key = hooks
+    if budget is not None:
+        budget.start()
+    if seen is None:
+        seen = set()
+    try:
+        seen.add(key(puzzle))
+        return _depth_first(puzzle, seen, 1, is_solved, iter_extensions,
+                            fail_fast, key, stats, budget)
+    finally:
+        if profile is not None:
+            profile.stop()
+        if stats is not None:
+            stats.elapsed += perf_counter() - start
+
+
+def _depth_first(puzzle, seen, depth, is_solved, iter_extensions,
+                 fail_fast, key, stats, budget):
+    # Return the solution path below puzzle, whose key is already in
+    # seen, or None.  depth is the number of puzzles on the current path.
+    #
+    # @type puzzle: Puzzle
+    # @type seen: set
+    # @type depth: int
+    # @type stats: SolverStats | None
+    # @type budget: Budget | None
+    # @rtype: PuzzleNode | None
+    if fail_fast(puzzle):
         return None
-    elif puzzle.is_solved():
-        return pnode
-    else:
-        children = puzzle.extensions()
-        remove_fail(children)
-        if len(children) != 0:
-            for child in children:
-                if str(child) not in q:
-                    q.append(str(child))
-                    new = depth_first_solve(child)
-                    if new:
-                        return PuzzleNode(puzzle, [new])
+    elif is_solved(puzzle):
+        return PuzzleNode(puzzle)
+    if budget is not None:
+        budget.tick()
+    if stats is not None:
+        stats.nodes_expanded += 1
+        stats.max_frontier = max(stats.max_frontier, depth)
+    for child in iter_extensions(puzzle):
+        if stats is not None:
+            stats.nodes_generated += 1
+        if fail_fast(child):
+            if stats is not None:
+                stats.fail_fast_prunes += 1
+            continue
+        child_key = key(child)
+        if child_key in seen:
+            if stats is not None:
+                stats.duplicates_pruned += 1
+            continue
+        seen.add(child_key)
+        if stats is not None:
+            stats.peak_visited = max(stats.peak_visited, len(seen))
+        new = _depth_first(child, seen, depth + 1, is_solved, iter_extensions,
+                           fail_fast, key, stats, budget)
+        if new:
+            return PuzzleNode(puzzle, [new])
+    return None
 
 # implement breadth_first_solve
 # do NOT change the type contract
@@ -67,32 +149,633 @@ def depth_first_solve(puzzle, q=deque()):
 # we imported deque
 
 
-def breadth_first_solve(puzzle):
+def breadth_first_solve(puzzle, stats=None, budget=None, backend="python",
+                        profile=None):
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child PuzzleNode containing an extension
     of the puzzle in its parent.  Return None if this is not possible.
 
+    If stats is a SolverStats it is filled in as the search runs.  If
+    budget is a Budget, BudgetExhausted is raised once it runs out.  If
+    profile is a SolverProfile, the puzzle hooks and the building of
+    PuzzleNodes are profiled into it.
+
+    backend "numpy" searches an MNPuzzle a level at a time with
+    mn_vector, which needs NumPy; the path found is as short, but may
+    not be the same one, and profile is ignored.
+
     Idea Reference: http://jeremykun.com/2013/01/22/depth-and-breath-first-search/
 
     @type puzzle: Puzzle
+    @type stats: SolverStats | None
+    @type budget: Budget | None
+    @type backend: str
+    @type profile: SolverProfile | None
     @rtype: PuzzleNode
     """
+    if backend == "numpy":
+        from mn_vector import vector_breadth_first_solve
+        return vector_breadth_first_solve(puzzle, stats, budget)
+    if backend != "python":
+        raise ValueError("unknown backend {!r}".format(backend))
+    start = perf_counter()
+    if profile is not None:
+        profile.start(puzzle)
+    if budget is not None:
+        budget.start()
+    try:
+        return _breadth_first(puzzle, stats, budget, profile)
+    finally:
+        if profile is not None:
+            profile.stop()
+        if stats is not None:
+            stats.elapsed += perf_counter() - start
+
+
+def _breadth_first(puzzle, stats, budget, profile):
+    # Body of breadth_first_solve.
+    #
+    # @type puzzle: Puzzle
+    # @type stats: SolverStats | None
+    # @type budget: Budget | None
+    # @type profile: SolverProfile | None
+    # @rtype: PuzzleNode | None
+    hooks, node = puzzle_hooks(stats), PuzzleNode
+    if profile is not None:
+        hooks, node = profile.wrap_hooks(hooks), profile.wrap("node", node)
+    is_solved, iter_extensions, _, key = hooks
     deque_ = deque([PuzzleNode(puzzle)])
-    checked = {str(puzzle)}
+    checked = {key(puzzle)}
     while len(deque_) != 0:
         pnode = deque_.pop()
-        if pnode.puzzle.is_solved():
+        if is_solved(pnode.puzzle):
             while pnode.parent:
                 # this node is not root node.
                 pnode.parent.children = [pnode]
                 pnode = pnode.parent
             return pnode
         else:
-            for item in pnode.puzzle.extensions():
-                if str(item) not in checked:
-                    checked.add(str(item))
-                    deque_.appendleft(PuzzleNode(item, [], pnode))
+            if budget is not None:
+                budget.tick()
+            if stats is not None:
+                stats.nodes_expanded += 1
+            for item in iter_extensions(pnode.puzzle):
+                item_key = key(item)
+                if item_key not in checked:
+                    checked.add(item_key)
+                    deque_.appendleft(node(item, [], pnode))
+                elif stats is not None:
+                    stats.duplicates_pruned += 1
+                if stats is not None:
+                    stats.nodes_generated += 1
+            if stats is not None:
+                stats.max_frontier = max(stats.max_frontier, len(deque_))
+                stats.peak_visited = len(checked)
+
+
+def iddfs_solve(puzzle, max_depth=None, table_size=None, stats=None,
+                budget=None, profile=None):
+    """
+    Return a shortest path from PuzzleNode(puzzle) to a PuzzleNode
+    containing a solution, by iterative deepening depth-first search.
+    Return None if there is none, or none within max_depth moves.
+
+    Without a table only the current path is remembered, so memory is
+    linear in the depth.  If table_size is given, a transposition table
+    of up to table_size keys records the shallowest depth at which each
+    state was reached in the current iteration, and a state reached
+    again no shallower is not searched again.
+
+    @type puzzle: Puzzle
+    @type max_depth: int | None
+    @type table_size: int | None
+    @type stats: SolverStats | None
+    @type budget: Budget | None
+    @type profile: SolverProfile | None
+    @rtype: PuzzleNode | None
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> p = MNPuzzle(start_grid, target_grid)
+    >>> len(iddfs_solve(p).path()) == len(breadth_first_solve(p).path())
+    True
+    >>> iddfs_solve(p, table_size=1000) == iddfs_solve(p)
+    True
+    >>> iddfs_solve(p, max_depth=2) is None
+    True
+    """
+    start = perf_counter()
+    hooks = puzzle_hooks(stats)
+    if profile is not None:
+        hooks = profile.wrap_hooks(hooks)
+        profile.start(puzzle)
+    if budget is not None:
+        budget.start()
+    try:
+        if hooks[2](puzzle):
+            return None
+        limit = 0
+        while max_depth is None or limit <= max_depth:
+            table = None if table_size is None else {}
+            found, cutoff = _depth_limited(puzzle, limit, 0,
+                                           {hooks[3](puzzle)}, table,
+                                           table_size, hooks, stats, budget)
+            if found is not None:
+                return found
+            if not cutoff:
+                return None
+            limit += 1
+        return None
+    finally:
+        if profile is not None:
+            profile.stop()
+        if stats is not None:
+            stats.elapsed += perf_counter() - start
+
+
+def _depth_limited(puzzle, limit, depth, on_path, table, table_size, hooks,
+                   stats, budget):
+    # Return (path, cutoff): the solution path below puzzle using at most
+    # limit - depth more moves, or None, and whether the search was cut
+    # short anywhere by the limit.  on_path holds the keys of the
+    # puzzles on the current path, which is never allowed to loop.
+    #
+    # @type puzzle: Puzzle
+    # @type limit: int
+    # @type depth: int
+    # @type on_path: set
+    # @type table: dict | None
+    # @type table_size: int | None
+    # @type hooks: tuple
+    # @type stats: SolverStats | None
+    # @type budget: Budget | None
+    # @rtype: (PuzzleNode | None, bool)
+    is_solved, iter_extensions, fail_fast, key = hooks
+    if is_solved(puzzle):
+        return PuzzleNode(puzzle), False
+    if depth == limit:
+        return None, True
+    if budget is not None:
+        budget.tick()
+    if stats is not None:
+        stats.nodes_expanded += 1
+        stats.max_frontier = max(stats.max_frontier, depth + 1)
+    cutoff = False
+    for child in iter_extensions(puzzle):
+        if stats is not None:
+            stats.nodes_generated += 1
+        if fail_fast(child):
+            if stats is not None:
+                stats.fail_fast_prunes += 1
+            continue
+        child_key = key(child)
+        if child_key in on_path:
+            if stats is not None:
+                stats.duplicates_pruned += 1
+            continue
+        if table is not None:
+            seen = table.get(child_key)
+            if seen is not None and seen <= depth + 1:
+                if stats is not None:
+                    stats.duplicates_pruned += 1
+                continue
+            if seen is not None or len(table) < table_size:
+                table[child_key] = depth + 1
+                if stats is not None:
+                    stats.peak_visited = max(stats.peak_visited,
+                                             len(table))
+        on_path.add(child_key)
+        found, child_cutoff = _depth_limited(child, limit, depth + 1,
+                                             on_path, table, table_size,
+                                             hooks, stats, budget)
+        on_path.discard(child_key)
+        if found is not None:
+            return PuzzleNode(puzzle, [found]), False
+        cutoff = cutoff or child_cutoff
+    return None, cutoff
+
+
+def mutable_depth_first_solve(puzzle, check_cycles=True, stats=None,
+                              budget=None, nogoods=None, profile=None):
+    """
+    Return the path depth_first_solve would, searching a single copy of
+    puzzle in place through its moves(), apply(), undo() and key()
+    instead of building a puzzle per node.  Only the puzzles on the
+    returned path are built.
+
+    With check_cycles, a state whose key has been seen before is not
+    searched again; pass False for puzzles, like SudokuPuzzle, whose
+    moves never lead back to an earlier state.
+
+    Without check_cycles memory does not grow with the search, and a
+    NogoodTable can be passed as nogoods instead: states whose moves
+    all fail are stored there, and skipped when reached again.
+
+    If profile is a SolverProfile, the methods called on the copy are
+    profiled into it.
+
+    @type puzzle: Puzzle
+    @type check_cycles: bool
+    @type stats: SolverStats | None
+    @type budget: Budget | None
+    @type nogoods: NogoodTable | None
+    @type profile: SolverProfile | None
+    @rtype: PuzzleNode | None
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> grid = [["*", "*", "*", "*"], ["*", "*", ".", "*"]]
+    >>> g = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+    >>> mutable_depth_first_solve(g) == depth_first_solve(g)
+    True
+    >>> print(g)
+    ****
+    **.*
+    >>> from nogood_table import NogoodTable
+    >>> table = NogoodTable(64)
+    >>> solution = mutable_depth_first_solve(g, False, nogoods=table)
+    >>> solution == depth_first_solve(g)
+    True
+    """
+    start = perf_counter()
+    if profile is not None:
+        profile.start(puzzle)
+    if budget is not None:
+        budget.start()
+    try:
+        board = puzzle.copy()
+        if profile is not None:
+            profile.instrument(board)
+        if board.fail_fast():
+            return None
+        if board.is_solved():
+            return PuzzleNode(puzzle)
+        seen = {board.key()} if check_cycles else None
+        # moves not yet tried at each depth, the moves made to reach the
+        # current state, and the nodes expanded before each depth began
+        stack, made, started = [iter(board.moves())], [], [0]
+        expanded = 1
+        if stats is not None:
+            stats.nodes_expanded += 1
+        while stack:
+            move = next(stack[-1], None)
+            if move is None:
+                stack.pop()
+                begun = started.pop()
+                if nogoods is not None:
+                    nogoods.store(board.key(), expanded - begun)
+                if made:
+                    board.undo(made.pop())
+                continue
+            board.apply(move)
+            if stats is not None:
+                stats.nodes_generated += 1
+            if board.fail_fast():
+                board.undo(move)
+                if stats is not None:
+                    stats.fail_fast_prunes += 1
+                continue
+            if seen is not None:
+                key = board.key()
+                if key in seen:
+                    board.undo(move)
+                    if stats is not None:
+                        stats.duplicates_pruned += 1
+                    continue
+                seen.add(key)
+            if nogoods is not None and board.key() in nogoods:
+                board.undo(move)
+                continue
+            made.append(move)
+            if board.is_solved():
+                return replay(puzzle, made)
+            expanded += 1
+            if budget is not None:
+                budget.tick()
+            if stats is not None:
+                stats.nodes_expanded += 1
+                stats.max_frontier = max(stats.max_frontier, len(made) + 1)
+                if seen is not None:
+                    stats.peak_visited = max(stats.peak_visited, len(seen))
+            stack.append(iter(board.moves()))
+            started.append(expanded)
+        return None
+    finally:
+        if profile is not None:
+            profile.stop()
+        if stats is not None:
+            stats.elapsed += perf_counter() - start
+
+
+def mutable_iddfs_solve(puzzle, max_depth=None, table_size=None, stats=None,
+                        budget=None, profile=None):
+    """
+    Return the path iddfs_solve would, searching a single copy of
+    puzzle in place through its moves(), apply(), undo() and key().
+
+    @type puzzle: Puzzle
+    @type max_depth: int | None
+    @type table_size: int | None
+    @type stats: SolverStats | None
+    @type budget: Budget | None
+    @type profile: SolverProfile | None
+    @rtype: PuzzleNode | None
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> p = MNPuzzle(start_grid, target_grid)
+    >>> mutable_iddfs_solve(p) == iddfs_solve(p)
+    True
+    >>> mutable_iddfs_solve(p, table_size=1000) == iddfs_solve(p)
+    True
+    >>> mutable_iddfs_solve(p, max_depth=2) is None
+    True
+    """
+    start = perf_counter()
+    if profile is not None:
+        profile.start(puzzle)
+    if budget is not None:
+        budget.start()
+    try:
+        board = puzzle.copy()
+        if profile is not None:
+            profile.instrument(board)
+        if board.fail_fast():
+            return None
+        limit, made = 0, []
+        while max_depth is None or limit <= max_depth:
+            table = None if table_size is None else {}
+            found, cutoff = _mutable_limited(board, limit, made,
+                                             {board.key()}, table,
+                                             table_size, stats, budget)
+            if found:
+                return replay(puzzle, made)
+            if not cutoff:
+                return None
+            limit += 1
+        return None
+    finally:
+        if profile is not None:
+            profile.stop()
+        if stats is not None:
+            stats.elapsed += perf_counter() - start
+
+
+def _mutable_limited(board, limit, made, on_path, table, table_size, stats,
+                     budget):
+    # Return (found, cutoff) as for _depth_limited, searching board in
+    # place.  made holds the moves applied so far and, if found, ends
+    # with the moves to the solution; otherwise board and made are as
+    # they were.
+    #
+    # @type board: Puzzle
+    # @type limit: int
+    # @type made: list
+    # @type on_path: set
+    # @type table: dict | None
+    # @type table_size: int | None
+    # @type stats: SolverStats | None
+    # @type budget: Budget | None
+    # @rtype: (bool, bool)
+    if board.is_solved():
+        return True, False
+    depth = len(made)
+    if depth == limit:
+        return False, True
+    if budget is not None:
+        budget.tick()
+    if stats is not None:
+        stats.nodes_expanded += 1
+        stats.max_frontier = max(stats.max_frontier, depth + 1)
+    cutoff = False
+    for move in board.moves():
+        board.apply(move)
+        if stats is not None:
+            stats.nodes_generated += 1
+        if board.fail_fast():
+            board.undo(move)
+            if stats is not None:
+                stats.fail_fast_prunes += 1
+            continue
+        key = board.key()
+        if key in on_path:
+            board.undo(move)
+            if stats is not None:
+                stats.duplicates_pruned += 1
+            continue
+        if table is not None:
+            seen = table.get(key)
+            if seen is not None and seen <= depth + 1:
+                board.undo(move)
+                if stats is not None:
+                    stats.duplicates_pruned += 1
+                continue
+            if seen is not None or len(table) < table_size:
+                table[key] = depth + 1
+                if stats is not None:
+                    stats.peak_visited = max(stats.peak_visited,
+                                             len(table))
+        on_path.add(key)
+        made.append(move)
+        found, child_cutoff = _mutable_limited(board, limit, made, on_path,
+                                               table, table_size, stats,
+                                               budget)
+        if found:
+            return True, False
+        made.pop()
+        on_path.discard(key)
+        board.undo(move)
+        cutoff = cutoff or child_cutoff
+    return False, cutoff
+
+
+def replay(puzzle, moves):
+    """
+    Return the PuzzleNode path from puzzle through the states reached
+    by applying moves in turn to a copy of it.
+
+    @type puzzle: Puzzle
+    @type moves: list
+    @rtype: PuzzleNode
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> w = WordLadderPuzzle("same", "cost", {"same", "some", "cost"})
+    >>> [str(p) for p in replay(w, [(1, "a")]).path()]
+    ['same -> cost', 'some -> cost']
+    """
+    path, board = [puzzle], puzzle.copy()
+    for move in moves:
+        board.apply(move)
+        path.append(board.copy())
+    return PuzzleNode.from_path(path)
+
+
+def iter_solutions(puzzle, limit=None, check_cycles=True):
+    """
+    Yield a PuzzleNode path for each distinct way of reaching a solution
+    from puzzle, as the depth-first search finds them, stopping after
+    limit paths if limit is given.
+
+    The search never goes through a solved puzzle or revisits a puzzle
+    already on the current path, telling puzzles apart by their key(),
+    or by str() if they have none.  Pass check_cycles=False for puzzles
+    such as SudokuPuzzle whose moves can never lead back to an earlier
+    state, to skip computing keys.
+
+    @type puzzle: Puzzle
+    @type limit: int | None
+    @type check_cycles: bool
+    @rtype: iterator[PuzzleNode]
+
+    >>> from sudoku_puzzle import SudokuPuzzle
+    >>> grid = ["*", "*", "C", "D"]
+    >>> grid += ["C", "D", "*", "*"]
+    >>> grid += ["*", "*", "D", "C"]
+    >>> grid += ["D", "C", "*", "*"]
+    >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+    >>> solutions = list(iter_solutions(s, check_cycles=False))
+    >>> len(solutions), all(x.path()[-1].is_solved() for x in solutions)
+    (4, True)
+    >>> len(list(iter_solutions(s, limit=1)))
+    1
+    """
+    if limit is not None and limit <= 0:
+        return
+    found = 0
+    for path in _solution_walk(puzzle, check_cycles):
+        yield PuzzleNode.from_path(list(path))
+        found += 1
+        if limit is not None and found >= limit:
+            return
+
+
+def count_solutions(puzzle, stop_at=2, check_cycles=True):
+    """
+    Return the number of distinct paths from puzzle to a solution, as in
+    iter_solutions, but stop counting once stop_at is reached; with
+    stop_at None, count them all.
+
+    count_solutions(puzzle) == 1 says the puzzle has a unique solution
+    without searching beyond a second one.
+
+    @type puzzle: Puzzle
+    @type stop_at: int | None
+    @type check_cycles: bool
+    @rtype: int
+
+    >>> from sudoku_puzzle import SudokuPuzzle
+    >>> grid = ["*", "*", "C", "D"]
+    >>> grid += ["C", "D", "*", "*"]
+    >>> grid += ["*", "*", "D", "C"]
+    >>> grid += ["D", "C", "*", "*"]
+    >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+    >>> count_solutions(s), count_solutions(s, stop_at=None)
+    (2, 4)
+    """
+    count = 0
+    if stop_at is not None and stop_at <= 0:
+        return count
+    for _ in _solution_walk(puzzle, check_cycles):
+        count += 1
+        if stop_at is not None and count >= stop_at:
+            break
+    return count
+
+
+def _solution_walk(puzzle, check_cycles):
+    # Yield the current path, a list of puzzles that is changed after
+    # each yield, whenever the search below puzzle reaches a solution.
+    #
+    # @type puzzle: Puzzle
+    # @type check_cycles: bool
+    # @rtype: iterator[list[Puzzle]]
+    if puzzle.fail_fast():
+        return
+    if puzzle.is_solved():
+        yield [puzzle]
+        return
+    path, stack = [puzzle], [puzzle.iter_extensions()]
+    key_of = getattr(type(puzzle), "key", str)
+    keys = [key_of(puzzle)] if check_cycles else None
+    on_path = set(keys) if check_cycles else None
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+            path.pop()
+            if check_cycles:
+                on_path.discard(keys.pop())
+            continue
+        if child.fail_fast():
+            continue
+        if check_cycles:
+            key = key_of(child)
+            if key in on_path:
+                continue
+        path.append(child)
+        if child.is_solved():
+            yield path
+            path.pop()
+            continue
+        if check_cycles:
+            keys.append(key)
+            on_path.add(key)
+        stack.append(child.iter_extensions())
+
+
+def solve_with_stats(puzzle, solver=breadth_first_solve):
+    """
+    Return the pair (solution, stats) from running solver on puzzle with
+    a fresh SolverStats.
+
+    @type puzzle: Puzzle
+    @type solver: callable
+    @rtype: (PuzzleNode | None, SolverStats)
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> w = WordLadderPuzzle("same", "cost", {"same", "some", "cost"})
+    >>> solution, stats = solve_with_stats(w)
+    >>> solution is None, stats.nodes_expanded, stats.peak_visited
+    (True, 2, 2)
+    """
+    stats = SolverStats()
+    return solver(puzzle, stats=stats), stats
+
+
+def solve(puzzle, solver=breadth_first_solve, budget=None, **kwargs):
+    """
+    Run solver on puzzle under budget and return a SolveResult whose
+    stats are filled in even when the budget runs out first.
+
+    Extra keyword arguments are passed on to solver.
+
+    @type puzzle: Puzzle
+    @type solver: callable
+    @type budget: Budget | None
+    @rtype: SolveResult
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> print(solve(MNPuzzle(start_grid, target_grid)))
+    solved
+    >>> result = solve(MNPuzzle(start_grid, target_grid),
+    ...                budget=Budget(max_nodes=3))
+    >>> print(result)
+    budget_exhausted (max_nodes)
+    >>> result.stats.nodes_expanded
+    3
+    """
+    stats = SolverStats()
+    try:
+        solution = solver(puzzle, stats=stats, budget=budget, **kwargs)
+    except BudgetExhausted as e:
+        return SolveResult(BUDGET_EXHAUSTED, None, stats, e.reason)
+    if solution is None:
+        return SolveResult(UNSOLVABLE, None, stats)
+    return SolveResult(SOLVED, solution, stats)
 
 
 # Class PuzzleNode helps build trees of PuzzleNodes that have
@@ -102,11 +785,14 @@ class PuzzleNode:
     A Puzzle configuration that refers to other configurations that it
     can be extended to.
     """
+    __slots__ = ("puzzle", "children", "parent")
 
     def __init__(self, puzzle=None, children=None, parent=None):
         """
         Create a new puzzle node self with configuration puzzle.
 
+        The children list is kept as given rather than copied.
+
         @type self: PuzzleNode
         @type puzzle: Puzzle | None
         @type children: list[PuzzleNode]
@@ -117,12 +803,15 @@ class PuzzleNode:
         if children is None:
             self.children = []
         else:
-            self.children = children[:]
+            self.children = children
 
     def __eq__(self, other):
         """
         Return whether PuzzleNode self is equivalent to other
 
+        Runs of single children, as in a solution path, are compared
+        pairwise without recursion.
+
         @type self: PuzzleNode
         @type other: PuzzleNode | Any
         @rtype: bool
@@ -136,19 +825,98 @@ class PuzzleNode:
         >>> pn1.__eq__(pn3)
         False
         """
-        return (type(self) == type(other) and
-                self.puzzle == other.puzzle and
-                all([x in self.children for x in other.children]) and
-                all([x in other.children for x in self.children]))
+        pairs = [(self, other)]
+        while pairs:
+            a, b = pairs.pop()
+            if type(a) != type(b) or a.puzzle != b.puzzle:
+                return False
+            if len(a.children) == 1 and len(b.children) == 1:
+                pairs.append((a.children[0], b.children[0]))
+            elif not (all([x in a.children for x in b.children]) and
+                      all([x in b.children for x in a.children])):
+                return False
+        return True
 
     def __str__(self):
         """
         Return a human-readable string representing PuzzleNode self.
 
-        # doctest not feasible.
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> ws = {"same", "some", "cost"}
+        >>> pn = PuzzleNode(WordLadderPuzzle("same", "some", ws),
+        ...                 [PuzzleNode(WordLadderPuzzle("some", "some", ws))])
+        >>> print(pn)
+        same -> some
+        <BLANKLINE>
+        some -> some
+        <BLANKLINE>
+        <BLANKLINE>
+        """
+        # each node prints as its puzzle, a blank line, then its children
+        # separated by newlines; walk the tree with an explicit stack of
+        # nodes still to print and separators still to emit
+        parts, stack = [], [self]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                parts.append(item)
+                continue
+            parts.append(str(item.puzzle))
+            parts.append("\n\n")
+            for i in range(len(item.children) - 1, -1, -1):
+                stack.append(item.children[i])
+                if i > 0:
+                    stack.append("\n")
+        return "".join(parts)
+
+    def path(self):
+        """
+        Return the puzzles from PuzzleNode self down to the end of its
+        path, following the first child at each step.
+
+        @type self: PuzzleNode
+        @rtype: list[Puzzle]
+
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> ws = {"same", "some", "cost"}
+        >>> pn = PuzzleNode(WordLadderPuzzle("same", "some", ws),
+        ...                 [PuzzleNode(WordLadderPuzzle("some", "some", ws))])
+        >>> [str(p) for p in pn.path()]
+        ['same -> some', 'some -> some']
+        """
+        result, node = [], self
+        while node is not None:
+            result.append(node.puzzle)
+            node = node.children[0] if node.children else None
+        return result
+
+    @classmethod
+    def from_path(cls, puzzles):
+        """
+        Return a chain of PuzzleNodes, linked by children and parent,
+        holding puzzles in order; the inverse of path().  Return None if
+        puzzles is empty.
+
+        @type puzzles: list[Puzzle]
+        @rtype: PuzzleNode | None
+
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> ws = {"same", "some", "cost"}
+        >>> path = [WordLadderPuzzle("same", "some", ws),
+        ...         WordLadderPuzzle("some", "some", ws)]
+        >>> node = PuzzleNode.from_path(path)
+        >>> node.path() == path, node.children[0].parent is node
+        (True, True)
         """
-        return "{}\n\n{}".format(self.puzzle,
-                                 "\n".join([str(x) for x in self.children]))
+        root = node = None
+        for puzzle in puzzles:
+            child = cls(puzzle, None, node)
+            if node is None:
+                root = child
+            else:
+                node.children = [child]
+            node = child
+        return root
 
 if __name__ == "__main__":
     import doctest
@@ -0,0 +1,184 @@
+"""
+Command line for solving puzzles in bulk.
+
+    python -m puzzletools solve --type sudoku --solver dfs -j 8 \\
+        < in.jsonl > out.jsonl
+
+reads one JSON request per line, as described in puzzle_io, and writes
+one JSON response per line, with the request's id (its line number if
+it gives none) and the statistics of its solve, as each finishes.
+Input is read a chunk of lines at a time and only a few chunks per
+worker are in progress at once, so memory use does not grow with the
+input.  A summary is written to stderr at the end.
+"""
+import argparse
+import sys
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from time import perf_counter
+
+from puzzle_io import (PUZZLE_TYPES, SOLVERS, error_to_json, format_line,
+                       init_worker, parse_line, solve_lines)
+
+
+def solve_stream(lines, out, jobs=1, chunk=64, defaults=None, timeout=None,
+                 path=True, words_path=None, table_dir=None):
+    """
+    Solve the request on each of lines and write each response to out as
+    soon as its chunk of lines is done, using jobs worker processes.
+    Return the number of responses with each status.  If solving a
+    chunk fails, each of its requests gets an error response; if a
+    worker dies, new workers are started for the chunks after it.
+
+    @type lines: iterable[str]
+    @type out: io.TextIOBase
+    @type jobs: int
+    @type chunk: int
+        lines sent to a worker at a time
+    @type defaults: dict | None
+        fields for requests that do not give them, as in solve_lines
+    @type timeout: float | None
+    @type path: bool
+    @type words_path: str | None
+    @type table_dir: str | None
+    @rtype: Counter
+
+    >>> import io
+    >>> out = io.StringIO()
+    >>> lines = ['{"type": "ladder", "from": "cat", "to": "cot"}',
+    ...          '{"type": "mn", "from": ["21*"], "to": ["12*"]}']
+    >>> solve_stream(lines, out, path=False)
+    Counter({'solved': 1, 'unsolvable': 1})
+    >>> [line[:28] for line in out.getvalue().splitlines()]
+    ['{"id": 1, "status": "solved"', '{"id": 2, "status": "unsolva']
+    """
+    counts = Counter()
+    numbered = enumerate(lines, 1)
+    chunks = iter(lambda: list(islice(numbered, chunk)), [])
+    options = (defaults, timeout, words_path, path)
+
+    def emit(results):
+        for status, text in results:
+            counts[status] += 1
+            out.write(text)
+        out.flush()
+    if jobs <= 1:
+        init_worker(words_path, table_dir)
+        for lines_chunk in chunks:
+            try:
+                emit(solve_lines(lines_chunk, *options))
+            except Exception as e:
+                emit(_failed(lines_chunk, e))
+        return counts
+    pool, pending = None, {}
+
+    def collect():
+        nonlocal pool
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            lines_chunk = pending.pop(future)
+            try:
+                emit(future.result())
+            except BrokenProcessPool as e:
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = None
+                emit(_failed(lines_chunk, e))
+            except Exception as e:
+                emit(_failed(lines_chunk, e))
+    try:
+        for lines_chunk in chunks:
+            if len(pending) >= 2 * jobs:
+                collect()
+            if pool is None:
+                pool = ProcessPoolExecutor(jobs, initializer=init_worker,
+                                           initargs=(words_path, table_dir))
+            pending[pool.submit(solve_lines, lines_chunk,
+                                *options)] = lines_chunk
+        while pending:
+            collect()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return counts
+
+
+def _failed(lines_chunk, error):
+    # Return an error (status, response line) pair for each request on
+    # lines_chunk, whose solve failed with error, as solve_lines would
+    # have numbered them.
+    #
+    # @type lines_chunk: list[(int, str)]
+    # @type error: Exception
+    # @rtype: list[(str, str)]
+    message = "{}: {}".format(type(error).__name__, error)
+    results = []
+    for number, line in lines_chunk:
+        if not line.strip():
+            continue
+        try:
+            request = parse_line(line)
+        except ValueError:
+            request = None
+        request_id = (request.get("id", number) if isinstance(request, dict)
+                      else number)
+        results.append(("error", format_line(error_to_json(request_id,
+                                                           message))))
+    return results
+
+
+def main(argv=None):
+    """
+    Run the command line with arguments argv, and return its exit
+    status: 0, or 1 if any request was an error.
+
+    @type argv: list[str] | None
+    @rtype: int
+    """
+    parser = argparse.ArgumentParser(
+        prog="puzzletools", description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    solve = commands.add_parser("solve", help="solve JSON-lines requests")
+    solve.add_argument("input", nargs="?", type=argparse.FileType("r"),
+                       default=sys.stdin,
+                       help="file of requests, stdin by default")
+    solve.add_argument("-o", "--output", type=argparse.FileType("w"),
+                       default=sys.stdout,
+                       help="file for responses, stdout by default")
+    solve.add_argument("--type", choices=PUZZLE_TYPES,
+                       help="type of requests that give none")
+    solve.add_argument("--solver", choices=sorted(SOLVERS),
+                       help="solver for requests that name none")
+    solve.add_argument("-j", "--jobs", type=int, default=1,
+                       help="worker processes")
+    solve.add_argument("--chunk", type=int, default=64,
+                       help="requests sent to a worker at a time")
+    solve.add_argument("--timeout", type=float,
+                       help="seconds per request, unless it gives its own")
+    solve.add_argument("--no-path", dest="path", action="store_false",
+                       help="omit the puzzles along each solution")
+    solve.add_argument("--words", help="word list for ladder requests")
+    solve.add_argument("--tables",
+                       help="directory of saved MNPuzzle distance tables")
+    args = parser.parse_args(argv)
+    defaults = {name: value for name, value in
+                (("type", args.type), ("solver", args.solver))
+                if value is not None}
+    start = perf_counter()
+    counts = solve_stream(args.input, args.output, args.jobs,
+                          max(1, args.chunk), defaults, args.timeout,
+                          args.path, args.words, args.tables)
+    elapsed = perf_counter() - start
+    total = sum(counts.values())
+    print("{} requests in {:.2f}s ({:.1f}/s): {}".format(
+        total, elapsed, total / elapsed if elapsed > 0 else 0.0,
+        ", ".join("{} {}".format(status, count)
+                  for status, count in sorted(counts.items()))),
+        file=sys.stderr)
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""
+A cache of solutions in front of the solvers in puzzle_tools.
+
+Entries are keyed by solver, puzzle type and canonical state, and live
+in an in-memory LRU tier and, optionally, an sqlite file on disk.  On
+disk a solution is stored as its list of moves, encoded by
+puzzle_codec.encode_moves: the position of each step among the
+extensions of the step before, which is replayed from the queried
+puzzle to rebuild the path, so the order of extensions must not change
+between processes.  A puzzle with no solution is stored with NULL
+moves.
+"""
+import logging
+import sqlite3
+from collections import OrderedDict
+
+from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle, ORTHOGONAL
+from mn_puzzle import MNPuzzle
+from puzzle_codec import (decode_moves, encode_moves, path_moves,
+                          replay_moves)
+from puzzle_tools import breadth_first_solve
+from sudoku_puzzle import SudokuPuzzle
+from word_ladder_puzzle import WordLadderPuzzle
+
+_log = logging.getLogger(__name__)
+
+# types of keyword argument that SolutionCache.solve keys entries by
+_KEYABLE = (bool, int, float, str, type(None))
+
+
+def canonical_key(puzzle):
+    """
+    Return a str that is the same for equivalent puzzles of one type
+    and differs otherwise, including the goal where str(puzzle) leaves
+    it out.
+
+    A WordLadderPuzzle key records only the size of its word set, so one
+    cache should serve one dictionary.
+
+    @type puzzle: Puzzle
+    @rtype: str
+
+    >>> p = MNPuzzle((("*", "2"), ("1", "3")), (("1", "2"), ("3", "*")))
+    >>> canonical_key(p)
+    'MNPuzzle:*2|13->12|3*'
+    """
+    name = type(puzzle).__name__
+    if isinstance(puzzle, MNPuzzle):
+        return "{}:{}->{}".format(name, _grid_key(puzzle.from_grid),
+                                  _grid_key(puzzle.to_grid))
+    if isinstance(puzzle, SudokuPuzzle):
+        return "{}:{}:{}:{}".format(name, puzzle._n,
+                                    "".join(sorted(puzzle._symbol_set)),
+                                    "|".join(puzzle._symbols))
+    if isinstance(puzzle, GridPegSolitairePuzzle):
+        if puzzle._directions != ORTHOGONAL:
+            name += repr(puzzle._directions)
+        return "{}:{}".format(name, _grid_key(puzzle._marker))
+    if isinstance(puzzle, WordLadderPuzzle):
+        return "{}:{}->{}:{}".format(name, puzzle._from_word,
+                                     puzzle._to_word, len(puzzle._word_set))
+    return "{}:{}".format(name, puzzle)
+
+
+def _grid_key(grid):
+    # Return the rows of grid joined by "|".
+    #
+    # @type grid: list[list[str]] | tuple[tuple[str]]
+    # @rtype: str
+    return "|".join("".join(row) for row in grid)
+
+
+class SolutionCache:
+    """
+    Solutions, or the fact that there is none, for puzzles already
+    solved, in a bounded in-memory LRU tier and an optional sqlite tier.
+
+    Solutions from the memory tier are the PuzzleNodes first stored, so
+    callers should not change them.
+    """
+
+    def __init__(self, maxsize=1024, path=None):
+        """
+        Create a new SolutionCache self holding up to maxsize solutions
+        in memory and, if path is given, every solution in the sqlite
+        database at path.
+
+        @type self: SolutionCache
+        @type maxsize: int
+        @type path: str | None
+        @rtype: None
+        """
+        self.maxsize = maxsize
+        self._memory = OrderedDict()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path)
+            self._db.execute("CREATE TABLE IF NOT EXISTS solutions "
+                             "(key TEXT PRIMARY KEY, moves BLOB)")
+            self._db.commit()
+        self.memory_hits = self.disk_hits = self.misses = 0
+
+    def solve(self, puzzle, solver=breadth_first_solve, **kwargs):
+        """
+        Return solver(puzzle, **kwargs), from the cache if it is there.
+
+        Solutions are cached per solver and keyword arguments, since
+        different solvers, or one solver with different options, may
+        return different paths.  Calls with an argument that is not a
+        number, str, bool or None, such as a Budget or SolverStats,
+        are not cached: they are passed straight to solver.
+
+        @type self: SolutionCache
+        @type puzzle: Puzzle
+        @type solver: callable
+        @rtype: PuzzleNode | None
+
+        >>> p = MNPuzzle((("*", "2"), ("1", "3")), (("1", "2"), ("3", "*")))
+        >>> cache = SolutionCache()
+        >>> cache.solve(p) is cache.solve(p)
+        True
+        >>> cache.memory_hits, cache.misses
+        (1, 1)
+        >>> from puzzle_tools import iddfs_solve
+        >>> q = MNPuzzle((("2", "3"), ("1", "*")), (("1", "2"), ("3", "*")))
+        >>> cache.solve(q, iddfs_solve, max_depth=3) is None
+        True
+        >>> len(cache.solve(q, iddfs_solve, max_depth=30).path())
+        5
+
+        Entries on disk are read back by a later cache on the same file:
+
+        >>> import os, tempfile
+        >>> grid = ["A", "*", "C", "D", "C", "D", "A", "*",
+        ...         "*", "A", "D", "C", "D", "C", "*", "A"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> path = os.path.join(tempfile.mkdtemp(), "cache.db")
+        >>> first = SolutionCache(path=path)
+        >>> solution = first.solve(s)
+        >>> first.close()
+        >>> second = SolutionCache(path=path)
+        >>> second.solve(s) == solution
+        True
+        >>> second.disk_hits, second.misses
+        (1, 0)
+        >>> second.close()
+        """
+        options = sorted(kwargs.items())
+        if not all(isinstance(value, _KEYABLE) for _, value in options):
+            return solver(puzzle, **kwargs)
+        key = "{}{}:{}".format(getattr(solver, "__name__", solver),
+                               "".join(",{}={!r}".format(name, value)
+                                       for name, value in options),
+                               canonical_key(puzzle))
+        try:
+            found, solution = self._lookup(key, puzzle)
+        except ValueError as e:
+            _log.warning("cache entry %s does not decode, solving again: %s",
+                         key, e)
+            found = False
+        if found:
+            return solution
+        self.misses += 1
+        solution = solver(puzzle, **kwargs)
+        self._remember(key, solution)
+        if self._db is not None:
+            moves = (None if solution is None else
+                     encode_moves(path_moves(solution)))
+            self._db.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?)",
+                             (key, moves))
+            self._db.commit()
+        return solution
+
+    def _lookup(self, key, puzzle):
+        # Return (found, solution) for key, checking memory and then
+        # disk, where puzzle is the puzzle the key was made from.  Raise
+        # ValueError if the row on disk does not decode.
+        #
+        # @type key: str
+        # @type puzzle: Puzzle
+        # @rtype: (bool, PuzzleNode | None)
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return True, self._memory[key]
+        if self._db is None:
+            return False, None
+        row = self._db.execute("SELECT moves FROM solutions WHERE key = ?",
+                               (key,)).fetchone()
+        if row is None:
+            return False, None
+        solution = (None if row[0] is None else
+                    replay_moves(puzzle, decode_moves(row[0])))
+        self.disk_hits += 1
+        self._remember(key, solution)
+        return True, solution
+
+    def _remember(self, key, solution):
+        # Put solution in the memory tier under key, evicting the least
+        # recently used entry if it is full.
+        #
+        # @type key: str
+        # @type solution: PuzzleNode | None
+        # @rtype: None
+        self._memory[key] = solution
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        """
+        Return the hit and miss counts of SolutionCache self and its hit
+        rate.
+
+        @type self: SolutionCache
+        @rtype: dict
+        """
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {"memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": ((self.memory_hits + self.disk_hits) / lookups
+                             if lookups else 0.0),
+                "memory_size": len(self._memory)}
+
+    def clear(self):
+        """
+        Empty both tiers of SolutionCache self.
+
+        @type self: SolutionCache
+        @rtype: None
+        """
+        self._memory.clear()
+        if self._db is not None:
+            self._db.execute("DELETE FROM solutions")
+            self._db.commit()
+
+    def close(self):
+        """
+        Close the disk tier of SolutionCache self, if it has one.
+
+        @type self: SolutionCache
+        @rtype: None
+        """
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,187 @@
+"""
+Node, time and memory budgets for the solvers in puzzle_tools.
+"""
+import os
+from time import monotonic
+
+SOLVED = "solved"
+UNSOLVABLE = "unsolvable"
+BUDGET_EXHAUSTED = "budget_exhausted"
+
+
+class BudgetExhausted(Exception):
+    """
+    Raised by a solver when its Budget runs out or is cancelled.
+
+    reason is one of "max_nodes", "timeout", "max_memory" or "cancelled".
+    """
+
+    def __init__(self, reason):
+        """
+        Create a new BudgetExhausted self for reason.
+
+        @type self: BudgetExhausted
+        @type reason: str
+        @rtype: None
+        """
+        Exception.__init__(self, "solver budget exhausted: {}".format(reason))
+        self.reason = reason
+
+
+class Budget:
+    """
+    Limits on how much work a single solve may do.
+
+    Any limit left as None is not enforced.  cancel may be any object
+    with an is_set() method, such as threading.Event or
+    multiprocessing.Event; setting it stops the solve at its next check.
+    """
+
+    def __init__(self, max_nodes=None, timeout=None, max_memory=None,
+                 cancel=None, check_interval=256):
+        """
+        Create a new Budget self.
+
+        @type self: Budget
+        @type max_nodes: int | None
+            most nodes a solver may expand
+        @type timeout: float | None
+            seconds of wall-clock time a solver may run
+        @type max_memory: int | None
+            largest resident set size, in bytes, the process may reach
+        @type cancel: threading.Event | None
+        @type check_interval: int
+            node expansions between time, memory and cancellation
+            checks
+        @rtype: None
+        """
+        assert check_interval > 0
+        self.max_nodes, self.timeout = max_nodes, timeout
+        self.max_memory, self.cancel = max_memory, cancel
+        self.check_interval = check_interval
+        self.nodes, self.deadline = 0, None
+        self._countdown = check_interval
+
+    def start(self):
+        """
+        Reset the node count of Budget self and start its clock.
+
+        @type self: Budget
+        @rtype: None
+        """
+        self.nodes = 0
+        self._countdown = self.check_interval
+        if self.timeout is not None:
+            self.deadline = monotonic() + self.timeout
+        else:
+            self.deadline = None
+
+    def tick(self, count=1):
+        """
+        Record count node expansions against Budget self, raising
+        BudgetExhausted if a limit has been reached.
+
+        @type self: Budget
+        @type count: int
+        @rtype: None
+
+        >>> b = Budget(max_nodes=2)
+        >>> b.start()
+        >>> b.tick(); b.tick()
+        >>> b.tick() # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ...
+        solver_budget.BudgetExhausted: solver budget exhausted: max_nodes
+        """
+        self.nodes += count
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise BudgetExhausted("max_nodes")
+        self._countdown -= count
+        if self._countdown <= 0:
+            self._countdown = self.check_interval
+            self.check()
+
+    def check(self):
+        """
+        Raise BudgetExhausted if Budget self has been cancelled, has run
+        out of time, or the process is over its memory limit.
+
+        @type self: Budget
+        @rtype: None
+
+        >>> import threading
+        >>> b = Budget(cancel=threading.Event())
+        >>> b.start()
+        >>> b.check()
+        >>> b.cancel.set()
+        >>> b.check() # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ...
+        solver_budget.BudgetExhausted: solver budget exhausted: cancelled
+        """
+        if self.cancel is not None and self.cancel.is_set():
+            raise BudgetExhausted("cancelled")
+        if self.deadline is not None and monotonic() >= self.deadline:
+            raise BudgetExhausted("timeout")
+        if (self.max_memory is not None and
+                resident_memory() > self.max_memory):
+            raise BudgetExhausted("max_memory")
+
+
+class SolveResult:
+    """
+    Outcome of a budgeted solve: status is SOLVED, UNSOLVABLE or
+    BUDGET_EXHAUSTED, with the solution path (if any), the statistics
+    gathered so far and, for an exhausted budget, the reason.
+    """
+
+    def __init__(self, status, solution=None, stats=None, reason=None):
+        """
+        Create a new SolveResult self.
+
+        @type self: SolveResult
+        @type status: str
+        @type solution: PuzzleNode | None
+        @type stats: SolverStats | None
+        @type reason: str | None
+        @rtype: None
+        """
+        self.status, self.solution = status, solution
+        self.stats, self.reason = stats, reason
+
+    def __str__(self):
+        """
+        Return a human-readable summary of SolveResult self.
+
+        @type self: SolveResult
+        @rtype: str
+
+        >>> print(SolveResult(BUDGET_EXHAUSTED, reason="timeout"))
+        budget_exhausted (timeout)
+        """
+        if self.reason is None:
+            return self.status
+        return "{} ({})".format(self.status, self.reason)
+
+
+def resident_memory():
+    """
+    Return the resident set size of this process in bytes, or the peak
+    resident set size where the current one is unavailable.
+
+    @rtype: int
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
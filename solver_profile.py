@@ -0,0 +1,269 @@
+"""
+Opt-in profiling for the solvers in puzzle_tools.
+
+Pass a SolverProfile as the profile argument of a solver to count the
+calls and time of every puzzle hook, by puzzle type, and optionally to
+run cProfile and tracemalloc around the solve.  One profile may be
+passed to many solves; report() sums them up per puzzle type.
+"""
+import cProfile
+import io
+import pstats
+import tracemalloc
+from time import perf_counter
+
+# hooks counted as one node expansion each
+_EXPANDING = ("extensions", "moves")
+
+
+class SolverProfile:
+    """
+    Calls of and time in each puzzle hook, and solves, elapsed time and
+    peak memory, by puzzle type.
+
+    calls[type name][hook] and time[type name][hook] are filled in for
+    the hooks of puzzle_hooks, "node" for PuzzleNodes built by
+    breadth_first_solve, and the moves, apply, undo, key, fail_fast and
+    is_solved methods used by the mutable solvers.
+    """
+
+    def __init__(self, cprofile=False, memory=False):
+        """
+        Create a new SolverProfile self.
+
+        @type self: SolverProfile
+        @type cprofile: bool
+            run cProfile around every solve
+        @type memory: bool
+            trace allocations with tracemalloc during every solve
+        @rtype: None
+        """
+        self.calls, self.time = {}, {}
+        self.solves, self.elapsed, self.peak_memory = {}, {}, {}
+        self.memory = memory
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self._type = self._start = None
+        self._was_tracing, self._base = False, 0
+
+    def start(self, puzzle):
+        """
+        Begin profiling a solve of puzzle.
+
+        @type self: SolverProfile
+        @type puzzle: Puzzle
+        @rtype: None
+        """
+        self._type = type(puzzle).__name__
+        self.solves[self._type] = self.solves.get(self._type, 0) + 1
+        if self.memory:
+            self._was_tracing = tracemalloc.is_tracing()
+            if not self._was_tracing:
+                tracemalloc.start()
+            self._base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        if self.cprofile is not None:
+            self.cprofile.enable()
+        self._start = perf_counter()
+
+    def stop(self):
+        """
+        End profiling the solve begun by the last start.
+
+        @type self: SolverProfile
+        @rtype: None
+        """
+        elapsed = perf_counter() - self._start
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        name = self._type
+        self.elapsed[name] = self.elapsed.get(name, 0.0) + elapsed
+        if self.memory:
+            peak = tracemalloc.get_traced_memory()[1] - self._base
+            if not self._was_tracing:
+                tracemalloc.stop()
+            self.peak_memory[name] = max(self.peak_memory.get(name, 0), peak)
+
+    def wrap(self, name, fn):
+        """
+        Return fn, called with a puzzle first, wrapped to count its
+        calls and time as hook name of the type of that puzzle.
+
+        @type self: SolverProfile
+        @type name: str
+        @type fn: callable
+        @rtype: callable
+
+        >>> profile = SolverProfile()
+        >>> upper = profile.wrap("upper", str.upper)
+        >>> upper("ab"), profile.calls
+        ('AB', {'str': {'upper': 1}})
+        """
+        calls, time = self.calls, self.time
+
+        def profiled(puzzle, *args):
+            start = perf_counter()
+            try:
+                return fn(puzzle, *args)
+            finally:
+                _charge(calls, time, type(puzzle).__name__, name,
+                        perf_counter() - start)
+        return profiled
+
+    def wrap_extensions(self, fn):
+        """
+        Return fn, an iter_extensions hook, wrapped to charge the time
+        spent producing each child to "extensions" of the puzzle's type.
+
+        @type self: SolverProfile
+        @type fn: callable
+        @rtype: callable
+        """
+        calls, time = self.calls, self.time
+
+        def profiled(puzzle):
+            name = type(puzzle).__name__
+            start = perf_counter()
+            children = fn(puzzle)
+            _charge(calls, time, name, "extensions", perf_counter() - start)
+            while True:
+                start = perf_counter()
+                try:
+                    child = next(children)
+                except StopIteration:
+                    time[name]["extensions"] += perf_counter() - start
+                    return
+                time[name]["extensions"] += perf_counter() - start
+                yield child
+        return profiled
+
+    def wrap_hooks(self, hooks):
+        """
+        Return the (is_solved, iter_extensions, fail_fast, key) hooks of
+        puzzle_hooks, each wrapped to be profiled.
+
+        @type self: SolverProfile
+        @type hooks: tuple
+        @rtype: tuple
+        """
+        is_solved, iter_extensions, fail_fast, key = hooks
+        return (self.wrap("is_solved", is_solved),
+                self.wrap_extensions(iter_extensions),
+                self.wrap("fail_fast", fail_fast), self.wrap("key", key))
+
+    def instrument(self, board):
+        """
+        Profile the methods the mutable solvers call on board, a private
+        copy of the puzzle, by shadowing each with a wrapped one.
+
+        @type self: SolverProfile
+        @type board: Puzzle
+        @rtype: None
+        """
+        for name in ("moves", "apply", "undo", "key", "fail_fast",
+                     "is_solved"):
+            method = getattr(type(board), name)
+            setattr(board, name, _bind(self.wrap(name, method), board))
+
+    def as_dict(self):
+        """
+        Return the profile of SolverProfile self as a plain dict,
+        suitable for json.dumps, by puzzle type.
+
+        @type self: SolverProfile
+        @rtype: dict
+        """
+        result = {}
+        for name in sorted(set(self.solves) | set(self.calls)):
+            calls, time = self.calls.get(name, {}), self.time.get(name, {})
+            expanded = sum(calls.get(hook, 0) for hook in _EXPANDING)
+            entry = {"solves": self.solves.get(name, 0),
+                     "elapsed": self.elapsed.get(name, 0.0),
+                     "nodes_expanded": expanded,
+                     "hooks": {hook: {"calls": calls[hook],
+                                      "seconds": time[hook]}
+                               for hook in sorted(calls)}}
+            if name in self.peak_memory:
+                entry["peak_memory"] = self.peak_memory[name]
+                entry["bytes_per_node"] = (self.peak_memory[name] / expanded
+                                           if expanded else 0.0)
+            result[name] = entry
+        return result
+
+    def report(self, top=15):
+        """
+        Return a human-readable report of SolverProfile self: for each
+        puzzle type, its solves, time and nodes, bytes allocated per
+        node expanded if memory was traced, and the calls and time of
+        each hook, busiest first; then, if cProfile ran, the top
+        functions by cumulative time.
+
+        @type self: SolverProfile
+        @type top: int
+        @rtype: str
+
+        >>> from mn_puzzle import MNPuzzle
+        >>> from puzzle_tools import breadth_first_solve
+        >>> p = MNPuzzle((("*", "2", "3"), ("1", "4", "5")),
+        ...              (("1", "2", "3"), ("4", "5", "*")))
+        >>> profile = SolverProfile(memory=True)
+        >>> solution = breadth_first_solve(p, profile=profile)
+        >>> print(profile.report()) # doctest: +ELLIPSIS
+        MNPuzzle: 1 solves in ...s, 7 nodes expanded, ... bytes/node
+          hook             calls      seconds   us/call
+        ...
+        >>> profile.calls["MNPuzzle"]
+        {'key': 19, 'is_solved': 8, 'extensions': 7, 'node': 12}
+        """
+        lines = []
+        for name, entry in self.as_dict().items():
+            line = "{}: {} solves in {:.4f}s, {} nodes expanded".format(
+                name, entry["solves"], entry["elapsed"],
+                entry["nodes_expanded"])
+            if "bytes_per_node" in entry:
+                line += ", {:.0f} bytes/node".format(entry["bytes_per_node"])
+            lines.append(line)
+            lines.append("  {:<12} {:>9} {:>12} {:>9}".format(
+                "hook", "calls", "seconds", "us/call"))
+            hooks = sorted(entry["hooks"].items(),
+                           key=lambda item: -item[1]["seconds"])
+            for hook, counts in hooks:
+                lines.append("  {:<12} {:>9} {:>12.6f} {:>9.2f}".format(
+                    hook, counts["calls"], counts["seconds"],
+                    1e6 * counts["seconds"] / counts["calls"]))
+        if self.cprofile is not None:
+            out = io.StringIO()
+            pstats.Stats(self.cprofile, stream=out).sort_stats(
+                "cumulative").print_stats(top)
+            lines.append(out.getvalue().rstrip())
+        return "\n".join(lines)
+
+
+def _charge(calls, time, type_name, hook, seconds):
+    # Count one call of hook on a puzzle of type_name, taking seconds.
+    #
+    # @type calls: dict[str, dict[str, int]]
+    # @type time: dict[str, dict[str, float]]
+    # @type type_name: str
+    # @type hook: str
+    # @type seconds: float
+    # @rtype: None
+    type_calls = calls.setdefault(type_name, {})
+    type_time = time.setdefault(type_name, {})
+    type_calls[hook] = type_calls.get(hook, 0) + 1
+    type_time[hook] = type_time.get(hook, 0.0) + seconds
+
+
+def _bind(fn, board):
+    # Return fn with board as its first argument.
+    #
+    # @type fn: callable
+    # @type board: Puzzle
+    # @rtype: callable
+    def bound(*args):
+        return fn(board, *args)
+    return bound
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
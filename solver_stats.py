@@ -0,0 +1,159 @@
+"""
+Opt-in statistics for the solvers in puzzle_tools.
+"""
+from operator import methodcaller
+from time import perf_counter
+
+# names of the puzzle hooks whose running time is recorded
+HOOKS = ("extensions", "is_solved", "fail_fast", "key")
+
+
+class SolverStats:
+    """
+    Counters and per-hook timings gathered while a solver runs.
+
+    Pass an instance as the stats argument of a solver in puzzle_tools;
+    solvers leave it untouched when no instance is given.
+    """
+
+    def __init__(self):
+        """
+        Create a new SolverStats self with every counter at zero.
+
+        @type self: SolverStats
+        @rtype: None
+        """
+        self.nodes_expanded = 0
+        self.nodes_generated = 0
+        self.duplicates_pruned = 0
+        self.fail_fast_prunes = 0
+        self.max_frontier = 0
+        self.peak_visited = 0
+        self.elapsed = 0.0
+        self.time = {name: 0.0 for name in HOOKS}
+
+    def as_dict(self):
+        """
+        Return a plain dict of the statistics in SolverStats self,
+        suitable for json.dumps.
+
+        @type self: SolverStats
+        @rtype: dict
+
+        >>> sorted(SolverStats().as_dict())[:3]
+        ['duplicates_pruned', 'elapsed', 'fail_fast_prunes']
+        """
+        d = {"nodes_expanded": self.nodes_expanded,
+             "nodes_generated": self.nodes_generated,
+             "duplicates_pruned": self.duplicates_pruned,
+             "fail_fast_prunes": self.fail_fast_prunes,
+             "max_frontier": self.max_frontier,
+             "peak_visited": self.peak_visited,
+             "elapsed": self.elapsed,
+             "time": dict(self.time)}
+        return d
+
+    def nodes_per_second(self):
+        """
+        Return the number of nodes expanded per second of elapsed time,
+        or 0.0 if no time was recorded.
+
+        @type self: SolverStats
+        @rtype: float
+        """
+        if self.elapsed <= 0:
+            return 0.0
+        return self.nodes_expanded / self.elapsed
+
+    def __str__(self):
+        """
+        Return a human-readable summary of SolverStats self.
+
+        @type self: SolverStats
+        @rtype: str
+
+        >>> print(SolverStats()) # doctest: +ELLIPSIS
+        expanded 0, generated 0, duplicates 0, fail_fast 0, ...
+        """
+        timings = ", ".join("{} {:.4f}s".format(name, self.time[name])
+                            for name in HOOKS)
+        return ("expanded {}, generated {}, duplicates {}, fail_fast {}, "
+                "max frontier {}, peak visited {}, elapsed {:.4f}s "
+                "({})".format(self.nodes_expanded, self.nodes_generated,
+                              self.duplicates_pruned, self.fail_fast_prunes,
+                              self.max_frontier, self.peak_visited,
+                              self.elapsed, timings))
+
+
+_is_solved = methodcaller("is_solved")
+_fail_fast = methodcaller("fail_fast")
+_iter_extensions = methodcaller("iter_extensions")
+
+
+def puzzle_hooks(stats=None):
+    """
+    Return the callables (is_solved, iter_extensions, fail_fast, key) a
+    solver should use on each puzzle.  With stats None these are thin
+    method calls; otherwise each call is timed into stats.time.
+
+    @type stats: SolverStats | None
+    @rtype: tuple
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> stats = SolverStats()
+    >>> is_solved, exts, fail_fast, key = puzzle_hooks(stats)
+    >>> w = WordLadderPuzzle("same", "cost", {"same", "some", "cost"})
+    >>> [key(x) for x in exts(w)]
+    ['some -> cost']
+    >>> stats.time["extensions"] > 0
+    True
+    """
+    if stats is None:
+        return _is_solved, _iter_extensions, _fail_fast, str
+    return (_timed(stats.time, "is_solved", _is_solved),
+            _timed_extensions(stats.time),
+            _timed(stats.time, "fail_fast", _fail_fast),
+            _timed(stats.time, "key", str))
+
+
+def _timed(totals, name, fn):
+    # Return fn wrapped so that its running time is added to totals[name].
+    #
+    # @type totals: dict[str, float]
+    # @type name: str
+    # @type fn: callable
+    # @rtype: callable
+    def timed(puzzle):
+        start = perf_counter()
+        try:
+            return fn(puzzle)
+        finally:
+            totals[name] += perf_counter() - start
+    return timed
+
+
+def _timed_extensions(totals):
+    # Return a replacement for Puzzle.iter_extensions that charges the
+    # time spent producing each child to totals["extensions"].
+    #
+    # @type totals: dict[str, float]
+    # @rtype: callable
+    def timed(puzzle):
+        start = perf_counter()
+        children = puzzle.iter_extensions()
+        totals["extensions"] += perf_counter() - start
+        while True:
+            start = perf_counter()
+            try:
+                child = next(children)
+            except StopIteration:
+                totals["extensions"] += perf_counter() - start
+                return
+            totals["extensions"] += perf_counter() - start
+            yield child
+    return timed
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
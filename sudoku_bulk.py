@@ -0,0 +1,165 @@
+"""
+Solve many SudokuPuzzles at once with NumPy.
+
+A batch of N boards of one size is an (N, n*n) array of values, 0 for
+an empty cell, from which an (N, n*n) array of candidate bitmasks, as
+in sudoku_generator, is worked out each round.  Naked singles (a cell
+with one candidate) and hidden singles (a symbol with one place left in
+a unit) are filled in on every board at once until no board changes.
+Boards this leaves unfinished are handed one at a time to
+sudoku_generator.solve_values.  Needs NumPy.
+"""
+import numpy as np
+
+from sudoku_generator import (cell_units, geometry, solve_values, to_puzzle,
+                              to_values)
+
+# n -> (unit cells, cell units, bit of value, popcount, lowest value)
+_tables = {}
+
+
+def _lookup_tables(n):
+    # Return arrays for n x n boards: the cells of each unit, the three
+    # units of each cell, the mask bit of each value (0 for empty), and
+    # for each candidate mask its number of bits and its lowest value.
+    #
+    # @type n: int
+    # @rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray,
+    #          numpy.ndarray, numpy.ndarray)
+    if n not in _tables:
+        masks = np.arange(1 << n)
+        popcount = np.zeros(1 << n, dtype=np.uint8)
+        lowest = np.zeros(1 << n, dtype=np.int16)
+        for v in range(n, 0, -1):
+            has = (masks >> (v - 1)) & 1 == 1
+            popcount += has
+            lowest[has] = v
+        _tables[n] = (np.array(geometry(n)[0], dtype=np.intp),
+                      np.array(cell_units(n), dtype=np.intp),
+                      np.array([0] + [1 << v for v in range(n)],
+                               dtype=np.int32),
+                      popcount, lowest)
+    return _tables[n]
+
+
+def propagate_values(n, values):
+    """
+    Fill in every naked and hidden single of the n x n boards in values,
+    an (N, n*n) array, until none is left.  Return (values, ok) where ok
+    is False for boards found to break a rule.
+
+    @type n: int
+    @type values: numpy.ndarray
+    @rtype: (numpy.ndarray, numpy.ndarray)
+
+    >>> boards = np.array([[1, 0, 3, 0, 0, 4, 0, 2, 0, 1, 0, 3, 4, 0, 2, 0],
+    ...                    [1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]])
+    >>> filled, ok = propagate_values(4, boards)
+    >>> ok.tolist(), int((filled[0] == 0).sum())
+    ([True, False], 0)
+    """
+    unit_cells, cell_units, bit_of, popcount, lowest = _lookup_tables(n)
+    full = (1 << n) - 1
+    values = np.array(values, dtype=np.int16)
+    ok = np.ones(len(values), dtype=bool)
+    active = np.arange(len(values))
+    while len(active):
+        board = values[active]
+        empty = board == 0
+        placed = bit_of[board][:, unit_cells]
+        used, twice = _once_twice(placed)
+        candidates = full & ~np.bitwise_or.reduce(used[:, cell_units], axis=2)
+        candidates[~empty] = 0
+        options = popcount[candidates]
+        place, many = _once_twice(candidates[:, unit_cells])
+        dead = ((twice != 0).any(axis=1) |
+                (empty & (options == 0)).any(axis=1) |
+                ((place | used) != full).any(axis=1))
+        hidden = place & ~many
+        choice = np.where(options == 1, candidates, candidates &
+                          np.bitwise_or.reduce(hidden[:, cell_units], axis=2))
+        filled = np.where(empty, lowest[choice], board)
+        ok[active[dead]] = False
+        changed = (filled != board).any(axis=1) & ~dead
+        values[active] = filled
+        active = active[changed]
+    return values, ok
+
+
+def _once_twice(masks):
+    # Return (once, twice) for the (N, units, n) array masks: the bits
+    # set in at least one, and in at least two, masks of each unit.
+    #
+    # @type masks: numpy.ndarray
+    # @rtype: (numpy.ndarray, numpy.ndarray)
+    once = np.zeros(masks.shape[:2], dtype=masks.dtype)
+    twice = once.copy()
+    for i in range(masks.shape[2]):
+        twice |= once & masks[:, :, i]
+        once |= masks[:, :, i]
+    return once, twice
+
+
+def solve_values_many(n, values):
+    """
+    Return (values, ok) for the n x n boards in values, an (N, n*n)
+    array, with every board that has a solution solved and ok False for
+    those that have none.
+
+    @type n: int
+    @type values: numpy.ndarray
+    @rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    values, ok = propagate_values(n, values)
+    for i in np.nonzero(ok & (values == 0).any(axis=1))[0]:
+        solution = solve_values(n, values[i].tolist())
+        if solution is None:
+            ok[i] = False
+        else:
+            values[i] = solution
+    return values, ok
+
+
+def solve_many(puzzles):
+    """
+    Return the solved SudokuPuzzle for each of puzzles, or None for
+    those with no solution, in the same order.
+
+    @type puzzles: list[SudokuPuzzle]
+    @rtype: list[SudokuPuzzle | None]
+
+    >>> from sudoku_puzzle import SudokuPuzzle
+    >>> grid = ["A", "*", "C", "*"]
+    >>> grid += ["*", "D", "*", "B"]
+    >>> grid += ["*", "A", "*", "C"]
+    >>> grid += ["D", "*", "B", "*"]
+    >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+    >>> bad = SudokuPuzzle(4, ["A", "A"] + ["*"] * 14, {"A", "B", "C", "D"})
+    >>> first, second = solve_many([s, bad])
+    >>> print(first)
+    AB|CD
+    CD|AB
+    -----
+    BA|DC
+    DC|BA
+    >>> second is None
+    True
+    """
+    results = [None] * len(puzzles)
+    by_size = {}
+    for i, puzzle in enumerate(puzzles):
+        by_size.setdefault(puzzle._n, []).append(i)
+    for n, indices in by_size.items():
+        converted = [to_values(puzzles[i]) for i in indices]
+        values, ok = solve_values_many(
+            n, np.array([v for v, _ in converted], dtype=np.int16))
+        for row, i in enumerate(indices):
+            if ok[row]:
+                results[i] = to_puzzle(n, values[row].tolist(),
+                                       converted[row][1])
+    return results
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,525 @@
+"""
+Generate and grade SudokuPuzzles.
+
+The work is done on a compact board: a list of ints, 0 for an empty
+cell and 1..n for a symbol, with a bitmask of remaining candidates per
+cell.  Boards are translated to and from SudokuPuzzle at the edges.
+"""
+import random
+
+from sudoku_puzzle import SudokuPuzzle
+
+DEFAULT_SYMBOLS = {4: "1234", 9: "123456789", 16: "123456789ABCDEFG"}
+
+# difficulty grades, from least to most work needed
+EASY, MEDIUM, HARD = "easy", "medium", "hard"
+
+# n -> (units, peers) for an n x n board
+_geometry = {}
+# n -> the units of each cell of an n x n board
+_units_of_cell = {}
+
+
+def geometry(n):
+    """
+    Return (units, peers) for an n x n board, where units lists the
+    cells of every row, column and subsquare, and peers[i] lists the
+    other cells sharing a unit with cell i.
+
+    @type n: int
+    @rtype: (list[list[int]], list[list[int]])
+
+    >>> units, peers = geometry(4)
+    >>> len(units), sorted(peers[0])
+    (12, [1, 2, 3, 4, 5, 8, 12])
+    """
+    if n not in _geometry:
+        r = round(n ** (1 / 2))
+        assert r * r == n
+        rows = [[i * n + j for j in range(n)] for i in range(n)]
+        columns = [[i * n + j for i in range(n)] for j in range(n)]
+        boxes = [[(br + i) * n + bc + j for i in range(r) for j in range(r)]
+                 for br in range(0, n, r) for bc in range(0, n, r)]
+        units = rows + columns + boxes
+        peers = [set() for _ in range(n * n)]
+        for unit in units:
+            for cell in unit:
+                peers[cell].update(unit)
+        _geometry[n] = (units, [sorted(p - {i})
+                                for i, p in enumerate(peers)])
+    return _geometry[n]
+
+
+def cell_units(n):
+    """
+    Return, for each cell of an n x n board, the indices in
+    geometry(n)[0] of its row, column and subsquare.
+
+    @type n: int
+    @rtype: list[(int, int, int)]
+
+    >>> cell_units(4)[5]
+    (1, 5, 8)
+    """
+    if n not in _units_of_cell:
+        r = round(n ** (1 / 2))
+        _units_of_cell[n] = [(i // n, n + i % n,
+                              2 * n + (i // n // r) * r + i % n // r)
+                             for i in range(n * n)]
+    return _units_of_cell[n]
+
+
+class _Board:
+    """
+    Cell values and candidate masks of a partly filled n x n grid.
+    """
+
+    def __init__(self, n, values=None):
+        """
+        Create a new _Board self with values (default: all empty).
+        self.ok is False if values already break a rule.
+
+        @type self: _Board
+        @type n: int
+        @type values: list[int] | None
+        @rtype: None
+        """
+        self.n = n
+        self.units, self.peers = geometry(n)
+        full, self.ok = (1 << n) - 1, True
+        if values is None:
+            self.values, self.candidates = [0] * (n * n), [full] * (n * n)
+            return
+        self.values = values[:]
+        # used[u] is the mask of symbols placed in unit u; units are the
+        # n rows, then n columns, then n subsquares
+        used = [0] * (3 * n)
+        units_of = cell_units(n)
+        for cell, value in enumerate(values):
+            if value:
+                bit = 1 << (value - 1)
+                for u in units_of[cell]:
+                    if used[u] & bit:
+                        self.ok = False
+                    used[u] |= bit
+        self.candidates = [
+            0 if values[cell] else
+            full & ~(used[a] | used[b] | used[c])
+            for cell, (a, b, c) in enumerate(units_of)]
+        if not all(values[cell] or self.candidates[cell]
+                   for cell in range(n * n)):
+            self.ok = False
+
+    def copy(self):
+        """
+        Return a copy of _Board self.
+
+        @type self: _Board
+        @rtype: _Board
+        """
+        board = _Board.__new__(_Board)
+        board.n, board.units, board.peers = self.n, self.units, self.peers
+        board.values, board.candidates = self.values[:], self.candidates[:]
+        board.ok = self.ok
+        return board
+
+    def assign(self, cell, value):
+        """
+        Put value in cell and remove it from the candidates of the
+        cell's peers.  Return False if that leaves a contradiction.
+
+        @type self: _Board
+        @type cell: int
+        @type value: int
+        @rtype: bool
+        """
+        bit = 1 << (value - 1)
+        if not self.candidates[cell] & bit:
+            return False
+        self.values[cell], self.candidates[cell] = value, 0
+        values, candidates = self.values, self.candidates
+        for peer in self.peers[cell]:
+            if candidates[peer] & bit:
+                candidates[peer] &= ~bit
+                if not candidates[peer] and not values[peer]:
+                    return False
+            elif values[peer] == value:
+                return False
+        return True
+
+    def propagate(self, hidden=True):
+        """
+        Fill every naked single (a cell with one candidate) and, if
+        hidden, every hidden single (a symbol with one place left in a
+        unit) until none remain.  Return False on a contradiction.
+
+        @type self: _Board
+        @type hidden: bool
+        @rtype: bool
+        """
+        values, candidates, n = self.values, self.candidates, self.n
+        changed = True
+        while changed:
+            changed = False
+            for cell in range(n * n):
+                mask = candidates[cell]
+                if not values[cell] and mask and not mask & (mask - 1):
+                    if not self.assign(cell, mask.bit_length()):
+                        return False
+                    changed = True
+            if not hidden:
+                continue
+            for unit in self.units:
+                placed, once, twice = 0, 0, 0
+                for cell in unit:
+                    if values[cell]:
+                        placed |= 1 << (values[cell] - 1)
+                    else:
+                        twice |= once & candidates[cell]
+                        once |= candidates[cell]
+                if (once | placed) != (1 << n) - 1:
+                    return False
+                singles = once & ~twice
+                while singles:
+                    bit = singles & -singles
+                    singles ^= bit
+                    for cell in unit:
+                        if candidates[cell] & bit:
+                            if not self.assign(cell, bit.bit_length()):
+                                return False
+                            changed = True
+                            break
+        return True
+
+    def branch_cell(self):
+        """
+        Return the empty cell with fewest candidates, or None if the
+        board is full.
+
+        @type self: _Board
+        @rtype: int | None
+        """
+        best, best_count = None, self.n + 1
+        for cell, mask in enumerate(self.candidates):
+            if not self.values[cell]:
+                count = bin(mask).count("1")
+                if count < best_count:
+                    best, best_count = cell, count
+                    if count <= 2:
+                        break
+        return best
+
+
+class _GiveUp(Exception):
+    """
+    Raised by _search when its node allowance runs out.
+    """
+
+
+def _search(board, limit, rng=None, allowance=None):
+    # Return (count, first): the number of solutions of board, stopping
+    # at limit, and the values of the first one found.  With rng the
+    # candidates of each branch cell are tried in random order.  If
+    # allowance is a one-item list, it is the number of boards the
+    # search may still visit, and _GiveUp is raised when it runs out.
+    #
+    # @type board: _Board
+    # @type limit: int
+    # @type rng: random.Random | None
+    # @type allowance: list[int] | None
+    # @rtype: (int, list[int] | None)
+    if allowance is not None:
+        allowance[0] -= 1
+        if allowance[0] < 0:
+            raise _GiveUp
+    if not board.ok or not board.propagate():
+        return 0, None
+    cell = board.branch_cell()
+    if cell is None:
+        return 1, board.values
+    mask = board.candidates[cell]
+    choices = [v for v in range(1, board.n + 1) if mask & (1 << (v - 1))]
+    if rng is not None:
+        rng.shuffle(choices)
+    count, first = 0, None
+    for value in choices:
+        child = board.copy()
+        if not child.assign(cell, value):
+            continue
+        found, solution = _search(child, limit - count, rng, allowance)
+        if first is None:
+            first = solution
+        count += found
+        if count >= limit:
+            break
+    return count, first
+
+
+def to_values(puzzle):
+    """
+    Return (values, symbols) for SudokuPuzzle puzzle, where symbols[v]
+    is the symbol for value v and 0 stands for "*".
+
+    @type puzzle: SudokuPuzzle
+    @rtype: (list[int], list[str])
+
+    >>> grid = ["A", "*", "C", "D", "C", "D", "A", "*",
+    ...         "*", "A", "D", "C", "D", "C", "*", "A"]
+    >>> values, symbols = to_values(SudokuPuzzle(4, grid, set("ABCD")))
+    >>> values[:4], symbols
+    ([1, 0, 3, 4], ['*', 'A', 'B', 'C', 'D'])
+    >>> to_puzzle(4, values, symbols)._symbols == grid
+    True
+    """
+    symbols = ["*"] + sorted(puzzle._symbol_set)
+    index = {x: i for i, x in enumerate(symbols)}
+    return [index[x] for x in puzzle._symbols], symbols
+
+
+def to_puzzle(n, values, symbols):
+    """
+    Return the SudokuPuzzle for values written with symbols, the
+    inverse of to_values.
+
+    @type n: int
+    @type values: list[int]
+    @type symbols: list[str]
+    @rtype: SudokuPuzzle
+    """
+    return SudokuPuzzle(n, [symbols[v] for v in values], set(symbols[1:]))
+
+
+def count_sudoku_solutions(puzzle, stop_at=2):
+    """
+    Return the number of solutions of SudokuPuzzle puzzle, counting no
+    further than stop_at.
+
+    @type puzzle: SudokuPuzzle
+    @type stop_at: int
+    @rtype: int
+
+    >>> grid = ["*", "*", "C", "D"]
+    >>> grid += ["C", "D", "*", "*"]
+    >>> grid += ["*", "*", "D", "C"]
+    >>> grid += ["D", "C", "*", "*"]
+    >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+    >>> count_sudoku_solutions(s), count_sudoku_solutions(s, stop_at=10)
+    (2, 4)
+    """
+    values, _ = to_values(puzzle)
+    return _search(_Board(puzzle._n, values), stop_at)[0]
+
+
+def solve_sudoku(puzzle):
+    """
+    Return the solved SudokuPuzzle for puzzle, or None if it has no
+    solution.
+
+    @type puzzle: SudokuPuzzle
+    @rtype: SudokuPuzzle | None
+
+    >>> grid = ["A", "*", "C", "*"]
+    >>> grid += ["*", "D", "*", "B"]
+    >>> grid += ["*", "A", "*", "C"]
+    >>> grid += ["D", "*", "B", "*"]
+    >>> print(solve_sudoku(SudokuPuzzle(4, grid, {"A", "B", "C", "D"})))
+    AB|CD
+    CD|AB
+    -----
+    BA|DC
+    DC|BA
+    """
+    values, symbols = to_values(puzzle)
+    solution = solve_values(puzzle._n, values)
+    if solution is None:
+        return None
+    return to_puzzle(puzzle._n, solution, symbols)
+
+
+def solve_values(n, values):
+    """
+    Return the values of a solution of the n x n board values, where 0
+    is an empty cell and 1..n a symbol, or None if it has none.
+
+    @type n: int
+    @type values: list[int]
+    @rtype: list[int] | None
+
+    >>> solve_values(4, [1, 0, 0, 0, 0, 0, 1, 0, 0, 1, 0, 0, 0, 0, 0, 1])
+    [1, 2, 3, 4, 3, 4, 1, 2, 2, 1, 4, 3, 4, 3, 2, 1]
+    """
+    count, solution = _search(_Board(n, values), 1)
+    return solution if count else None
+
+
+def rate(puzzle):
+    """
+    Return the difficulty of SudokuPuzzle puzzle: EASY if naked singles
+    alone solve it, MEDIUM if hidden singles are needed as well, and
+    HARD if it cannot be finished without guessing.
+
+    @type puzzle: SudokuPuzzle
+    @rtype: str
+
+    >>> grid = ["A", "B", "C", "*"]
+    >>> grid += ["C", "D", "A", "B"]
+    >>> grid += ["B", "A", "D", "C"]
+    >>> grid += ["D", "C", "*", "A"]
+    >>> rate(SudokuPuzzle(4, grid, {"A", "B", "C", "D"}))
+    'easy'
+    """
+    values, _ = to_values(puzzle)
+    return _rate(puzzle._n, values)
+
+
+def _rate(n, values):
+    # Return the difficulty of the board with values.
+    #
+    # @type n: int
+    # @type values: list[int]
+    # @rtype: str
+    board = _Board(n, values)
+    if board.ok and board.propagate(hidden=False) and all(board.values):
+        return EASY
+    board = _Board(n, values)
+    if board.ok and board.propagate() and all(board.values):
+        return MEDIUM
+    return HARD
+
+
+def generate(n=9, difficulty=None, rng=None, symbols=None, symmetric=True,
+             max_attempts=100, allowance=100):
+    """
+    Return a new SudokuPuzzle of side n with exactly one solution.
+
+    A random full grid is made by solving an empty board with candidates
+    tried in random order.  Clues are then removed in random order,
+    in pairs mirrored through the centre if symmetric, and each removal
+    is kept only if the solution stays unique: a search that stops at
+    its first solution looks for one that differs from the full grid in
+    a removed cell.  A check that visits more than allowance boards is
+    abandoned and the clue kept, which bounds the time spent on large
+    grids at the cost of a few extra clues.  If difficulty is given,
+    new puzzles are made until one is rated at that difficulty, giving
+    up after max_attempts with ValueError.
+
+    @type n: int
+        4, 9, 16 or another perfect square
+    @type difficulty: str | None
+        EASY, MEDIUM or HARD
+    @type rng: random.Random | None
+    @type symbols: str | None
+        the n symbols to use (default DEFAULT_SYMBOLS[n])
+    @type symmetric: bool
+    @type max_attempts: int
+    @type allowance: int
+    @rtype: SudokuPuzzle
+
+    >>> s = generate(4, rng=random.Random(1))
+    >>> count_sudoku_solutions(s)
+    1
+    >>> rate(generate(9, EASY, random.Random(2)))
+    'easy'
+    """
+    rng = rng or random.Random()
+    symbols = ["*"] + list(symbols or DEFAULT_SYMBOLS[n])
+    assert len(symbols) == n + 1
+    for _ in range(max_attempts):
+        values = _make_puzzle(n, rng, symmetric, difficulty == EASY,
+                              allowance)
+        if difficulty is None or _rate(n, values) == difficulty:
+            return to_puzzle(n, values, symbols)
+    raise ValueError("no {} puzzle in {} attempts".format(difficulty,
+                                                          max_attempts))
+
+
+def generate_many(count, n=9, difficulty=None, rng=None, **kwargs):
+    """
+    Yield count puzzles from generate(n, difficulty, rng, **kwargs).
+
+    @type count: int
+    @rtype: iterator[SudokuPuzzle]
+    """
+    rng = rng or random.Random()
+    for _ in range(count):
+        yield generate(n, difficulty, rng, **kwargs)
+
+
+def _make_puzzle(n, rng, symmetric, easy, allowance):
+    # Return the values of a random puzzle with a unique solution.  If
+    # easy, only remove clues that naked singles can put back, so the
+    # result stays easy.  allowance bounds each uniqueness check.
+    #
+    # @type n: int
+    # @type rng: random.Random
+    # @type symmetric: bool
+    # @type easy: bool
+    # @type allowance: int
+    # @rtype: list[int]
+    _, solution = _search(_Board(n), 1, rng)
+    values = solution[:]
+    size = n * n
+    cells = list(range(size))
+    rng.shuffle(cells)
+    tried = set()
+    for cell in cells:
+        if cell in tried:
+            continue
+        group = {cell, size - 1 - cell} if symmetric else {cell}
+        tried |= group
+        removed = [(c, values[c]) for c in group]
+        for c in group:
+            values[c] = 0
+        if easy:
+            keep = _rate(n, values) == EASY
+        else:
+            keep = not _has_other_solution(n, values, solution, group,
+                                           allowance)
+        if not keep:
+            for c, value in removed:
+                values[c] = value
+    return values
+
+
+def _has_other_solution(n, values, solution, cells, allowance):
+    # Return whether the board with values, which had exactly one
+    # solution, solution, before cells were emptied, may now have
+    # another.  Any other solution must differ from solution in one of
+    # cells, so it is enough to search, for each of them, for a solution
+    # with a different value there; each search stops at the first
+    # solution.  A search that needs more than allowance boards is
+    # abandoned and counted as finding one, which only ever keeps a
+    # clue that could have gone.
+    #
+    # @type n: int
+    # @type values: list[int]
+    # @type solution: list[int]
+    # @type cells: set[int]
+    # @type allowance: int
+    # @rtype: bool
+    board = _Board(n, values)
+    for cell in cells:
+        other = board.copy()
+        other.candidates[cell] &= ~(1 << (solution[cell] - 1))
+        if not other.candidates[cell]:
+            continue
+        try:
+            if _search(other, 1, None, [allowance])[0]:
+                return True
+        except _GiveUp:
+            return True
+    return False
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    from time import time
+    for side in (4, 9, 16):
+        start = time()
+        count = 0
+        while time() - start < 2:
+            generate(side)
+            count += 1
+        print("{}x{}: {:.1f} puzzles per second".format(
+            side, side, count / (time() - start)))
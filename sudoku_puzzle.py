@@ -1,4 +1,6 @@
 from puzzle import Puzzle
+from puzzle_codec import (cell_bits, read_cells, read_symbols, read_varint,
+                          write_cells, write_symbols, write_varint)
 
 
 class SudokuPuzzle(Puzzle):
@@ -161,25 +163,35 @@ class SudokuPuzzle(Puzzle):
         >>> all([s in L1 for s in L2])
         True
         """
+        return list(self.iter_extensions())
+
+    def iter_extensions(self):
+        """
+        Yield the extensions of SudokuPuzzle self one at a time, in the
+        same order as extensions(): the symbols allowed in the first
+        empty position, in sorted order.
+
+        @type self: SudokuPuzzle
+        @rtype: iterator[SudokuPuzzle]
+
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["C", "D", "A", "B"]
+        >>> grid += ["B", "A", "D", "C"]
+        >>> grid += ["D", "C", "B", "*"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> print(next(s.iter_extensions())._symbols[-1])
+        A
+        """
         # convenient names
         symbols, symbol_set, n = self._symbols, self._symbol_set, self._n
         if "*" not in symbols:
-            # return an empty list
-            return [_ for _ in []]
-        else:
-            # position of first empty position
-            i = symbols.index("*")
-            # allowed symbols at position i
-            # A | B == A.union(B)
-            allowed_symbols = (self._symbol_set -
-                               (self._row_set(i) |
-                                self._column_set(i) |
-                                self._subsquare_set(i)))
-            # list of SudokuPuzzles with each legal digit at position i
-            return (
-                [SudokuPuzzle(n,
-                 symbols[:i] + [d] + symbols[i + 1:], symbol_set)
-                 for d in allowed_symbols])
+            return
+        # position of first empty position
+        i = symbols.index("*")
+        # SudokuPuzzles with each legal digit at position i
+        for d in self._allowed(i):
+            yield SudokuPuzzle(n, symbols[:i] + [d] + symbols[i + 1:],
+                               symbol_set)
 
     def fail_fast(self):
         """
@@ -206,6 +218,121 @@ class SudokuPuzzle(Puzzle):
                     return True
         return False
 
+    def moves(self):
+        """
+        Return the legal moves of SudokuPuzzle self, in the same order as
+        iter_extensions(); each is the first empty position and a symbol
+        allowed there.
+
+        @type self: SudokuPuzzle
+        @rtype: list[(int, str)]
+
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["C", "D", "A", "B"]
+        >>> grid += ["B", "A", "D", "C"]
+        >>> grid += ["D", "C", "B", "*"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> s.moves()
+        [(15, 'A')]
+        >>> s.apply((15, 'A'))
+        >>> s.is_solved()
+        True
+        >>> s.undo((15, 'A'))
+        >>> s.key()[-1]
+        '*'
+        """
+        symbols = self._symbols
+        if "*" not in symbols:
+            return []
+        i = symbols.index("*")
+        return [(i, d) for d in self._allowed(i)]
+
+    def apply(self, move):
+        """
+        Write the symbol of move, one of self.moves(), in its position.
+
+        @type self: SudokuPuzzle
+        @type move: (int, str)
+        @rtype: None
+        """
+        self._symbols[move[0]] = move[1]
+
+    def undo(self, move):
+        """
+        Take back move, the last move applied to SudokuPuzzle self.
+
+        @type self: SudokuPuzzle
+        @type move: (int, str)
+        @rtype: None
+        """
+        self._symbols[move[0]] = "*"
+
+    def key(self):
+        """
+        Return the symbols of SudokuPuzzle self as a tuple.
+
+        @type self: SudokuPuzzle
+        @rtype: tuple[str]
+        """
+        return tuple(self._symbols)
+
+    def copy(self):
+        """
+        Return a copy of SudokuPuzzle self.
+
+        @type self: SudokuPuzzle
+        @rtype: SudokuPuzzle
+        """
+        return SudokuPuzzle(self._n, self._symbols[:], self._symbol_set)
+
+    def to_bytes(self):
+        """
+        Return SudokuPuzzle self packed as bytes: n, the sorted symbol
+        set, then each cell as 0 for "*" or one more than the index of
+        its symbol.
+
+        @type self: SudokuPuzzle
+        @rtype: bytes
+
+        >>> s = SudokuPuzzle(4, ["A", "B", "C", "D", "C", "D", "A", "B",
+        ...                      "B", "A", "D", "C", "D", "C", "B", "*"],
+        ...                  {"A", "B", "C", "D"})
+        >>> len(s.to_bytes()), SudokuPuzzle.from_bytes(s.to_bytes()) == s
+        (18, True)
+        """
+        symbols = sorted(self._symbol_set)
+        index = {x: i + 1 for i, x in enumerate(symbols)}
+        index["*"] = 0
+        out = bytearray()
+        write_varint(out, self._n)
+        write_symbols(out, symbols)
+        write_cells(out, [index[x] for x in self._symbols],
+                    cell_bits(len(symbols) + 1))
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Return the SudokuPuzzle packed into data by to_bytes.
+
+        @type data: bytes
+        @rtype: SudokuPuzzle
+        """
+        n, pos = read_varint(data, 0)
+        symbols, pos = read_symbols(data, pos)
+        cells, pos = read_cells(data, pos, n * n, cell_bits(len(symbols) + 1))
+        table = ["*"] + symbols
+        return cls(n, [table[v] for v in cells], set(symbols))
+
+    def __reduce__(self):
+        """
+        Return how to pickle SudokuPuzzle self: as its to_bytes() form.
+
+        @type self: SudokuPuzzle
+        @rtype: tuple
+        """
+        return type(self).from_bytes, (self.to_bytes(),)
+
     # override fail_fast
     # Notice that it is not possible to complete a sudoku puzzle if there
     # is one open position that has no symbols available to put in it.  In
@@ -214,6 +341,19 @@ class SudokuPuzzle(Puzzle):
     # there is no point in continuing.
 
     # some helper methods
+    def _allowed(self, m):
+        # Return the symbols allowed at position m of SudokuPuzzle self,
+        # in sorted order so that the order does not depend on the hash
+        # seed.
+        #
+        # @type self: SudokuPuzzle
+        # @type m: int
+        # @rtype: list[str]
+        # A | B == A.union(B)
+        return sorted(self._symbol_set - (self._row_set(m) |
+                                          self._column_set(m) |
+                                          self._subsquare_set(m)))
+
     def _row_set(self, m):
         #
         # Return set of symbols in row of SudokuPuzzle self's symbols
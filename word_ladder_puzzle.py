@@ -1,4 +1,9 @@
 from puzzle import Puzzle
+from puzzle_codec import read_string, read_varint, write_string, write_varint
+
+# (frozen copy of the word set, sorted words, word -> position) for the
+# last word set _vocabulary was asked for
+_last_vocabulary = None
 
 
 class WordLadderPuzzle(Puzzle):
@@ -83,16 +88,168 @@ class WordLadderPuzzle(Puzzle):
         >>> all([s in L1 for s in L2])
         True
         """
+        return list(self.iter_extensions())
+
+    def iter_extensions(self):
+        """
+        Yield the extensions of WordLadderPuzzle self one at a time, in
+        the same order as extensions().
+
+        @type self: WordLadderPuzzle
+        @rtype: iterator[WordLadderPuzzle]
+
+        >>> word_set = {"same", "some", "cost"}
+        >>> w1 = WordLadderPuzzle("same", "cost", word_set)
+        >>> print(next(w1.iter_extensions()))
+        some -> cost
+        """
         if self.is_solved():
-            # return an empty list
-            return[]
-        else:
-            result = []
-            for i in range(len(self._from_word)):
-                new_word = self._from_word[0:i] + self._to_word[i] + self._from_word[i + 1:]
-                if new_word in self._word_set:
-                    result.append(WordLadderPuzzle(new_word, self._to_word, self._word_set))
-            return result
+            return
+        for i in range(len(self._from_word)):
+            new_word = self._from_word[0:i] + self._to_word[i] + self._from_word[i + 1:]
+            if new_word in self._word_set:
+                yield WordLadderPuzzle(new_word, self._to_word, self._word_set)
+
+    def moves(self):
+        """
+        Return the legal moves of WordLadderPuzzle self, in the same
+        order as iter_extensions(); each is a position whose letter is
+        changed to the one to_word has there, and the letter it replaces.
+
+        @type self: WordLadderPuzzle
+        @rtype: list[(int, str)]
+
+        >>> w = WordLadderPuzzle("same", "cost", {"same", "some", "cost"})
+        >>> w.moves()
+        [(1, 'a')]
+        >>> w.apply((1, 'a'))
+        >>> w.key()
+        'some'
+        >>> w.undo((1, 'a'))
+        >>> print(w)
+        same -> cost
+        """
+        from_word, to_word = self._from_word, self._to_word
+        if from_word == to_word:
+            return []
+        return [(i, from_word[i]) for i in range(len(from_word))
+                if (from_word[:i] + to_word[i] + from_word[i + 1:]
+                    in self._word_set)]
+
+    def apply(self, move):
+        """
+        Change the letter at the position of move, one of self.moves().
+
+        @type self: WordLadderPuzzle
+        @type move: (int, str)
+        @rtype: None
+        """
+        i, word = move[0], self._from_word
+        self._from_word = word[:i] + self._to_word[i] + word[i + 1:]
+
+    def undo(self, move):
+        """
+        Take back move, the last move applied to WordLadderPuzzle self.
+
+        @type self: WordLadderPuzzle
+        @type move: (int, str)
+        @rtype: None
+        """
+        (i, letter), word = move, self._from_word
+        self._from_word = word[:i] + letter + word[i + 1:]
+
+    def key(self):
+        """
+        Return the current word of WordLadderPuzzle self.
+
+        @type self: WordLadderPuzzle
+        @rtype: str
+        """
+        return self._from_word
+
+    def copy(self):
+        """
+        Return a copy of WordLadderPuzzle self, sharing its word set.
+
+        @type self: WordLadderPuzzle
+        @rtype: WordLadderPuzzle
+        """
+        return WordLadderPuzzle(self._from_word, self._to_word,
+                                self._word_set)
+
+    def shortest_ladders(self, stats=None, budget=None):
+        """
+        Return a LadderDAG of every shortest ladder from the word of
+        WordLadderPuzzle self to its target, where each step may change
+        a letter to any in self._chars, not just to the target's.
+
+        @type self: WordLadderPuzzle
+        @type stats: SolverStats | None
+        @type budget: Budget | None
+        @rtype: LadderDAG
+
+        >>> ws = {"cat", "cot", "cog", "dog", "dot", "cag"}
+        >>> ladders = WordLadderPuzzle("cat", "dog", ws).shortest_ladders()
+        >>> ladders.count(), next(iter(ladders))
+        (3, ('cat', 'cag', 'cog', 'dog'))
+        """
+        from ladder_dag import LadderDAG
+        return LadderDAG(self._from_word, self._to_word, self._word_set,
+                         self._chars, stats, budget)
+
+    def to_bytes(self):
+        """
+        Return the words of WordLadderPuzzle self packed as bytes: for
+        each, one more than its position in the sorted word set as a
+        varint, or 0 and the word itself if it is not in the set.  The
+        word set is left out; from_bytes must be given the same one.
+
+        @type self: WordLadderPuzzle
+        @rtype: bytes
+
+        >>> ws = {"same", "some", "cost"}
+        >>> w = WordLadderPuzzle("same", "cast", ws)
+        >>> w.to_bytes()
+        b'\\x02\\x00\\x04cast'
+        >>> WordLadderPuzzle.from_bytes(w.to_bytes(), ws) == w
+        True
+        >>> ws.discard("same"); ws.add("sane")
+        >>> w.to_bytes()
+        b'\\x00\\x04same\\x00\\x04cast'
+        """
+        words, index = _vocabulary(self._word_set)
+        out = bytearray()
+        for word in (self._from_word, self._to_word):
+            if word in index:
+                write_varint(out, index[word] + 1)
+            else:
+                write_varint(out, 0)
+                write_string(out, word)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data, ws):
+        """
+        Return the WordLadderPuzzle over word set ws packed into data by
+        to_bytes.
+
+        @type data: bytes
+        @type ws: set[str]
+        @rtype: WordLadderPuzzle
+        """
+        words, index = _vocabulary(ws)
+        found, pos = [], 0
+        for _ in range(2):
+            word_id, pos = read_varint(data, pos)
+            if word_id == 0:
+                word, pos = read_string(data, pos)
+            elif word_id <= len(words):
+                word = words[word_id - 1]
+            else:
+                raise ValueError("word id {} is not in the word set".format(
+                    word_id))
+            found.append(word)
+        return cls(found[0], found[1], ws)
 
         # override is_solved
         # this WordLadderPuzzle is solved when _from_word is the same as
@@ -114,6 +271,23 @@ class WordLadderPuzzle(Puzzle):
         """
         return self._from_word == self._to_word
 
+
+def _vocabulary(ws):
+    # Return (sorted words, word -> position) for word set ws, reusing
+    # those of the last word set asked for if ws has the same words.
+    # A frozen copy of that set is kept, so changing ws in place cannot
+    # leave a stale index behind.
+    #
+    # @type ws: set[str]
+    # @rtype: (list[str], dict[str, int])
+    global _last_vocabulary
+    if _last_vocabulary is None or _last_vocabulary[0] != ws:
+        words = sorted(ws)
+        _last_vocabulary = (frozenset(words), words,
+                            {word: i for i, word in enumerate(words)})
+    return _last_vocabulary[1], _last_vocabulary[2]
+
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()